@@ -61,7 +61,7 @@ from .collectivevariable import (
     FunctionCV, MDTrajFunctionCV, MSMBFeaturizerCV,
     InVolumeCV, CollectiveVariable, CoordinateGeneratorCV,
     CoordinateFunctionCV, CallableCV, PyEMMAFeaturizerCV,
-    GeneratorCV)
+    GeneratorCV, CoordinateArrayFunctionCV)
 
 from .ensemble import (
     Ensemble, EnsembleCombination,
@@ -108,7 +108,7 @@ from .pathmover import (
     LastAllowedMover, OneWayExtendMover, SubtrajectorySelectMover,
     IdentityPathMover, RandomAllowedChoiceMover,
     TwoWayShootingMover, ForwardFirstTwoWayShootingMover,
-    BackwardFirstTwoWayShootingMover
+    BackwardFirstTwoWayShootingMover, AbstractTwoWayShootingMover
 )
 
 from .pathsimulators import (
@@ -173,7 +173,9 @@ from .pathmovers.move_schemes import *
 
 import openpathsampling.numerics as numerics
 
-from openpathsampling.engines import Trajectory, BaseSnapshot
+from openpathsampling.engines import (
+    Trajectory, PackedTrajectory, BaseSnapshot
+)
 
 # until engines are proper subpackages, built-ins need to be findable!
 import openpathsampling.engines.openmm #as openmm
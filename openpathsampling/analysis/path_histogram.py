@@ -5,6 +5,13 @@ from openpathsampling.progress import SimpleProgress
 from collections import Counter
 import numpy as np
 
+def _pairwise_trajectory_bins(interpolate, map_to_bins, trajectory):
+    bin_list = [map_to_bins(trajectory[0])]
+    for fnum in range(len(trajectory)-1):
+        bin_list += interpolate(trajectory[fnum], trajectory[fnum+1])
+    return np.array(bin_list).astype(int)
+
+
 class VoxelInterpolator(object):
     """
     Identify voxels visited during linear interpolation between two points
@@ -18,6 +25,9 @@ class VoxelInterpolator(object):
     return the list of voxel identifiers (n-dimensional integer tuples) for
     the visited voxels, excluding the voxel for ``old_pt``.
 
+    Subclasses can also override :meth:`.trajectory_bins` to interpolate a
+    whole trajectory at once, using array operations.
+
     Parameters
     ----------
     histogram : :class:`.PathHistogram`
@@ -37,6 +47,35 @@ class VoxelInterpolator(object):
     def map_to_bins(self, point):
         return self.histogram.map_to_bins(point)
 
+    @staticmethod
+    def trajectory_points(trajectory):
+        """Frames of a reduced space trajectory, as a 2D array"""
+        return np.asarray(trajectory, dtype=float).reshape(len(trajectory),
+                                                           -1)
+
+    def map_points_to_bins(self, points):
+        """Bins of an array of points (same as :meth:`.map_to_bins`)"""
+        return np.floor((points - self.left_bin_edges) / self.bin_widths)
+
+    def trajectory_bins(self, trajectory):
+        """Bins visited by a trajectory, including interpolated bins.
+
+        The default implementation calls the interpolator for each pair of
+        successive frames.
+
+        Parameters
+        ----------
+        trajectory : list of array-like
+            the reduced space trajectory
+
+        Returns
+        -------
+        np.ndarray of int
+            the visited bins, in order (shape ``(n_visits, n_dim)``),
+            starting with the bin of the first frame
+        """
+        return _pairwise_trajectory_bins(self, self.map_to_bins, trajectory)
+
     def __call__(self, old_pt, new_pt):
         raise NotImplementedError("Can't use abstract class Interpolator")
 
@@ -55,6 +94,10 @@ class NoInterpolation(VoxelInterpolator):
     def __call__(self, old_pt, new_pt):
         return [self.map_to_bins(new_pt)]
 
+    def trajectory_bins(self, trajectory):
+        points = self.trajectory_points(trajectory)
+        return self.map_points_to_bins(points).astype(int)
+
 
 class SubdivideInterpolation(VoxelInterpolator):
     """Interpolate by bisection.
@@ -68,6 +111,19 @@ class SubdivideInterpolation(VoxelInterpolator):
     ----------
     histogram : :class:`.PathHistogram`
         the histogram that this will interpolate for
+
+    Notes
+    -----
+    :meth:`.trajectory_bins` finds the voxels from the order in which each
+    segment crosses the bin edges, instead of by bisection. A point on a
+    bin edge belongs to the bin that the edge is the left edge of, so a
+    segment that starts on an edge and moves to lower values crosses that
+    edge immediately. If a segment crosses edges in several dimensions at
+    the same point (within 1e-6 of the segment), i.e., goes through a
+    corner, this is one diagonal step: only the voxel after the corner is
+    counted, not the voxels that only touch the corner. For segments
+    through corners or with frames on bin edges, the pairwise bisection
+    (``__call__``) can give different voxels, and may not terminate.
     """
     def _interpolated_bins(self, old_pt, new_pt):
         """Interpolate between trajectory points.
@@ -184,6 +240,64 @@ class SubdivideInterpolation(VoxelInterpolator):
     def __call__(self, old_pt, new_pt):
         return self._interpolated_bins(old_pt, new_pt)
 
+    def trajectory_bins(self, trajectory):
+        # The bisection finds the voxels that the line between the points
+        # goes through. For the whole trajectory at once, we get the same
+        # voxels from the order in which the line crosses the bin edges.
+        # Edges crossed at the same time (through a corner) only give the
+        # final voxel, as in the diagonal case of the bisection.
+        points = self.trajectory_points(trajectory)
+        bins = self.map_points_to_bins(points).astype(int)
+        n_segments = len(points) - 1
+        n_dim = points.shape[1]
+        delta = points[1:] - points[:-1]
+        delta_bins = bins[1:] - bins[:-1]
+        n_cross = np.abs(delta_bins)
+
+        # one row for each crossed edge
+        segment = np.repeat(np.repeat(np.arange(n_segments), n_dim),
+                            n_cross.ravel())
+        dim = np.repeat(np.tile(np.arange(n_dim), n_segments),
+                        n_cross.ravel())
+        offsets = np.cumsum(n_cross.ravel()) - n_cross.ravel()
+        crossing = (np.arange(len(segment))
+                    - np.repeat(offsets, n_cross.ravel()) + 1)
+        direction = np.sign(delta_bins[segment, dim])
+        edge_bin = bins[:-1][segment, dim] + np.where(direction > 0,
+                                                      crossing,
+                                                      1 - crossing)
+        left_edges = np.broadcast_to(self.left_bin_edges, (n_dim,))
+        widths = np.broadcast_to(self.bin_widths, (n_dim,))
+        edges = left_edges[dim] + widths[dim] * edge_bin
+        with np.errstate(divide='ignore', invalid='ignore'):
+            t = (edges - points[:-1][segment, dim]) / delta[segment, dim]
+
+        # segments that stay in a voxel still count the new voxel once
+        stay = np.where(n_cross.sum(axis=1) == 0)[0]
+        segment = np.concatenate([segment, stay])
+        dim = np.concatenate([dim, np.zeros(len(stay), dtype=int)])
+        direction = np.concatenate([direction,
+                                    np.zeros(len(stay), dtype=int)])
+        t = np.concatenate([t, np.ones(len(stay))])
+
+        order = np.lexsort((t, segment))
+        (segment, dim, direction, t) = (segment[order], dim[order],
+                                        direction[order], t[order])
+        steps = np.zeros((len(segment), n_dim), dtype=int)
+        steps[np.arange(len(segment)), dim] = direction
+        # bins after each crossing: start bin of the segment plus the steps
+        # taken so far in the segment
+        steps = np.cumsum(steps, axis=0)
+        seg_starts = np.searchsorted(segment, np.arange(n_segments))
+        before_segment = np.concatenate([np.zeros((1, n_dim), dtype=int),
+                                         steps])[seg_starts]
+        visited = bins[:-1][segment] + steps - before_segment[segment]
+
+        same_time = np.zeros(len(segment), dtype=bool)
+        same_time[:-1] = ((segment[1:] == segment[:-1])
+                          & (np.abs(t[1:] - t[:-1]) <= 1e-6))
+        return np.concatenate([bins[:1], visited[~same_time]])
+
 
 class BresenhamInterpolation(VoxelInterpolator):
     """Interpolation based on the Bresenham line-drawing algorithm.
@@ -203,6 +317,13 @@ class BresenhamInterpolation(VoxelInterpolator):
                 for i in range(n_steps)]
         return bins
 
+    def _interpolated_trajectory_bins(self, points, bins, delta, n_steps,
+                                      segment, step):
+        # vectorized version of _interpolated_bins, for all segments
+        step_size = delta / n_steps[:, np.newaxis]
+        return np.rint(bins[:-1][segment]
+                       + step[:, np.newaxis] * step_size[segment])
+
     def __call__(self, old_pt, new_pt):
         old_bin = self.map_to_bins(old_pt)
         new_bin = self.map_to_bins(new_pt)
@@ -214,6 +335,21 @@ class BresenhamInterpolation(VoxelInterpolator):
                                        delta, n_steps)
         return [tuple(b) for b in bins]
 
+    def trajectory_bins(self, trajectory):
+        points = self.trajectory_points(trajectory)
+        bins = self.map_points_to_bins(points)
+        delta = bins[1:] - bins[:-1]
+        n_steps = np.max(np.abs(delta), axis=1).astype(int)
+        n_steps[n_steps == 0] = 1
+        # segment number and step number (starting at 1) of each new bin
+        segment = np.repeat(np.arange(len(n_steps)), n_steps)
+        offsets = np.cumsum(n_steps) - n_steps
+        step = np.arange(len(segment)) - offsets[segment] + 1
+        interpolated = self._interpolated_trajectory_bins(
+            points, bins, delta, n_steps, segment, step
+        )
+        return np.concatenate([bins[:1], interpolated]).astype(int)
+
 class BresenhamLikeInterpolation(BresenhamInterpolation):
     """Interpolation based on floating point analog to Bresenham algorithm.
 
@@ -229,6 +365,37 @@ class BresenhamLikeInterpolation(BresenhamInterpolation):
         bins = [self.map_to_bins(pt) for pt in interp_points]
         return bins
 
+    def _interpolated_trajectory_bins(self, points, bins, delta, n_steps,
+                                      segment, step):
+        step_size = (points[1:] - points[:-1]) / n_steps[:, np.newaxis]
+        interp_points = (points[:-1][segment]
+                         + step[:, np.newaxis] * step_size[segment])
+        return self.map_points_to_bins(interp_points)
+
+# number of (per-trajectory unique) bins to collect before adding them to the
+# histogram counter
+_MAX_BUFFERED_BINS = 2**20
+
+
+def _unique_rows(rows):
+    """Unique rows of a 2D integer array, and the inverse indices.
+
+    When the range of the bins allows it, each row is encoded as a single
+    integer, which is much faster than ``np.unique(rows, axis=0)``.
+    """
+    if len(rows) == 0:
+        return rows, np.zeros(0, dtype=int)
+    mins = rows.min(axis=0)
+    spans = rows.max(axis=0) - mins + 1
+    if np.prod(spans.astype(float)) < 2**62:
+        keys = np.ravel_multi_index(tuple((rows - mins).T), tuple(spans))
+        (_, index, inverse) = np.unique(keys, return_index=True,
+                                        return_inverse=True)
+        return rows[index], inverse.ravel()
+    (unique, inverse) = np.unique(rows, axis=0, return_inverse=True)
+    return unique, inverse.ravel()
+
+
 # should path histogram be moved to the generic histogram.py? Seems to be
 # independent of the fact that this is actually OPS
 class PathHistogram(SimpleProgress, SparseHistogram):
@@ -264,6 +431,38 @@ class PathHistogram(SimpleProgress, SparseHistogram):
         self.interpolate = interpolate(self)
         self.per_traj = per_traj
 
+    def _trajectory_bins(self, trajectory):
+        try:
+            trajectory_bins = self.interpolate.trajectory_bins
+        except AttributeError:
+            # interpolators that only interpolate pairs of points
+            return _pairwise_trajectory_bins(self.interpolate,
+                                             self.map_to_bins, trajectory)
+        return trajectory_bins(trajectory)
+
+    def trajectory_bin_counts(self, trajectory):
+        """Visited bins and number of visits for an unweighted trajectory
+
+        Parameters
+        ----------
+        trajectory : list of array-like
+            the reduced space trajectory
+
+        Returns
+        -------
+        bins : np.ndarray of int
+            each bin visited by the trajectory, shape ``(n_bins, n_dim)``
+        counts : np.ndarray of int
+            number of visits to each bin (1 if ``per_traj``)
+        """
+        (bins, inverse) = _unique_rows(self._trajectory_bins(trajectory))
+        if self.per_traj:
+            # each bin only counts once per trajectory
+            counts = np.ones(len(bins), dtype=int)
+        else:
+            counts = np.bincount(inverse, minlength=len(bins))
+        return bins, counts
+
     def single_trajectory_counter(self, trajectory):
         """
         Calculate the counter (local histogram) for an unweighted trajectory
@@ -278,22 +477,36 @@ class PathHistogram(SimpleProgress, SparseHistogram):
         collections.Counter
             histogram counter for this trajectory
         """
-        # make a list of every bin visited, possibly interpolating gaps
-        bin_list = [self.map_to_bins(trajectory[0])]
-        for fnum in range(len(trajectory)-1):
-            bin_list += self.interpolate(trajectory[fnum],
-                                         trajectory[fnum+1])
-            # if self.interpolate:
-                # bin_list += self.interpolated_bins(trajectory[fnum],
-                                                   # trajectory[fnum+1])
-            # else:
-                # bin_list += [self.map_to_bins(trajectory[fnum+1])]
-
-        local_hist = Counter(bin_list)
-        if self.per_traj:
-            # keys only exist once, so the counter gives 1 if key present
-            local_hist = Counter(local_hist.keys())
-        return local_hist
+        (bins, counts) = self.trajectory_bin_counts(trajectory)
+        return Counter(dict(zip(map(tuple, bins.tolist()), counts.tolist())))
+
+    def _add_bin_counts(self, bin_counts, weights):
+        """Add weighted bin counts of trajectories to the histogram.
+
+        The counts of all trajectories are summed with array operations,
+        and the counter is only updated once for each bin.
+
+        Parameters
+        ----------
+        bin_counts : list of tuple
+            output of :meth:`.trajectory_bin_counts` for each trajectory
+        weights : list of float
+            weight of each trajectory
+        """
+        if self._histogram is None:
+            self._histogram = Counter({})
+        if len(bin_counts) == 0:
+            return
+        bins = np.concatenate([b for (b, _) in bin_counts])
+        bin_weights = np.concatenate([c * w for ((_, c), w)
+                                      in zip(bin_counts, weights)])
+        (bins, inverse) = _unique_rows(bins)
+        totals = np.bincount(inverse, weights=bin_weights,
+                             minlength=len(bins))
+        histogram = self._histogram
+        for (key, value) in zip(map(tuple, bins.tolist()), totals.tolist()):
+            if value > 0:
+                histogram[key] += value
 
     def add_data_to_histogram(self, trajectories, weights=None):
         """Adds data to the internal histogram counter.
@@ -313,11 +526,28 @@ class PathHistogram(SimpleProgress, SparseHistogram):
         """
         if weights is None:
             weights = [1.0] * len(trajectories)
-        for (traj, w) in self.progress(list(zip(trajectories, weights))):
-            # list so that progress can know the length
-            self.add_trajectory(traj, w)
+        # list so that progress can know the length
+        trajs = self.progress(list(zip(trajectories, weights)))
+        self._add_trajectories(trajs, lambda traj: traj)
         return self._histogram.copy()
 
+    def _add_trajectories(self, weighted_trajectories, reduce_trajectory):
+        # bin counts are added in chunks, to limit the memory use
+        bin_counts = []
+        weights = []
+        n_rows = 0
+        for (traj, w) in weighted_trajectories:
+            counts = self.trajectory_bin_counts(reduce_trajectory(traj))
+            bin_counts.append(counts)
+            weights.append(w)
+            n_rows += len(counts[0])
+            if n_rows >= _MAX_BUFFERED_BINS:
+                self._add_bin_counts(bin_counts, weights)
+                self.count += sum(weights)
+                (bin_counts, weights, n_rows) = ([], [], 0)
+        self._add_bin_counts(bin_counts, weights)
+        self.count += sum(weights)
+
     def add_trajectory(self, trajectory, weight=1.0):
         """Add a single trajectory to internal counter, with given weight
 
@@ -328,12 +558,8 @@ class PathHistogram(SimpleProgress, SparseHistogram):
         weight : float
             the weight of the trajectory. Default 1.0
         """
-        local_hist = self.single_trajectory_counter(trajectory)
-        local_hist = Counter({k : local_hist[k] * weight
-                              for k in local_hist.keys()})
-        if self._histogram is None:
-            self._histogram = Counter({})
-        self._histogram += local_hist
+        self._add_bin_counts([self.trajectory_bin_counts(trajectory)],
+                             [weight])
         self.count += weight
 
 
@@ -386,10 +612,11 @@ class PathDensityHistogram(PathHistogram):
             weights = [1.0] * len(trajectories)
 
         # TODO: add something so that we don't recalc the same traj twice
-        for (traj, w) in self.progress(list(zip(trajectories, weights))):
-            cv_traj = [cv(traj) for cv in self.cvs]
-            self.add_trajectory(list(zip(*cv_traj)), w)
-
+        trajs = self.progress(list(zip(trajectories, weights)))
+        self._add_trajectories(
+            trajs,
+            lambda traj: np.transpose([cv(traj) for cv in self.cvs])
+        )
         return self._histogram.copy()
 
     def map_to_float_bins(self, trajectory):
@@ -0,0 +1,218 @@
+"""
+Block bootstrap error estimates for the TIS analysis.
+"""
+import functools
+import itertools
+import multiprocessing
+import sys
+
+import numpy as np
+import pandas as pd
+
+from openpathsampling.numerics import ResamplingStatistics
+from .core import step_blocks, _is_sliceable
+from .flux import flux_matrix_pd
+
+import logging
+logger = logging.getLogger(__name__)
+
+# analysis and block intermediates for the worker processes of
+# `TISBootstrap`; set before the workers are forked, because analysis
+# objects (CVs, engines) can't, in general, be pickled
+_bootstrap_worker_state = {}
+
+
+def _resample_results(analysis, block_intermediates, blocks, transitions,
+                      tcp_lambdas):
+    """Results for one resample, as pandas objects (which can be pickled)
+    """
+    intermediates = functools.reduce(
+        analysis.combine_intermediates,
+        [block_intermediates[block] for block in blocks]
+    )
+    analysis.calculate_from_intermediates(intermediates)
+    rate = analysis.rate_matrix().to_pandas()
+    flux = flux_matrix_pd(analysis.flux_matrix).to_frame()
+    tcp_results = analysis.total_crossing_probability
+    tcps = []
+    for (transition, lambdas) in zip(transitions, tcp_lambdas):
+        tcp = tcp_results[transition]
+        tcps.append(pd.DataFrame({'TCP': [tcp(x) for x in lambdas]},
+                                 index=lambdas))
+    return rate, flux, tcps
+
+
+def _can_fork():
+    if hasattr(multiprocessing, 'get_all_start_methods'):
+        return 'fork' in multiprocessing.get_all_start_methods()
+    else:
+        # Python 2: multiprocessing forks, except on Windows
+        return sys.platform != 'win32'
+
+
+def _bootstrap_worker(blocks):
+    state = _bootstrap_worker_state
+    return _resample_results(state['analysis'], state['block_intermediates'],
+                             blocks, state['transitions'],
+                             state['tcp_lambdas'])
+
+
+class TISBootstrap(object):
+    """Block bootstrap error estimates for a :class:`.StandardTISAnalysis`.
+
+    The steps are split into ``n_blocks`` consecutive blocks, and the
+    intermediates of each block are calculated in a single pass over the
+    steps (see :meth:`.StandardTISAnalysis.intermediates`). Each resample
+    draws ``n_blocks`` blocks with replacement, and calculates the results
+    from the combined intermediates of those blocks. The resamples are
+    distributed over a pool of worker processes.
+
+    Parameters
+    ----------
+    analysis : :class:`.StandardTISAnalysis`
+        the analysis to estimate errors for; its results are not changed.
+        The max lambda histograms must have a fixed ``bin_range``.
+    steps : iterable of :class:`.MCStep`
+        the steps to analyze
+    n_blocks : int
+        number of blocks; steps left over at the end (if the number of
+        steps doesn't divide evenly) are not used
+    n_resamples : int
+        number of bootstrap resamples
+    n_workers : int or None
+        number of worker processes. If None, the number of CPUs. With 1, or
+        if the platform can't fork processes, the resamples are calculated
+        in this process.
+    seed : int or None
+        seed for the random selection of blocks
+
+    Attributes
+    ----------
+    block_intermediates : list of dict
+        intermediates of each block
+    resamples : list of list of int
+        the blocks used in each resample
+    rate_matrix : :class:`.ResamplingStatistics`
+        statistics of the rate matrix
+    flux_matrix : :class:`.ResamplingStatistics`
+        statistics of the flux; rows are (state, interface) names
+    total_crossing_probability : dict
+        maps each transition to the :class:`.ResamplingStatistics` of its
+        total crossing probability, at the lambda values of the total
+        crossing probability from all blocks
+    """
+    def __init__(self, analysis, steps, n_blocks=20, n_resamples=200,
+                 n_workers=None, seed=None):
+        self.analysis = analysis
+        self.n_blocks = n_blocks
+        self.n_resamples = n_resamples
+        if n_workers is None:
+            n_workers = multiprocessing.cpu_count()
+        self.n_workers = n_workers
+
+        if not _is_sliceable(steps):
+            steps = list(steps)
+        n_per_block = len(steps) // n_blocks
+        if n_per_block == 0:
+            raise ValueError("Fewer steps (" + str(len(steps)) + ") than "
+                             + "blocks (" + str(n_blocks) + ")")
+        blocks = itertools.islice(step_blocks(steps, n_per_block), n_blocks)
+        self.block_intermediates = [
+            analysis.block_intermediates(list(block))
+            for block in analysis.progress(blocks, desc="Blocks",
+                                           total=n_blocks)
+        ]
+
+        random_state = np.random.RandomState(seed)
+        self.resamples = [
+            list(random_state.randint(n_blocks, size=n_blocks))
+            for _ in range(n_resamples)
+        ]
+
+        self.transitions = list(analysis.network.transitions.values())
+        results = self._calculate()
+        (rates, fluxes, tcps) = zip(*results)
+        self.rate_matrix = ResamplingStatistics(function=None,
+                                                inputs=self.resamples,
+                                                results=list(rates))
+        self.flux_matrix = ResamplingStatistics(function=None,
+                                                inputs=self.resamples,
+                                                results=list(fluxes))
+        self.total_crossing_probability = {
+            transition: ResamplingStatistics(
+                function=None,
+                inputs=self.resamples,
+                results=[tcp[num] for tcp in tcps]
+            )
+            for (num, transition) in enumerate(self.transitions)
+        }
+
+    def _calculate(self):
+        analysis = self.analysis
+        # the workers (or this process) overwrite the analysis results
+        old_results = analysis.results
+        old_intermediates = analysis._intermediates
+        try:
+            all_blocks = functools.reduce(analysis.combine_intermediates,
+                                          self.block_intermediates)
+            analysis.calculate_from_intermediates(all_blocks)
+            tcp_results = analysis.total_crossing_probability
+            tcp_lambdas = [list(tcp_results[transition].x)
+                           for transition in self.transitions]
+
+            if self.n_workers <= 1 or not _can_fork():
+                return [
+                    _resample_results(analysis, self.block_intermediates,
+                                      blocks, self.transitions, tcp_lambdas)
+                    for blocks in self.resamples
+                ]
+
+            _bootstrap_worker_state.update(
+                analysis=analysis,
+                block_intermediates=self.block_intermediates,
+                transitions=self.transitions,
+                tcp_lambdas=tcp_lambdas
+            )
+            try:
+                if hasattr(multiprocessing, 'get_context'):
+                    pool = multiprocessing.get_context('fork').Pool(
+                        self.n_workers
+                    )
+                else:
+                    # Python 2 always forks
+                    pool = multiprocessing.Pool(self.n_workers)
+                try:
+                    return pool.map(_bootstrap_worker, self.resamples)
+                finally:
+                    pool.terminate()
+                    pool.join()
+            finally:
+                _bootstrap_worker_state.clear()
+        finally:
+            analysis.results = old_results
+            analysis._intermediates = old_intermediates
+
+    def confidence_intervals(self, confidence=0.95):
+        """Confidence intervals of the rates, fluxes, and TCPs.
+
+        Parameters
+        ----------
+        confidence : float
+            fraction of the resamples within the interval
+
+        Returns
+        -------
+        dict
+            maps 'rate_matrix', 'flux_matrix', and
+            'total_crossing_probability' (itself a dict with transitions as
+            keys) to tuples of the lower and upper bound
+        """
+        return {
+            'rate_matrix': self.rate_matrix.confidence_interval(confidence),
+            'flux_matrix': self.flux_matrix.confidence_interval(confidence),
+            'total_crossing_probability': {
+                transition: stats.confidence_interval(confidence)
+                for (transition, stats)
+                in self.total_crossing_probability.items()
+            }
+        }
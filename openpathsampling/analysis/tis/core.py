@@ -1,4 +1,5 @@
 import collections
+import itertools
 import openpathsampling as paths
 from openpathsampling.netcdfplus import StorableNamedObject
 from openpathsampling.progress import SimpleProgress
@@ -6,7 +7,53 @@ import pandas as pd
 import numpy as np
 
 
-def steps_to_weighted_trajectories(steps, ensembles):
+def _is_sliceable(steps):
+    return hasattr(steps, '__len__') and hasattr(steps, '__getitem__')
+
+
+def step_blocks(steps, block_size=None, start=0):
+    """Split steps into blocks of at most ``block_size`` steps.
+
+    Sequences that support slicing (lists, or ``storage.steps``) are sliced,
+    so that a store can load each block at once; other iterables are read
+    one block at a time.
+
+    Parameters
+    ----------
+    steps : iterable of :class:`.MCStep`
+        steps to be split
+    block_size : int
+        maximum number of steps per block; default (None) gives all steps
+        as a single block
+    start : int
+        number of steps to skip at the beginning
+
+    Yields
+    ------
+    list of :class:`.MCStep`
+        the steps in each block
+    """
+    if block_size is None:
+        if start == 0:
+            yield steps
+        elif _is_sliceable(steps):
+            yield steps[start:]
+        else:
+            yield list(itertools.islice(steps, start, None))
+        return
+
+    if _is_sliceable(steps):
+        for block_start in range(start, len(steps), block_size):
+            yield steps[block_start:block_start + block_size]
+    else:
+        iterator = itertools.islice(steps, start, None)
+        block = list(itertools.islice(iterator, block_size))
+        while block:
+            yield block
+            block = list(itertools.islice(iterator, block_size))
+
+
+def steps_to_weighted_trajectories(steps, ensembles, block_size=None):
     """Bare function to convert to the weighted trajs dictionary.
 
     This prepares data for the faster analysis format. This preparation only
@@ -18,6 +65,9 @@ def steps_to_weighted_trajectories(steps, ensembles):
         steps to be analyzed
     ensembles: list of :class:`.Ensemble`
         ensembles to include in the list. Note: ensemble must be given!
+    block_size: int
+        number of steps to load at once (see :func:`.step_blocks`); default
+        (None) iterates over all steps
 
     Returns
     -------
@@ -27,18 +77,11 @@ def steps_to_weighted_trajectories(steps, ensembles):
         spent in the ensemble.
     """
     results = {e: collections.Counter() for e in ensembles}
-
-    # loop over blocks # TODO: add blocksize parameter, test various sizes
-    block_steps = steps
-    block = collections.defaultdict(list)
-    for step in block_steps:
-        for ens in ensembles:
-            block[ens].append(step.active[ens].trajectory)
-
-    block_counter = {e: collections.Counter(block[e]) for e in ensembles}
-
-    for e in results:
-        results[e] += block_counter[e]
+    for block in step_blocks(steps, block_size):
+        for step in block:
+            active = step.active
+            for ens in ensembles:
+                results[ens][active[ens].trajectory] += 1
 
     return results
 
@@ -180,6 +223,54 @@ class MultiEnsembleSamplingAnalyzer(SimpleProgress, StorableNamedObject):
         """
         raise NotImplementedError
 
+    def intermediates(self, steps):
+        """Calculate intermediates, using `steps` as input.
+
+        Intermediates of different sets of steps can be combined with
+        :meth:`.combine_intermediates`, and the results are obtained with
+        :meth:`.calculate_from_intermediates`.
+
+        Parameters
+        ----------
+        steps : iterable of :class:`.MCStep`
+            the steps to use as input for this analysis
+
+        Returns
+        -------
+        list
+            the intermediates; contents depend on the subclass
+        """
+        weighted_trajs = steps_to_weighted_trajectories(steps,
+                                                        self.ensembles)
+        return self.intermediates_from_weighted_trajectories(weighted_trajs)
+
+    def intermediates_from_weighted_trajectories(self, input_dict):
+        """Calculate intermediates from weighted trajectories dictionary.
+
+        Must be implemented in subclass to support combining partial
+        analyses.
+        """
+        raise NotImplementedError
+
+    @staticmethod
+    def combine_intermediates(intermediates_1, intermediates_2):
+        """Combine intermediates from two sets of steps.
+
+        Must be implemented in subclass to support combining partial
+        analyses.
+        """
+        raise NotImplementedError
+
+    @staticmethod
+    def compact_intermediates(intermediates):
+        """Reduce intermediates to what is needed for the results.
+
+        Subclasses with intermediates that refer to trajectories override
+        this, so that accumulated or saved intermediates don't keep the
+        trajectories. Default returns the intermediates unchanged.
+        """
+        return intermediates
+
     @staticmethod
     def combine_results(result_1, result_2):
         """Combine two sets of results from this analysis.
@@ -240,6 +331,76 @@ class EnsembleHistogrammer(MultiEnsembleSamplingAnalyzer):
             self.hists[ens].histogram(data, weights)
         return self.hists
 
+    def intermediates_from_weighted_trajectories(self, input_dict):
+        """Calculate intermediates from a weighted trajectories dictionary.
+
+        The intermediates are the histograms of the input, which can be
+        added to the histograms of other input. This requires histograms
+        with fixed bins, i.e., ``hist_parameters`` must include
+        ``bin_range``.
+
+        Parameters
+        ----------
+        input_dict : dict of {:class:`.Ensemble`: collections.Counter}
+            ensemble as key, and a counter mapping each trajectory
+            associated with that ensemble to its counter of time spent in
+            the ensemble (output of `steps_to_weighted_trajectories`)
+
+        Returns
+        -------
+        list (len 1) of dict of {:class:`.Ensemble`: :class:`.Histogram`}
+            histogram for each ensemble
+        """
+        hists = {}
+        for ens in self.ensembles:
+            hist = self.hists[ens].empty_copy()
+            if hist.left_bin_edges is None:
+                raise RuntimeError("Combining histograms requires a "
+                                   + "bin_range in the hist_parameters")
+            counter = input_dict[ens]
+            hist.histogram([self.f(traj) for traj in counter.keys()],
+                           list(counter.values()))
+            hists[ens] = hist
+        return [hists]
+
+    @staticmethod
+    def combine_intermediates(intermediates_1, intermediates_2):
+        """Combine intermediates by adding the histograms.
+
+        Parameters
+        ----------
+        intermediates_1 : list (len 1) of dict
+            first intermediates, from
+            :meth:`.intermediates_from_weighted_trajectories`
+        intermediates_2 : list (len 1) of dict
+            second intermediates
+
+        Returns
+        -------
+        list (len 1) of dict of {:class:`.Ensemble`: :class:`.Histogram`}
+            sum of the histograms for each ensemble
+        """
+        hists_1 = intermediates_1[0]
+        hists_2 = intermediates_2[0]
+        sum_histograms = paths.numerics.SparseHistogram.sum_histograms
+        return [{ens: sum_histograms([hists_1[ens], hists_2[ens]])
+                 for ens in hists_1}]
+
+    def calculate_from_intermediates(self, *intermediates):
+        """Histograms from the intermediates.
+
+        Parameters
+        ----------
+        intermediates :
+            output of :meth:`.intermediates`
+
+        Returns
+        -------
+        dict of {:class:`.Ensemble`: :class:`.numerics.Histogram`}
+            calculated histogram for each ensemble
+        """
+        return intermediates[0]
+
 
 class TISAnalysis(StorableNamedObject):
     """
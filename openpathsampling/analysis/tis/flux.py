@@ -283,6 +283,62 @@ class MinusMoveFlux(MultiEnsembleSamplingAnalyzer):
         flux_dicts = intermediates[0]
         return self.from_trajectory_transition_flux_dict(flux_dicts)
 
+    @staticmethod
+    def compact_intermediates(intermediates):
+        """Reduce the segments in the intermediates to their lengths.
+
+        The flux calculation only needs the lengths of the segments (see
+        :meth:`.TrajectorySegmentContainer.lengths_only`).
+
+        Parameters
+        ----------
+        intermediates : list (len 1) of dict
+            intermediates from :meth:`.intermediates`
+
+        Returns
+        -------
+        list (len 1) of dict of {(:class:`.Volume`, :class:`.Volume`): dict}
+            keys are (state, interface); values are dicts with keys 'in'
+            and 'out', mapping to the compacted
+            :class:`.TrajectorySegmentContainer`
+        """
+        flux_dicts = intermediates[0]
+        return [{flux_pair: {key: segments.lengths_only()
+                             for (key, segments) in flux_dict.items()}
+                 for (flux_pair, flux_dict) in flux_dicts.items()}]
+
+    @staticmethod
+    def combine_intermediates(intermediates_1, intermediates_2):
+        """Combine intermediates from two sets of steps.
+
+        The segments are reduced to their lengths (see
+        :meth:`.compact_intermediates`).
+
+        Parameters
+        ----------
+        intermediates_1 : list (len 1) of dict
+            first intermediates, from :meth:`.intermediates`
+        intermediates_2 : list (len 1) of dict
+            second intermediates
+
+        Returns
+        -------
+        list (len 1) of dict of {(:class:`.Volume`, :class:`.Volume`): dict}
+            keys are (state, interface); values are dicts with keys 'in'
+            and 'out', mapping to the combined
+            :class:`.TrajectorySegmentContainer`
+        """
+        flux_dicts_1 = intermediates_1[0]
+        flux_dicts_2 = intermediates_2[0]
+        combined = {}
+        for flux_pair in flux_dicts_1:
+            combined[flux_pair] = {
+                key: (flux_dicts_1[flux_pair][key]
+                      + flux_dicts_2[flux_pair][key])
+                for key in ['in', 'out']
+            }
+        return MinusMoveFlux.compact_intermediates([combined])
+
 
 class DictFlux(MultiEnsembleSamplingAnalyzer):
     """Pre-calculated flux, provided as a dict.
@@ -360,6 +416,19 @@ class DictFlux(MultiEnsembleSamplingAnalyzer):
         """
         return self.flux_dict
 
+    @staticmethod
+    def combine_intermediates(intermediates_1, intermediates_2):
+        """Combine intermediates from two sets of steps.
+
+        For :class:`.DictFlux`, the intermediates are always empty.
+
+        Returns
+        -------
+        list
+            empty list
+        """
+        return []
+
     @staticmethod
     def combine_results(result_1, result_2):
         """Combine two sets of results from this analysis.
@@ -68,7 +68,29 @@ class ConditionalTransitionProbability(MultiEnsembleSamplingAnalyzer):
             a given state. Value is the conditional transition probability
             for that state from that ensemble.
         """
-        ctp = {}
+        intermediates = self.intermediates_from_weighted_trajectories(
+            input_dict
+        )
+        return self.calculate_from_intermediates(*intermediates)
+
+    def intermediates_from_weighted_trajectories(self, input_dict):
+        """Calculate intermediates from a weighted trajectories dictionary.
+
+        Parameters
+        ----------
+        input_dict : dict of {:class:`.Ensemble`: collections.Counter}
+            ensemble as key, and a counter mapping each trajectory
+            associated with that ensemble to its counter of time spent in
+            the ensemble (output of `steps_to_weighted_trajectories`)
+
+        Returns
+        -------
+        list (len 1) of dict of {:class:`.Ensemble`: tuple}
+            for each ensemble, a 2-tuple of a ``collections.Counter`` of
+            the number of trajectories ending in each state, and the total
+            number of trajectories
+        """
+        counts = {}
         for ens in self.ensembles:
             acc = collections.Counter()
             n_try = sum(input_dict[ens].values())
@@ -79,7 +101,52 @@ class ConditionalTransitionProbability(MultiEnsembleSamplingAnalyzer):
                 local = collections.Counter({s: w for s in self.states
                                              if s(f)})
                 acc += local
+            counts[ens] = (acc, n_try)
+        return [counts]
+
+    @staticmethod
+    def combine_intermediates(intermediates_1, intermediates_2):
+        """Combine intermediates from two sets of steps.
+
+        Parameters
+        ----------
+        intermediates_1 : list (len 1) of dict
+            first intermediates, from
+            :meth:`.intermediates_from_weighted_trajectories`
+        intermediates_2 : list (len 1) of dict
+            second intermediates
 
+        Returns
+        -------
+        list (len 1) of dict of {:class:`.Ensemble`: tuple}
+            the summed counts for each ensemble
+        """
+        counts_1 = intermediates_1[0]
+        counts_2 = intermediates_2[0]
+        return [{ens: (counts_1[ens][0] + counts_2[ens][0],
+                       counts_1[ens][1] + counts_2[ens][1])
+                 for ens in counts_1}]
+
+    def calculate_from_intermediates(self, *intermediates):
+        """Perform the analysis, using intermediates as input.
+
+        Parameters
+        ----------
+        intermediates :
+            output of :meth:`.intermediates`
+
+        Returns
+        -------
+        dict of {:class:`.Ensemble`: {:class:`.Volume`: float}}
+            first key, an ensemble, selects the results from a given
+            sampling ensemble; second key, a volume, selects the value for
+            a given state. Value is the conditional transition probability
+            for that state from that ensemble.
+        """
+        counts = intermediates[0]
+        ctp = {}
+        for ens in self.ensembles:
+            (acc, n_try) = counts[ens]
             ctp[ens] = {s : float(acc[s]) / n_try for s in acc.keys()}
             # TODO: add logging to report here
         return ctp
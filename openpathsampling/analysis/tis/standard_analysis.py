@@ -1,14 +1,17 @@
+import os
+import pickle
 import collections
 import functools
 
 import openpathsampling as paths
-from openpathsampling.netcdfplus import StorableNamedObject
+from openpathsampling.netcdfplus import StorableNamedObject, StorableObject
 from openpathsampling.numerics import LookupFunction
 import pandas as pd
 import numpy as np
 
 from .core import (MultiEnsembleSamplingAnalyzer, TransitionDictResults,
-                   TISAnalysis, EnsembleHistogrammer)
+                   TISAnalysis, EnsembleHistogrammer, step_blocks,
+                   steps_to_weighted_trajectories)
 from .crossing_probability import (
     FullHistogramMaxLambdas, TotalCrossingProbability
 )
@@ -96,6 +99,48 @@ class StandardTransitionProbability(MultiEnsembleSamplingAnalyzer):
         # TODO: log things here
         return outermost_ctp * tcp_at_outermost
 
+# protocol 2 can be read by both Python 2 and 3
+_INTERMEDIATES_PICKLE_PROTOCOL = 2
+
+
+class _IntermediatesPickler(pickle.Pickler):
+    # ensembles and volumes are saved by UUID (as string, so that it is the
+    # same after loading with any protocol), and replaced by the objects of
+    # the analysis on loading
+    def persistent_id(self, obj):
+        if isinstance(obj, StorableObject):
+            return str(obj.__uuid__)
+        return None
+
+
+class _IntermediatesUnpickler(pickle.Unpickler):
+    def __init__(self, file, objects):
+        # pickle.Unpickler is a classic class on Python 2: no super()
+        pickle.Unpickler.__init__(self, file)
+        self.objects = {str(uuid): obj for (uuid, obj) in objects.items()}
+
+    def persistent_load(self, pid):
+        try:
+            return self.objects[pid]
+        except KeyError:
+            raise pickle.UnpicklingError(
+                "Saved intermediates refer to an object that is not part "
+                + "of this analysis (UUID " + str(pid) + ")"
+            )
+
+
+def _replace_file(source, target):
+    # atomically replace target by source, where the OS allows it
+    if hasattr(os, 'replace'):
+        os.replace(source, target)
+    else:  # pragma: no cover
+        # Python 2: rename replaces the target atomically on POSIX, but
+        # fails on Windows if the target exists
+        if os.name == 'nt' and os.path.isfile(target):
+            os.remove(target)
+        os.rename(source, target)
+
+
 class StandardTISAnalysis(TISAnalysis):
     """
     Standard TIS analysis: flux, TCP, CTP.
@@ -153,6 +198,9 @@ class StandardTISAnalysis(TISAnalysis):
         links the interface set to the method that will be used to combine
         individual ensembles into the total crossing probability function.
         Default is to use :class:`.WHAM`.
+
+    To re-analyze a simulation that is still running, use :meth:`.update`
+    with a ``filename``; later calls then only read the new steps.
     """
     def __init__(self, network, steps=None, flux_method=None, scheme=None,
                  ctp_method=None, max_lambda_calcs=None, combiners=None):
@@ -221,6 +269,7 @@ class StandardTISAnalysis(TISAnalysis):
         )
 
         self._progresser = paths.progress.SimpleProgress()
+        self._intermediates = None
 
         if steps is not None:
             self.calculate(steps)
@@ -264,6 +313,287 @@ class StandardTISAnalysis(TISAnalysis):
             leave = 'default'
         self._set_progress(progress, leave)
 
+    @property
+    def _max_lambda_calcs(self):
+        return [tcp_m.max_lambda_calc for tcp_m in self.tcp_methods.values()]
+
+    def calculate(self, steps, block_size=None):
+        """Perform the analysis, using `steps` as input.
+
+        Parameters
+        ----------
+        steps : iterable of :class:`.MCStep`
+            the steps to use as input for this analysis
+        block_size : int
+            if given, the steps are read once, in blocks of this many steps
+            (see :meth:`.intermediates`), so that only one block needs to
+            be in memory. Default (None) analyzes all steps at once.
+        """
+        if block_size is None:
+            self._intermediates = None
+            super(StandardTISAnalysis, self).calculate(steps)
+        else:
+            intermediates = self.intermediates(steps, block_size)
+            self.calculate_from_intermediates(intermediates)
+
+    def block_intermediates(self, steps):
+        """Calculate the intermediates of a single block of steps.
+
+        Unlike :meth:`.intermediates`, all steps are analyzed at once.
+
+        Parameters
+        ----------
+        steps : list of :class:`.MCStep`
+            the steps of the block
+
+        Returns
+        -------
+        dict
+            intermediates of the block, as returned by
+            :meth:`.intermediates`
+        """
+        weighted_trajs = steps_to_weighted_trajectories(
+            steps,
+            self.network.sampling_ensembles
+        )
+        flux_m = self.flux_method
+        ctp_m = self.ctp_method
+        return {
+            'n_steps': len(steps),
+            'mccycle': steps[-1].mccycle,
+            'flux': flux_m.compact_intermediates(flux_m.intermediates(steps)),
+            'max_lambda': [
+                calc.compact_intermediates(
+                    calc.intermediates_from_weighted_trajectories(
+                        weighted_trajs
+                    )
+                )
+                for calc in self._max_lambda_calcs
+            ],
+            'ctp': ctp_m.compact_intermediates(
+                ctp_m.intermediates_from_weighted_trajectories(weighted_trajs)
+            )
+        }
+
+    def _accumulate_intermediates(self, steps, block_size,
+                                  intermediates=None, start=0):
+        # the flux method would otherwise show progress for every block
+        flux_progress = self.flux_method.progress
+        self.flux_method.progress = 'silent'
+        try:
+            blocks = self.progress(step_blocks(steps, block_size, start),
+                                   desc="Blocks")
+            for block in blocks:
+                block = list(block)
+                if not block:
+                    continue
+                block_intermediates = self.block_intermediates(block)
+                if intermediates is None:
+                    intermediates = block_intermediates
+                else:
+                    intermediates = self.combine_intermediates(
+                        intermediates, block_intermediates
+                    )
+        finally:
+            self.flux_method.progress = flux_progress
+        return intermediates
+
+    def intermediates(self, steps, block_size=None):
+        """Calculate intermediates, using `steps` as input.
+
+        The steps are read in a single pass, one block at a time. The
+        intermediates of each block are combined with the previous blocks
+        (see :meth:`.combine_intermediates`), so the memory use depends on
+        the block size, not on the number of steps. The max lambda
+        histograms must have a fixed ``bin_range`` for this.
+
+        Parameters
+        ----------
+        steps : iterable of :class:`.MCStep`
+            the steps to use as input for this analysis
+        block_size : int
+            number of steps per block; default (None) uses a single block
+
+        Returns
+        -------
+        dict
+            intermediates for the flux ('flux'), the max lambda histograms
+            ('max_lambda', a list with an entry for each sampling
+            transition), and the conditional transition probability
+            ('ctp'), along with the number of steps analyzed ('n_steps')
+            and the MC cycle of the last step ('mccycle')
+        """
+        intermediates = self._accumulate_intermediates(steps, block_size)
+        if intermediates is None:
+            raise RuntimeError("No steps to analyze")
+        return intermediates
+
+    def combine_intermediates(self, intermediates_1, intermediates_2):
+        """Combine the intermediates from two sets of steps.
+
+        Parameters
+        ----------
+        intermediates_1 : dict
+            first intermediates, from :meth:`.intermediates`
+        intermediates_2 : dict
+            second intermediates, from :meth:`.intermediates`
+
+        Returns
+        -------
+        dict
+            intermediates for the steps of both inputs
+        """
+        max_lambda = [
+            calc.combine_intermediates(calc_1, calc_2)
+            for (calc, calc_1, calc_2) in zip(self._max_lambda_calcs,
+                                              intermediates_1['max_lambda'],
+                                              intermediates_2['max_lambda'])
+        ]
+        return {
+            'n_steps': intermediates_1['n_steps'] + intermediates_2['n_steps'],
+            'mccycle': intermediates_2['mccycle'],
+            'flux': self.flux_method.combine_intermediates(
+                intermediates_1['flux'], intermediates_2['flux']
+            ),
+            'max_lambda': max_lambda,
+            'ctp': self.ctp_method.combine_intermediates(
+                intermediates_1['ctp'], intermediates_2['ctp']
+            )
+        }
+
+    def calculate_from_intermediates(self, intermediates):
+        """Perform the analysis, using intermediates as input.
+
+        Parameters
+        ----------
+        intermediates : dict
+            output of :meth:`.intermediates`
+
+        Returns
+        -------
+        dict
+            dictionary with all the results
+        """
+        self._intermediates = intermediates
+        self.results = {}
+        self.results['flux'] = self.flux_method.calculate_from_intermediates(
+            *intermediates['flux']
+        )
+        max_lambda_hists = {}
+        for (calc, calc_intermediates) in zip(self._max_lambda_calcs,
+                                              intermediates['max_lambda']):
+            max_lambda_hists.update(
+                calc.calculate_from_intermediates(*calc_intermediates)
+            )
+        ctps = self.ctp_method.calculate_from_intermediates(
+            *intermediates['ctp']
+        )
+        return self._results_from_histograms(max_lambda_hists, ctps)
+
+    def update(self, steps, block_size=None, filename=None):
+        """Update the analysis with the steps that were not analyzed yet.
+
+        The intermediates of the steps analyzed before (by
+        :meth:`.calculate` with a ``block_size``, by :meth:`.update`, or
+        from the file) are kept, and only the new steps are read. The
+        ``steps`` must be the same sequence as before, with new steps at the
+        end (e.g., ``storage.steps`` of a simulation that is still
+        running).
+
+        Parameters
+        ----------
+        steps : iterable of :class:`.MCStep`
+            all steps, including those that were already analyzed
+        block_size : int
+            number of steps per block (see :meth:`.intermediates`)
+        filename : str
+            if given, the intermediates are loaded from this file (if it
+            exists and nothing was analyzed yet), and saved to it after the
+            update; see :meth:`.save_intermediates`
+
+        Returns
+        -------
+        dict
+            dictionary with all the results
+        """
+        if (filename is not None and self._intermediates is None
+                and os.path.exists(filename)):
+            self.load_intermediates(filename)
+
+        previous = self._intermediates
+        start = 0
+        if previous is not None:
+            start = previous['n_steps']
+            if hasattr(steps, '__len__') and hasattr(steps, '__getitem__'):
+                if (len(steps) < start
+                        or steps[start - 1].mccycle != previous['mccycle']):
+                    raise RuntimeError("Steps do not continue the steps "
+                                       + "that were already analyzed")
+
+        intermediates = self._accumulate_intermediates(steps, block_size,
+                                                       previous, start)
+        if intermediates is None:
+            raise RuntimeError("No steps to analyze")
+        results = self.calculate_from_intermediates(intermediates)
+        if filename is not None:
+            self.save_intermediates(filename)
+        return results
+
+    def _analysis_objects(self):
+        # objects that can be keys in the intermediates, by UUID
+        objects = set(self.network.sampling_ensembles)
+        objects.update(self.network.all_states)
+        for transition in self.network.sampling_transitions:
+            objects.update(transition.interfaces.volumes)
+        objects.update(self.ctp_method.ensembles)
+        objects.update(self.ctp_method.states)
+        for flux_pair in getattr(self.flux_method, 'flux_pairs', []):
+            objects.update(flux_pair)
+        return {obj.__uuid__: obj for obj in objects}
+
+    def save_intermediates(self, filename):
+        """Save the intermediates of the analyzed steps to a file.
+
+        Ensembles and volumes are saved by UUID, so the file can only be
+        loaded by an analysis of the same network. The intermediates are
+        written to a temporary file, which then replaces the file
+        atomically (except on Windows with Python 2), so an interrupted
+        save keeps the previous file.
+
+        Parameters
+        ----------
+        filename : str
+            name of the file to write
+        """
+        if self._intermediates is None:
+            raise RuntimeError("No intermediates to save; use calculate "
+                               + "with a block_size or update first")
+        tmp_filename = filename + ".tmp"
+        with open(tmp_filename, 'wb') as f:
+            pickler = _IntermediatesPickler(
+                f, _INTERMEDIATES_PICKLE_PROTOCOL
+            )
+            pickler.dump(self._intermediates)
+        _replace_file(tmp_filename, filename)
+
+    def load_intermediates(self, filename):
+        """Load intermediates from a file, and calculate the results.
+
+        Parameters
+        ----------
+        filename : str
+            file written by :meth:`.save_intermediates`
+
+        Returns
+        -------
+        dict
+            dictionary with all the results
+        """
+        with open(filename, 'rb') as f:
+            unpickler = _IntermediatesUnpickler(f, self._analysis_objects())
+            intermediates = unpickler.load()
+        return self.calculate_from_intermediates(intermediates)
+
     def from_weighted_trajectories(self, input_dict):
         """Calculate results from weighted trajectories dictionary.
 
@@ -280,14 +610,19 @@ class StandardTISAnalysis(TISAnalysis):
             dictionary with all the results
         """
         # calculate the max_lambda hists
-        max_lambda_calcs = [tcp_m.max_lambda_calc
-                            for tcp_m in self.tcp_methods.values()]
         max_lambda_hists = {}
         label = "Crossing probability"
-        for calc in self.progress(max_lambda_calcs, desc=label):
+        for calc in self.progress(self._max_lambda_calcs, desc=label):
             calc_results = calc.from_weighted_trajectories(input_dict)
             # TODO: change this to a 2D mapping, CV and ensemble
             max_lambda_hists.update(calc_results)
+
+        ctps = self.ctp_method.from_weighted_trajectories(input_dict)
+        return self._results_from_histograms(max_lambda_hists, ctps)
+
+    def _results_from_histograms(self, max_lambda_hists, ctps):
+        # everything after the max lambda histograms and the CTPs; the flux
+        # must already be in the results
         self.results['max_lambda'] = max_lambda_hists
 
         # calculate the TCPs
@@ -308,8 +643,6 @@ class StandardTISAnalysis(TISAnalysis):
         )
         self.results['total_crossing_probability'] = tcps
 
-        # calculate the CTPs
-        ctps = self.ctp_method.from_weighted_trajectories(input_dict)
         self.results['conditional_transition_probability'] = ctps
 
         # calculate the transition probability from existing TCP, CTP
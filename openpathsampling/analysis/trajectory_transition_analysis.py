@@ -40,6 +40,23 @@ class TrajectorySegmentContainer(object):
             # TODO: this might become a logger.warn
         return np.array([len(seg)*self.dt for seg in self._segments])
 
+    def lengths_only(self):
+        """Container with the lengths of the segments, without the frames.
+
+        The segments are replaced by ranges of the same length, so
+        :attr:`.n_frames` and :attr:`.times` are unchanged, but the
+        trajectories (and their snapshots) are no longer referenced. This
+        keeps the memory use low when accumulating results over many steps.
+
+        Returns
+        -------
+        :class:`.TrajectorySegmentContainer`
+            container with the same segment lengths and dt
+        """
+        return TrajectorySegmentContainer(
+            [range(len(seg)) for seg in self._segments], self.dt
+        )
+
     def __add__(self, other):
         if self.dt != other.dt:
             raise RuntimeError(
@@ -1,3 +1,5 @@
+import numpy as np
+
 import openpathsampling as paths
 import openpathsampling.netcdfplus.chaindict as cd
 from openpathsampling.integration_tools import md, error_if_no_mdtraj
@@ -391,6 +393,68 @@ class CoordinateFunctionCV(FunctionCV):
         return dct
 
 
+class CoordinateArrayFunctionCV(CoordinateFunctionCV):
+    """Make ``CollectiveVariable`` from ``f`` that acts on stacked coordinates
+
+    Instead of calling ``f`` once per snapshot, all snapshots that are not
+    yet in the cache are stacked into a single coordinate array of shape
+    ``(n_frames, n_atoms, n_spatial)`` (the same array as
+    ``trajectory.xyz``) and ``f(xyz, **kwargs)`` is called once. The
+    function must return one value per frame, i.e. an array with
+    ``n_frames`` as its first dimension. The results are stored per
+    snapshot in the cache like for any other CV.
+
+    Examples
+    --------
+    >>> def x_of_atom(xyz, atom):
+    >>>     return xyz[:, atom, 0]
+    >>> cv_x = CoordinateArrayFunctionCV("x", x_of_atom, atom=0)
+    >>> cv_x(trajectory)  # one call to x_of_atom for the whole trajectory
+    """
+
+    def __init__(
+            self,
+            name,
+            f,
+            cv_scalarize_numpy_singletons=False,
+            **kwargs
+    ):
+        """
+        Parameters
+        ----------
+        name : str
+        f : (callable) function
+            the function to be used. Its first argument is a numpy array of
+            shape ``(n_frames, n_atoms, n_spatial)``
+        cv_scalarize_numpy_singletons
+        **kwargs
+
+        See also
+        --------
+        :class:`openpathsampling.collectivevariable.CallableCV`
+
+        """
+
+        super(CoordinateArrayFunctionCV, self).__init__(
+            name,
+            f,
+            cv_requires_lists=True,
+            cv_wrap_numpy_array=True,
+            cv_scalarize_numpy_singletons=cv_scalarize_numpy_singletons,
+            **kwargs
+        )
+
+    def _eval(self, items):
+        xyz = paths.Trajectory(items).xyz
+        return np.asarray(self.cv_callable(xyz, **self.kwargs))
+
+    def to_dict(self):
+        dct = super(CoordinateArrayFunctionCV, self).to_dict()
+        del dct['cv_requires_lists']
+        del dct['cv_wrap_numpy_array']
+        return dct
+
+
 class GeneratorCV(CallableCV):
     """Turn a callable class or function generating a callable object into a CV
 
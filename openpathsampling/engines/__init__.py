@@ -1,5 +1,5 @@
 from .snapshot import BaseSnapshot, SnapshotFactory, SnapshotDescriptor
-from .trajectory import Trajectory
+from .trajectory import Trajectory, PackedTrajectory
 
 from .topology import Topology, MDTrajTopology
 
@@ -10,6 +10,8 @@ from .dynamics_engine import (
     EngineNaNError, EngineMaxLengthError)
 
 from .external_engine import ExternalEngine
+from .frame_notifiers import FrameNotifier, InotifyFrameNotifier
+from .engine_pool import EnginePool
 
 from . import external_snapshots
 
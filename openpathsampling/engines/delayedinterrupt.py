@@ -1,5 +1,14 @@
 import signal
 import logging
+import threading
+
+
+def _in_main_thread():
+    if hasattr(threading, 'main_thread'):
+        return threading.current_thread() is threading.main_thread()
+    else:
+        # Python 2
+        return threading.current_thread().name == 'MainThread'
 
 
 # class based on: http://stackoverflow.com/a/21919644/487556
@@ -14,7 +23,12 @@ class DelayedInterrupt(object):
     def __enter__(self):
         self.signal_received = {}
         self.old_handlers = {}
-        for sig in self.sigs:
+        # signal handlers can only be set in the main thread; signals are
+        # delivered to the main thread anyway
+        self.active_sigs = self.sigs
+        if not _in_main_thread():
+            self.active_sigs = []
+        for sig in self.active_sigs:
             self.signal_received[sig] = False
             self.old_handlers[sig] = signal.getsignal(sig)
 
@@ -28,7 +42,7 @@ class DelayedInterrupt(object):
             signal.signal(sig, handler)
 
     def __exit__(self, type, value, traceback):
-        for sig in self.sigs:
+        for sig in self.active_sigs:
             signal.signal(sig, self.old_handlers[sig])
             if self.signal_received[sig] and self.old_handlers[sig]:
                 self.old_handlers[sig](*self.signal_received[sig])
@@ -0,0 +1,258 @@
+"""
+Run several trajectories of an external engine at the same time.
+
+An :class:`.ExternalEngine` spends most of its time waiting for the
+subprocess to write frames. Trajectories that don't depend on each other
+(like the two halves of a two-way shooting move) can therefore run at the
+same time, each in its own thread, with its own copy of the engine.
+"""
+
+import logging
+import sys
+import threading
+
+from future.utils import raise_
+
+from openpathsampling.netcdfplus import StorableObject
+from .trajectory import Trajectory
+
+logger = logging.getLogger(__name__)
+
+
+class DeferredCondition(object):
+    """Running condition that can be decided after the run has started.
+
+    Until :meth:`.resolve` is called, the trajectory is always allowed to
+    continue, up to ``max_length`` frames; then the generating thread
+    blocks. After :meth:`.resolve`, every earlier length of the trajectory
+    is checked with the actual condition, in order, as a serial run would
+    have done (see :meth:`.replay`). The length where the actual condition
+    first failed is stored in :attr:`.stop_length`, and the generated
+    trajectory must be cut to that length.
+
+    Parameters
+    ----------
+    max_length : int or None
+        maximum length of the trajectory before the condition is resolved;
+        None or 0 for no maximum
+    condition : function(trajectory, trusted) or None
+        the actual condition, if it is already known
+
+    Attributes
+    ----------
+    stop_length : int or None
+        length of the trajectory at which the actual condition returned
+        False for the first time, if that was found while replaying
+    """
+    def __init__(self, max_length=None, condition=None):
+        self.max_length = max_length
+        self.stop_length = None
+        self._condition = None
+        self._aborted = False
+        self._n_deferred = 0
+        self._ready = threading.Event()
+        if condition is not None:
+            self.resolve(condition)
+
+    def resolve(self, condition):
+        """Set the actual running condition"""
+        self._condition = condition
+        self._ready.set()
+
+    def abort(self):
+        """Stop the trajectory at the next check"""
+        self._aborted = True
+        self._ready.set()
+
+    @property
+    def aborted(self):
+        return self._aborted
+
+    def replay(self, trajectory):
+        """Check the lengths that were allowed before the condition was set.
+
+        Parameters
+        ----------
+        trajectory : :class:`.Trajectory`
+            the trajectory generated so far (at least as long as the
+            number of deferred checks)
+
+        Returns
+        -------
+        int or None
+            :attr:`.stop_length`
+        """
+        n_deferred, self._n_deferred = self._n_deferred, 0
+        # grow one trajectory frame by frame, as the engine would have
+        partial = Trajectory()
+        for length in range(1, n_deferred + 1):
+            partial.append(trajectory[length - 1])
+            if not self._condition(partial, trusted=(length > 1)):
+                self.stop_length = length
+                break
+        return self.stop_length
+
+    def __call__(self, trajectory, trusted=False):
+        if not self._ready.is_set():
+            if not self.max_length or len(trajectory) < self.max_length:
+                self._n_deferred = len(trajectory)
+                return True
+            self._ready.wait()
+
+        if self._aborted:
+            return False
+
+        if self._n_deferred and self.replay(trajectory) is not None:
+            return False
+
+        return self._condition(trajectory, trusted)
+
+
+_thread_engines = threading.local()
+
+
+def thread_engine(engine):
+    """The engine to use for ``engine`` in the current thread.
+
+    In tasks run by :meth:`.EnginePool.run_task`, engines are replaced by
+    the copies reserved for that task; otherwise this is ``engine`` itself.
+    """
+    copies = getattr(_thread_engines, 'copies', None)
+    if copies and engine is not None:
+        return copies.get(engine.__uuid__, engine)
+    return engine
+
+
+class _Task(threading.Thread):
+    """Thread running a function with the given engine copies"""
+    def __init__(self, pool, func, args, copies):
+        super(_Task, self).__init__(name="EnginePool-task")
+        self.daemon = True
+        self.pool = pool
+        self.func = func
+        self.args = args
+        self.copies = copies
+        self._result = None
+        self._exc_info = None
+
+    def run(self):
+        _thread_engines.copies = self.copies
+        try:
+            self._result = self.func(*self.args)
+        except BaseException:
+            self._exc_info = sys.exc_info()
+        finally:
+            _thread_engines.copies = None
+            self.pool._release(self.copies)
+
+    def result(self):
+        """Wait for the task; re-raises errors from the task"""
+        self.join()
+        if self._exc_info is not None:
+            raise_(*self._exc_info)
+        return self._result
+
+
+class EnginePool(StorableObject):
+    """Generate trajectories of external engines at the same time.
+
+    Each trajectory runs in a thread, using a copy of the engine made with
+    ``engine.concurrent_copy()``, so that the subprocesses and their files
+    are independent. The copies have the same UUID as the original engine,
+    so the snapshots are stored as coming from the original engine.
+
+    Parameters
+    ----------
+    max_workers : int
+        maximum number of tasks running at the same time; further calls to
+        :meth:`.submit` or :meth:`.run_task` block until a task finishes
+
+    Notes
+    -----
+    Tasks must not use the same pool to start other tasks: if all workers
+    are busy, this blocks forever. Use a separate pool instead.
+
+    Pools are saved in their own store and referenced by UUID, so movers
+    that share a pool still share it after loading.
+    """
+    def __init__(self, max_workers=2):
+        super(EnginePool, self).__init__()
+        self.max_workers = max_workers
+        self._slots = threading.Semaphore(max_workers)
+        self._lock = threading.Lock()
+        self._idle = {}
+
+    def to_dict(self):
+        return {'max_workers': self.max_workers}
+
+    @staticmethod
+    def supports(engine):
+        """Whether trajectories of this engine can run concurrently"""
+        return hasattr(engine, 'concurrent_copy')
+
+    def _acquire(self, engines):
+        self._slots.acquire()
+        copies = {}
+        try:
+            for engine in engines:
+                if engine.__uuid__ in copies:
+                    continue
+                with self._lock:
+                    idle = self._idle.setdefault(engine.__uuid__, [])
+                    engine_copy = idle.pop() if idle else None
+                if engine_copy is None:
+                    engine_copy = engine.concurrent_copy()
+                copies[engine.__uuid__] = engine_copy
+        except BaseException:
+            self._release(copies)
+            raise
+        return copies
+
+    def _release(self, copies):
+        with self._lock:
+            for uuid, engine_copy in copies.items():
+                self._idle.setdefault(uuid, []).append(engine_copy)
+        self._slots.release()
+
+    def run_task(self, func, args=(), engines=()):
+        """Run ``func(*args)`` in a worker thread.
+
+        While the task runs, :func:`.thread_engine` gives copies of the
+        ``engines`` in the worker thread (e.g., in
+        :attr:`.EngineMover.engine`).
+
+        Parameters
+        ----------
+        func : callable
+            the task
+        args : tuple
+            arguments for ``func``
+        engines : list of :class:`.DynamicsEngine`
+            engines to replace by copies; all must be :meth:`.supports`-ed
+
+        Returns
+        -------
+        task
+            object with a method ``result()``, which waits for and returns
+            the result of ``func`` (or raises its error)
+        """
+        copies = self._acquire(engines)
+        task = _Task(self, func, args, copies)
+        task.start()
+        return task
+
+    def submit(self, engine, initial, running=None, direction=+1):
+        """Start generating a trajectory.
+
+        Parameters are as in :meth:`.DynamicsEngine.generate`.
+
+        Returns
+        -------
+        task
+            object with a method ``result()``, which waits for and returns
+            the trajectory (or raises the error of the engine)
+        """
+        def generate():
+            return thread_engine(engine).generate(initial, running=running,
+                                                  direction=direction)
+        return self.run_task(generate, engines=[engine])
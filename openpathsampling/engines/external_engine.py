@@ -2,6 +2,8 @@ from openpathsampling.netcdfplus import StorableNamedObject
 from openpathsampling.engines.dynamics_engine import DynamicsEngine
 from openpathsampling.engines.snapshot import BaseSnapshot, SnapshotDescriptor
 from openpathsampling.engines.toy import ToySnapshot
+from openpathsampling.engines.frame_notifiers import default_frame_notifier
+from openpathsampling.engines.delayedinterrupt import EmptyContext
 import numpy as np
 import os
 
@@ -10,6 +12,7 @@ import logging
 import psutil
 import signal
 import shlex
+import threading
 import time
 
 import sys
@@ -63,17 +66,25 @@ class FilenameSetter(StorableNamedObject):
     # the weird use of this as the base class is because engine options has
     # some weird type testing that requires replace object to be instances
     # of the default
+
+    # concurrent copies of an engine (see EnginePool) share the setter, so
+    # the counter is updated under a lock; a class attribute, because
+    # instances are copied and pickled
+    _lock = threading.Lock()
+
     def __init__(self, count=0):
         super(FilenameSetter, self).__init__()
         self.count = count
 
     def __call__(self):
-        retval = self.count
-        self.count += 1
+        with self._lock:
+            retval = self.count
+            self.count += 1
         return retval
 
     def reset(self, count=0):
-        self.count = count
+        with self._lock:
+            self.count = count
 
 
 class RandomStringFilenames(FilenameSetter):
@@ -131,6 +142,12 @@ class _InternalizedEngineProxy(DynamicsEngine):
 class ExternalEngine(DynamicsEngine):
     """
     Generic object to handle arbitrary external engines. Subclass to use.
+
+    While waiting for the next frame, the engine uses the option
+    ``frame_notifier`` (a :class:`.FrameNotifier`). If this is None (the
+    default), inotify is used on Linux, and the file is polled otherwise.
+    When polling, the sleep time is optimized to the speed of the engine if
+    ``auto_optimize_sleep`` is True.
     """
 
     _default_options = {
@@ -144,6 +161,7 @@ class ExternalEngine(DynamicsEngine):
         'n_atoms' : 1,
         'n_poll_per_step': 1,
         'filename_setter': FilenameSetter(),
+        'frame_notifier': None,
     }
 
     killsig = signal.SIGTERM
@@ -160,6 +178,7 @@ class ExternalEngine(DynamicsEngine):
         self._traj_num = -1
         self._current_snapshot = template
         self.n_frames_since_start = None
+        self._frame_watch = None
         self.internalized_engine = _InternalizedEngineProxy(self)
 
     def to_dict(self):
@@ -192,8 +211,36 @@ class ExternalEngine(DynamicsEngine):
     def current_snapshot(self, snap):
         self._current_snapshot = snap
 
+    def concurrent_copy(self):
+        """Copy of this engine that can run at the same time as this one.
+
+        The copy shares the options (and the UUID) with this engine, but
+        has its own subprocess and its own files. It is meant to be run
+        in a worker thread (see :class:`.EnginePool`); since signal handlers
+        can only be set in the main thread, the copy does not delay
+        keyboard interrupts.
+
+        The filenames of concurrent trajectories must not collide, so the
+        ``filename_setter`` must give a new name for each trajectory.
+        """
+        # not copy.copy: DynamicsEngine.__getattr__ fails on an empty object
+        new = self.__class__.__new__(self.__class__)
+        new.__dict__.update(self.__dict__)
+        new.interrupter = EmptyContext
+        new.proc = None
+        new._frame_watch = None
+        return new
+
+    def _wait_for_frame(self, timeout):
+        """Wait until the output file changes, or at most ``timeout`` s"""
+        if self._frame_watch is None:
+            time.sleep(timeout)
+        else:
+            self._frame_watch.wait(timeout)
+
     def generate_next_frame(self):
         # should be completely general
+        event_driven = getattr(self._frame_watch, 'event_driven', False)
         next_frame_found = False
         logger.debug("Looking for frame %d", self.n_frames_since_start+1)
         while not next_frame_found:
@@ -212,12 +259,16 @@ class ExternalEngine(DynamicsEngine):
             if next_frame == "partial":
                 if self.proc.poll() is not None:
                     raise RuntimeError("External engine died unexpectedly")
-                time.sleep(0.001) # wait a millisec and rerun
+                if event_driven:
+                    # the rest of the frame will trigger an event
+                    self._wait_for_frame(self.sleep_ms/1000.0)
+                else:
+                    time.sleep(0.001) # wait a millisec and rerun
             elif next_frame is None:
                 if self.proc.poll() is not None:
                     raise RuntimeError("External engine died unexpectedly")
-                logger.debug("Sleeping for {:.2f}ms".format(self.sleep_ms))
-                time.sleep(self.sleep_ms/1000.0)
+                logger.debug("Waiting up to {:.2f}ms".format(self.sleep_ms))
+                self._wait_for_frame(self.sleep_ms/1000.0)
             elif isinstance(next_frame, BaseSnapshot): # success
                 self.n_frames_since_start += 1
                 logger.debug("Found frame %d", self.n_frames_since_start)
@@ -226,7 +277,10 @@ class ExternalEngine(DynamicsEngine):
                 self.frame_num += 1
             else:  # pragma: no cover
                 raise RuntimeError("Strange return value from read_next_frame_from_file")
-            if self.auto_optimize_sleep and self.n_frames_since_start > 0:
+            # with events, sleep_ms only sets how often we check that the
+            # process is alive, so it is not optimized
+            if (self.auto_optimize_sleep and not event_driven
+                    and self.n_frames_since_start > 0):
                 n_poll_per_step = self.options['n_poll_per_step']
                 elapsed = now - self.start_time
                 time_per_step = elapsed / self.n_frames_since_start
@@ -244,6 +298,14 @@ class ExternalEngine(DynamicsEngine):
         self.write_frame_to_file(self.input_file, self.current_snapshot, "w")
         self.prepare()
 
+        # start watching before the process can write the first frame
+        notifier = self.options['frame_notifier']
+        if notifier is None:
+            notifier = default_frame_notifier()
+        if self._frame_watch is not None:
+            self._frame_watch.close()
+        self._frame_watch = notifier.watch(self.output_file)
+
         cmd = shlex.split(self.engine_command())
         self.start_time = time.time()
         try:
@@ -272,6 +334,9 @@ class ExternalEngine(DynamicsEngine):
             logger.debug("Zombie should be dead")
         except psutil.NoSuchProcess:
             logger.debug("Tried to kill process, but it was already dead")
+        if self._frame_watch is not None:
+            self._frame_watch.close()
+            self._frame_watch = None
         self.cleanup()
 
     # FROM HERE ARE THE FUNCTIONS TO OVERRIDE IN SUBCLASSES:
@@ -29,6 +29,9 @@ def netcdfplus_init(store):
     # its own kinetics store
     kinetic_store.set_dimension_prefix_store(store)
 
+    # compress the container variables like those of the snapshot store
+    kinetic_store.compression = store.compression
+
     store.storage.create_store(name, kinetic_store, False)
     store.create_variable(
         'kinetics', 'lazyobj.' + name,
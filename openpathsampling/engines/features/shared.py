@@ -18,13 +18,18 @@ def unmask_quantity(quantity):
     Returns
     -------
     simtk.unit.Quantity
-        wraps a regular numpy array, not a masked array
+        wraps a regular numpy array, not a masked array. Read-only arrays,
+        e.g. views of memory-mapped coordinates, are returned without a copy
     """
     try:
         q_unit = quantity.unit
     except AttributeError:
         # no units
         return quantity
+    value = quantity._value
+    if isinstance(value, np.ndarray) and not value.flags.writeable \
+            and not isinstance(value, np.ma.MaskedArray):
+        return quantity
     return np.array(quantity.value_in_unit(q_unit)) * q_unit
 
 
@@ -118,8 +123,10 @@ class StaticContainerStore(ObjectStore):
         if not np.count_nonzero(box_vectors):
             box_vectors = None
 
-        configuration = StaticContainer(coordinates=coordinates,
+        configuration = StaticContainer(coordinates=None,
                                         box_vectors=box_vectors)
+        # no deepcopy, so memory-mapped coordinates stay zero-copy views
+        configuration.coordinates = coordinates
 
         return configuration
 
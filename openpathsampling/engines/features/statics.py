@@ -35,6 +35,9 @@ def netcdfplus_init(store):
 
     static_store.set_dimension_prefix_store(store)
 
+    # compress the container variables like those of the snapshot store
+    static_store.compression = store.compression
+
     store.storage.create_store(name, static_store, False)
 
     store.create_variable(
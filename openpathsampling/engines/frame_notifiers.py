@@ -0,0 +1,201 @@
+"""
+Ways for an :class:`.ExternalEngine` to wait for new frames.
+
+The external engine writes frames to a file, and OPS must wait until the
+next frame is available. A :class:`.FrameNotifier` decides how this waiting
+is done: either by sleeping for a fixed time (polling, the default on
+systems without inotify) or by blocking until the file actually changes
+(:class:`.InotifyFrameNotifier`, Linux only).
+"""
+
+import ctypes
+import ctypes.util
+import errno
+import logging
+import os
+import select
+import struct
+import sys
+import time
+
+from openpathsampling.netcdfplus import StorableNamedObject
+
+logger = logging.getLogger(__name__)
+
+
+class FrameNotifier(StorableNamedObject):
+    """Wait for new frames by sleeping (polling the file).
+
+    This is the fallback used if no event-based notifier is available.
+
+    Attributes
+    ----------
+    event_driven : bool
+        whether :meth:`.wait` returns as soon as the file changes. If
+        False, :meth:`.wait` always sleeps for the full timeout, and the
+        engine tunes the timeout to the speed of the external engine.
+    """
+    event_driven = False
+
+    def __init__(self):
+        super(FrameNotifier, self).__init__()
+
+    def watch(self, filename):
+        """Start watching a file for changes.
+
+        The returned watch must be created before the process writing the
+        file is started, so that no change is missed.
+
+        Parameters
+        ----------
+        filename : str
+            the file to watch; it does not need to exist yet
+
+        Returns
+        -------
+        watch
+            object with methods ``wait(timeout)`` and ``close()``, and the
+            attribute ``event_driven``
+        """
+        return _SleepWatch()
+
+
+class _SleepWatch(object):
+    event_driven = False
+
+    def wait(self, timeout):
+        """Sleep for ``timeout`` seconds. Returns False (no event seen)."""
+        time.sleep(timeout)
+        return False
+
+    def close(self):
+        pass
+
+
+# constants from <sys/inotify.h>
+_IN_MODIFY = 0x00000002
+_IN_CLOSE_WRITE = 0x00000008
+_IN_MOVED_TO = 0x00000080
+_IN_CREATE = 0x00000100
+_IN_NONBLOCK = 0o4000
+_IN_CLOEXEC = 0o2000000
+_EVENT_HEADER = struct.Struct("iIII")  # wd, mask, cookie, len
+
+
+def _load_libc_inotify():
+    if not sys.platform.startswith('linux'):
+        return None
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6',
+                           use_errno=True)
+        _ = libc.inotify_init1, libc.inotify_add_watch
+    except (OSError, AttributeError):  # pragma: no cover
+        return None
+    return libc
+
+
+_libc = _load_libc_inotify()
+
+
+class InotifyFrameNotifier(FrameNotifier):
+    """Wait for new frames using Linux inotify.
+
+    :meth:`.wait` blocks until the watched file is created, written to, or
+    moved into place, or until the timeout expires (the timeout is used to
+    check whether the external engine is still alive). This removes the
+    polling latency and the CPU use of the sleep loop.
+
+    If inotify can not be used for a file (e.g., the system limit on
+    watches is reached), this falls back to sleeping.
+    """
+    event_driven = True
+
+    def __init__(self):
+        super(InotifyFrameNotifier, self).__init__()
+
+    @staticmethod
+    def is_available():
+        """bool : whether inotify can be used on this system"""
+        return _libc is not None
+
+    def watch(self, filename):
+        if not self.is_available():
+            return _SleepWatch()
+        try:
+            return _InotifyWatch(filename)
+        except OSError as e:
+            logger.warning("Unable to use inotify for %s (%s); falling "
+                           "back to polling", filename, e)
+            return _SleepWatch()
+
+
+class _InotifyWatch(object):
+    event_driven = True
+
+    def __init__(self, filename):
+        # watch the directory: the file may not exist yet, and may be
+        # replaced by a new file with the same name
+        path = os.path.abspath(filename)
+        self.directory, basename = os.path.split(path)
+        self.basename = basename.encode()
+        self._fd = _libc.inotify_init1(_IN_NONBLOCK | _IN_CLOEXEC)
+        if self._fd < 0:
+            err = ctypes.get_errno()
+            raise OSError(err, os.strerror(err))
+        mask = _IN_MODIFY | _IN_CLOSE_WRITE | _IN_MOVED_TO | _IN_CREATE
+        wd = _libc.inotify_add_watch(self._fd, self.directory.encode(),
+                                     mask)
+        if wd < 0:
+            err = ctypes.get_errno()
+            os.close(self._fd)
+            self._fd = None
+            raise OSError(err, os.strerror(err))
+
+    def _read_events(self):
+        """Read all pending events; True if one was for our file"""
+        found = False
+        while True:
+            try:
+                data = os.read(self._fd, 65536)
+            except OSError as e:
+                if e.errno in (errno.EAGAIN, errno.EWOULDBLOCK):
+                    return found
+                raise  # pragma: no cover
+            offset = 0
+            while offset < len(data):
+                _, _, _, length = _EVENT_HEADER.unpack_from(data, offset)
+                offset += _EVENT_HEADER.size
+                name = data[offset:offset + length].rstrip(b'\0')
+                offset += length
+                found = found or name == self.basename
+
+    def wait(self, timeout):
+        """Block until the file changes, or for at most ``timeout`` seconds.
+
+        Changes that happened since the last call return immediately.
+
+        Returns
+        -------
+        bool
+            True if the file changed, False if the timeout expired
+        """
+        deadline = time.time() + timeout
+        while True:
+            remaining = max(deadline - time.time(), 0.0)
+            readable, _, _ = select.select([self._fd], [], [], remaining)
+            if not readable:
+                return False
+            if self._read_events():
+                return True
+
+    def close(self):
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+
+
+def default_frame_notifier():
+    """Best available :class:`.FrameNotifier` for this system"""
+    if InotifyFrameNotifier.is_available():
+        return InotifyFrameNotifier()
+    return FrameNotifier()
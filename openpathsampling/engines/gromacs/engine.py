@@ -19,6 +19,7 @@ from openpathsampling.engines.topology import MDTrajTopology
 from openpathsampling.engines.external_snapshots import \
         ExternalMDSnapshot, InternalizedMDSnapshot
 from openpathsampling.tools import ensure_file
+from .trr_reader import TRRFrameReader, PartialFrameError
 
 import os
 import psutil
@@ -27,7 +28,7 @@ import time
 import numpy as np
 
 from openpathsampling.engines.external_engine import (
-    _debug_open_files, close_file_descriptors
+    _debug_open_files, close_file_descriptors, FilenameSetter
 )
 
 def _remove_file_if_exists(filename):  # pragma: no cover
@@ -165,7 +166,6 @@ class GromacsEngine(ExternalEngine):
                 pass  # the directory already exists
 
         self._file = None  # file open/close efficiency
-        self._last_filename = None
         # TODO: add snapshot_timestep; first via options, later read mdp
         template = snapshot_from_gro(self.gro)
         self.topology = template.topology
@@ -218,31 +218,39 @@ class GromacsEngine(ExternalEngine):
     def mdtraj_topology(self, value):
         self._mdtraj_topology = value
 
+    def _frame_reader(self, filename):
+        """:class:`.TRRFrameReader` for ``filename``; kept open until the
+        engine switches to another file"""
+        if self._file is None or self._file.filename != filename:
+            self.close_frame_reader()
+            self._file = TRRFrameReader(filename)
+        return self._file
+
+    def close_frame_reader(self):
+        """Close the file handle kept open for reading frames"""
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def concurrent_copy(self):
+        # with integer filenames, every trajectory uses the same input and
+        # tpr files; concurrent trajectories would overwrite each other
+        if type(self.filename_setter) is FilenameSetter:
+            raise RuntimeError("Concurrent Gromacs trajectories need unique "
+                               "filenames; use the filename_setter "
+                               "RandomStringFilenames")
+        new = super(GromacsEngine, self).concurrent_copy()
+        new._file = None
+        return new
+
     def read_frame_data(self, filename, frame_num):
         """
         Returns pos, vel, box or raises error
         """
-        # if self._last_filename != filename:
-            # try:
-                # self._file.close()
-            # except AttributeError:
-                # pass  # first time thru, self._file is None
-            # self._file = TRRTrajectoryFile(filename)
-        # f = self._file
-        # do we need to reopen the TRR each time to avoid problems with the
-        # fiel length changing?
-        trr = TRRTrajectoryFile(filename)
-        f = trr
-        logger.debug("Reading file %s frame %d (of %d)",
-                     filename, frame_num, len(f))
-        # logger.debug("File length: %d", len(f))
-        try:
-            f.seek(offset=frame_num)
-            data = f._read(n_frames=1, atom_indices=None, get_velocities=True)
-        finally:
-            trr.close()
-
-        return data[0][0], data[5][0], data[3][0]
+        # the reader keeps the file open and knows the offsets of frames it
+        # has seen, so polling a growing file only reads the new frames
+        logger.debug("Reading file %s frame %d", filename, frame_num)
+        return self._frame_reader(filename).read_frame(frame_num)
 
     def read_frame_from_file(self, file_name, frame_num):
         # note: this only needs to return the file pointers -- but should
@@ -254,14 +262,11 @@ class GromacsEngine(ExternalEngine):
         try:
             xyz, vel, box = self.read_frame_data(file_name, frame_num)
         except (IndexError, OSError, IOError) as e:
-            # this means that no such frame exists yet, so we return None
-            # IndexError in older version, OSError more recently (specific
-            # MDTraj error)
+            # this means that no such frame exists yet (or no file), so we
+            # return None
             logger.debug("Expected exception caught: " + str(e))
-            close_file_descriptors(basename)
             return None
-        except RuntimeError as e:
-            # TODO: matches "TRR read error"
+        except PartialFrameError as e:
             logger.debug("Received partial frame for %s %d", file_name,
                          frame_num+1)
             return 'partial'
@@ -313,7 +318,7 @@ class GromacsEngine(ExternalEngine):
             num_str = number
             self.output_file = self.trajectory_filename(num_str)
             init_filename = num_str + "_initial_frame.trr"
-            self.mdout = num_str + "_mdout.mdp"
+            self.mdout_file = num_str + "_mdout.mdp"
             self.tpr_file = num_str + "_" + "topol.tpr"
 
         self.input_file = os.path.join(self.base_dir, init_filename)
@@ -343,6 +348,7 @@ class GromacsEngine(ExternalEngine):
 
     def cleanup(self):  # pragma: no cover
         # tested when traj is run, which we don't on CI
+        self.close_frame_reader()
         _remove_file_if_exists(self.input_file)
         _remove_file_if_exists(self.tpr_file)
         _remove_file_if_exists(self.mdout_file)
@@ -0,0 +1,280 @@
+"""
+Streaming reader for Gromacs TRR files that are still being written.
+
+The engine polls the TRR output of ``mdrun`` for new frames. Opening the
+file for every poll (as MDTraj's ``TRRTrajectoryFile`` requires) means
+scanning all frame offsets each time, which is quadratic in the length of
+the trajectory. :class:`.TRRFrameReader` keeps the file open and remembers
+the byte offset of every frame it has seen, so each new frame only costs
+reading that frame.
+"""
+
+import logging
+import os
+import struct
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+_TRR_MAGIC = 1993
+_INT = struct.Struct(">i")
+# after the magic number and the version string: ir_size, e_size,
+# box_size, vir_size, pres_size, top_size, sym_size, x_size, v_size,
+# f_size, natoms, step, nre
+_SIZES = struct.Struct(">13i")
+
+
+def _real_size(sizes):
+    """Size of reals from the block sizes of a frame header, or None"""
+    box_size, vir_size, pres_size = sizes[2:5]
+    for size in (box_size, vir_size, pres_size):
+        if size:
+            return size // 9
+
+    natoms = sizes[10]
+    if natoms:
+        x_size, v_size, f_size = sizes[7:10]
+        for size in (x_size, v_size, f_size):
+            if size:
+                return size // (3 * natoms)
+
+    return None
+
+
+class PartialFrameError(RuntimeError):
+    """Raised when the requested frame is only partially written"""
+    pass
+
+
+class _FrameHeader(object):
+    """Sizes (in bytes) of the blocks of one TRR frame"""
+    def __init__(self, header_size, sizes, real_size):
+        (self.ir_size, self.e_size, self.box_size, self.vir_size,
+         self.pres_size, self.top_size, self.sym_size, self.x_size,
+         self.v_size, self.f_size, self.natoms, self.step,
+         self.nre) = sizes
+        self.header_size = header_size
+        self.real_size = real_size
+
+    @property
+    def data_size(self):
+        return (self.ir_size + self.e_size + self.box_size + self.vir_size
+                + self.pres_size + self.top_size + self.sym_size
+                + self.x_size + self.v_size + self.f_size)
+
+    @property
+    def frame_size(self):
+        return self.header_size + self.data_size
+
+
+class TRRFrameReader(object):
+    """Read frames from a TRR file that may still be growing.
+
+    The file handle is kept open between calls. Frames are located by
+    parsing the frame headers once, from the last known frame onward, and
+    the file size tells whether the next frame is complete. The file is
+    only reopened if it was truncated or replaced by a new file with the
+    same name.
+
+    Parameters
+    ----------
+    filename : str
+        the TRR file
+
+    Attributes
+    ----------
+    offsets : list of int
+        byte offsets of the complete frames found so far
+    """
+    def __init__(self, filename):
+        self.filename = filename
+        self._file = None
+        self._inode = None
+        self.offsets = []
+        self._headers = []
+        self._real_size = None
+        self._open()
+
+    def _open(self):
+        self.close()
+        self._file = open(self.filename, 'rb')
+        self._inode = os.fstat(self._file.fileno()).st_ino
+        self.offsets = []
+        self._headers = []
+        self._real_size = None
+
+    def close(self):
+        """Close the file handle"""
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    @property
+    def closed(self):
+        return self._file is None
+
+    @property
+    def _end(self):
+        """byte offset after the last known complete frame"""
+        if self.offsets:
+            return self.offsets[-1] + self._headers[-1].frame_size
+        return 0
+
+    def _file_size(self):
+        """Current size of the file; reopens if it was truncated/replaced"""
+        size = os.fstat(self._file.fileno()).st_size
+        try:
+            inode = os.stat(self.filename).st_ino
+        except OSError:
+            inode = self._inode  # removed; keep reading the open file
+
+        if inode != self._inode or size < self._end:
+            logger.debug("File %s was replaced or truncated; reopening",
+                         self.filename)
+            self._open()
+            size = os.fstat(self._file.fileno()).st_size
+        return size
+
+    def _read_header(self, offset, available):
+        """Parse the frame header at ``offset``.
+
+        The size of reals (4 or 8 bytes) is derived from the block sizes,
+        as in GROMACS: box, virial, and pressure are 3x3 matrices, and
+        positions, velocities, and forces have 3 reals per atom. For a
+        frame without any of these (e.g., with zero atoms), the precision
+        of earlier frames in the file is used. If this is the first frame,
+        the time and lambda reals after the header are taken to be single
+        precision, unless only double precision puts the next frame (or
+        the end of the file) right after them.
+
+        Returns None if not enough bytes are available.
+        """
+        self._file.seek(offset)
+        # magic number, int length of the version string, XDR string
+        # (length + padded characters)
+        start = self._file.read(3 * _INT.size)
+        if len(start) < 3 * _INT.size:
+            return None
+        magic, _, str_len = struct.unpack(">3i", start)
+        if magic != _TRR_MAGIC:
+            raise IOError("Not a TRR frame at byte %d of %s"
+                          % (offset, self.filename))
+        str_len = 4 * ((str_len + 3) // 4)
+        header_size = 3 * _INT.size + str_len + _SIZES.size
+        # time and lambda follow as reals; this needs the real size
+        if available < header_size:
+            return None
+        self._file.seek(str_len, os.SEEK_CUR)
+        sizes = _SIZES.unpack(self._file.read(_SIZES.size))
+        real_size = _real_size(sizes)
+        if real_size is None:
+            real_size = self._real_size
+        if real_size is None:
+            real_size = self._guess_real_size(
+                offset, available, _FrameHeader(header_size, sizes, 0)
+            )
+            if real_size is None:
+                return None
+        self._real_size = real_size
+        header_size += 2 * real_size
+        return _FrameHeader(header_size, sizes, real_size)
+
+    def _guess_real_size(self, offset, available, header):
+        """Size of reals for a frame without any sized real blocks.
+
+        Returns None if this can't be decided from the available bytes.
+        """
+        incomplete = False
+        for real_size in (4, 8):
+            end = header.frame_size + 2 * real_size
+            if available == end:
+                return real_size
+            elif available < end + _INT.size:
+                # this frame or the next one is still being written
+                incomplete = True
+                continue
+            self._file.seek(offset + end)
+            if _INT.unpack(self._file.read(_INT.size))[0] == _TRR_MAGIC:
+                return real_size
+
+        if incomplete:
+            return None
+        raise IOError("Can't determine the precision of the TRR frame at "
+                      "byte %d of %s" % (offset, self.filename))
+
+    def _scan(self, frame_num=None):
+        """Find the offsets of new frames, up to ``frame_num`` (or all)"""
+        size = self._file_size()
+        while frame_num is None or len(self.offsets) <= frame_num:
+            offset = self._end
+            available = size - offset
+            if available <= 0:
+                raise IndexError("Frame %d not (yet) in %s"
+                                 % (len(self.offsets), self.filename))
+            header = self._read_header(offset, available)
+            if header is None or available < header.frame_size:
+                raise PartialFrameError(
+                    "TRR read error: frame %d of %s is only partially "
+                    "written" % (len(self.offsets), self.filename)
+                )
+            self.offsets.append(offset)
+            self._headers.append(header)
+
+    def __len__(self):
+        """Number of complete frames currently in the file"""
+        try:
+            self._scan()
+        except (IndexError, PartialFrameError):
+            pass
+        return len(self.offsets)
+
+    def read_frame(self, frame_num):
+        """Read positions, velocities, and box vectors of a frame.
+
+        Parameters
+        ----------
+        frame_num : int
+            index of the frame in the file
+
+        Returns
+        -------
+        xyz : np.ndarray, shape (n_atoms, 3)
+        vel : np.ndarray, shape (n_atoms, 3)
+            zeros if the frame has no velocities
+        box : np.ndarray, shape (3, 3)
+            zeros if the frame has no box
+
+        Raises
+        ------
+        IndexError
+            if the frame has not been written
+        PartialFrameError
+            if the frame is not completely written yet
+        """
+        if frame_num < 0:
+            raise IndexError("Negative frame numbers are not supported")
+        if frame_num >= len(self.offsets):
+            self._scan(frame_num)
+
+        header = self._headers[frame_num]
+        self._file.seek(self.offsets[frame_num] + header.header_size)
+        data = self._file.read(header.data_size)
+        dtype = '>f4' if header.real_size == 4 else '>f8'
+        natoms = header.natoms
+
+        def block(start, size, shape):
+            if size == 0:
+                return np.zeros(shape, dtype=dtype[1:])
+            arr = np.frombuffer(data, dtype=dtype, offset=start,
+                                count=size // header.real_size)
+            return arr.reshape(shape).astype(dtype[1:])
+
+        pos = header.ir_size + header.e_size
+        box = block(pos, header.box_size, (3, 3))
+        pos += (header.box_size + header.vir_size + header.pres_size
+                + header.top_size + header.sym_size)
+        xyz = block(pos, header.x_size, (natoms, 3))
+        pos += header.x_size
+        vel = block(pos, header.v_size, (natoms, 3))
+        return xyz, vel, box
@@ -1,8 +1,89 @@
+import logging
+
 import numpy as np
 
-from openpathsampling.engines import DynamicsEngine, SnapshotDescriptor
+from openpathsampling.engines import (DynamicsEngine, SnapshotDescriptor,
+                                      Trajectory, EngineMaxLengthError)
+from openpathsampling.ensemble import Ensemble, EnsembleCache
 from .snapshot import ToySnapshot as Snapshot
 
+logger = logging.getLogger(__name__)
+
+
+class _ToyWalkers(object):
+    """State of several independent toy systems, for batch integration.
+
+    Mimics the attributes of :class:`.ToyEngine` that the integrators and
+    potential energy surfaces use, but with positions and velocities of
+    shape ``(N, n_dof)``.
+    """
+    def __init__(self, engine, positions, velocities):
+        self.pes = engine.pes
+        self.mass = engine.mass
+        self._minv = engine._minv
+        self.positions = positions
+        self.velocities = velocities
+
+    def select(self, mask):
+        """Keep only the walkers where ``mask`` is True"""
+        self.positions = self.positions[mask]
+        self.velocities = self.velocities[mask]
+
+
+class _WalkerEnsembleCaches(object):
+    """Separate ensemble caches for each walker of a batch integration.
+
+    The ensembles of the running conditions (e.g., ``ensemble.can_append``)
+    keep an :class:`.EnsembleCache` that is only trusted if it is always
+    called with the same (growing) trajectory. Calling them for several
+    walkers in turn would reset the caches on every call; instead, the
+    caches of the walker being tested are swapped in before each call.
+
+    Parameters
+    ----------
+    running : list of function(:class:`.Trajectory`)
+        the running conditions
+    n_walkers : int
+        number of walkers
+    """
+    def __init__(self, running, n_walkers):
+        self.slots = self._cache_slots(running)
+        self.original = [getattr(obj, attr) for (obj, attr) in self.slots]
+        self.caches = [
+            [EnsembleCache(cache.direction) for cache in self.original]
+            for _ in range(n_walkers)
+        ]
+
+    @staticmethod
+    def _cache_slots(running):
+        """(ensemble, attribute name) of each cache used by ``running``"""
+        todo = [getattr(condition, '__self__', None) for condition in running]
+        seen = set()
+        slots = []
+        while todo:
+            obj = todo.pop()
+            if not isinstance(obj, Ensemble) or id(obj) in seen:
+                continue
+            seen.add(id(obj))
+            for (attr, value) in sorted(vars(obj).items()):
+                if isinstance(value, EnsembleCache):
+                    slots.append((obj, attr))
+                elif isinstance(value, (list, tuple)):
+                    todo.extend(value)
+                else:
+                    todo.append(value)
+        return slots
+
+    def use(self, walker):
+        """Swap in the caches of walker number ``walker``"""
+        for ((obj, attr), cache) in zip(self.slots, self.caches[walker]):
+            setattr(obj, attr, cache)
+
+    def restore(self):
+        """Put back the caches the ensembles had before"""
+        for ((obj, attr), cache) in zip(self.slots, self.original):
+            setattr(obj, attr, cache)
+
 
 class ToyEngine(DynamicsEngine):
     """Engine for toy models. Mostly used for 2D examples.
@@ -135,6 +216,136 @@ class ToyEngine(DynamicsEngine):
             self.integ.step(sys=self)
         return self.current_snapshot
 
+    def generate_many(self, snapshots, running=None, direction=+1):
+        """Generate one trajectory per initial snapshot, all at once.
+
+        All walkers are integrated together as arrays of shape
+        ``(N, n_dof)``, which avoids most of the Python overhead of calling
+        :meth:`.generate` for many short trajectories. A walker drops out
+        as soon as one of its ``running`` conditions returns False.
+
+        Parameters
+        ----------
+        snapshots : list of :class:`.ToySnapshot`
+            initial snapshots, one per walker
+        running : (list of) function(:class:`.Trajectory`)
+            callable function of a 'Trajectory' that returns True or False.
+            If one of these returns False the walker is stopped.
+        direction : -1 or +1 (DynamicsEngine.FORWARD or DynamicsEngine.BACKWARD)
+            If +1 then this will integrate forward, if -1 it will reverse
+            the momenta of the given snapshots and prepend generated
+            snapshots with reversed momenta; see :meth:`.generate`.
+
+        Returns
+        -------
+        list of :class:`.Trajectory`
+            the generated trajectories, in the order of ``snapshots``
+
+        Notes
+        -----
+        Unlike :meth:`.generate`, this does not retry: if a walker exceeds
+        ``n_frames_max`` and ``on_max_length`` is not ``'stop'``, an
+        :class:`.EngineMaxLengthError` is raised. The engine's own
+        ``current_snapshot`` is not changed. Each walker has its own
+        ensemble caches, so that ensemble running conditions are evaluated
+        incrementally, as in :meth:`.generate`.
+        """
+        if direction == 0:
+            raise RuntimeError(
+                'direction must be positive (FORWARD) or negative (BACKWARD).')
+
+        try:
+            iter(running)
+        except TypeError:
+            running = [running]
+
+        for snap in snapshots:
+            self.check_snapshot_type(snap)
+
+        trajectories = [Trajectory([snap]) for snap in snapshots]
+        if direction > 0:
+            starts = snapshots
+        else:
+            starts = [snap.reversed for snap in snapshots]
+
+        caches = _WalkerEnsembleCaches(running, len(snapshots))
+        try:
+            active = [
+                idx for idx, traj in enumerate(trajectories)
+                if not self._walker_stop_conditions(caches, idx, traj, running,
+                                                    trusted=False)
+            ]
+            if not active:
+                return trajectories
+
+            walkers = _ToyWalkers(
+                engine=self,
+                positions=np.array([starts[idx].coordinates[0]
+                                    for idx in active], dtype=float),
+                velocities=np.array([starts[idx].velocities[0]
+                                     for idx in active], dtype=float)
+            )
+
+            max_length = self.options['n_frames_max']
+            frame = 0
+            while active:
+                for _ in range(self.n_steps_per_frame):
+                    self.integ.step(sys=walkers)
+
+                frame += 1
+                # one copy per frame; snapshots keep (1, n_dof) views into it
+                positions = walkers.positions.copy()
+                velocities = walkers.velocities.copy()
+
+                keep = np.ones(len(active), dtype=bool)
+                for (i, idx) in enumerate(active):
+                    snapshot = Snapshot(
+                        coordinates=positions[i:i+1],
+                        velocities=velocities[i:i+1],
+                        engine=self
+                    )
+                    traj = trajectories[idx]
+                    if direction > 0:
+                        traj.append(snapshot)
+                    else:
+                        traj.insert(0, snapshot.reversed)
+
+                    if 0 < max_length < len(traj):
+                        if direction > 0:
+                            del traj[-1]
+                        else:
+                            del traj[0]
+
+                        if self.on_max_length == 'stop':
+                            logger.info('Trajectory hit max length. Stopping.')
+                            keep[i] = False
+                        else:
+                            raise EngineMaxLengthError(
+                                'Hit maximal length of %d frames.'
+                                % max_length,
+                                traj
+                            )
+                    elif self._walker_stop_conditions(caches, idx, traj,
+                                                      running):
+                        keep[i] = False
+
+                if not keep.all():
+                    active = [idx for (idx, k) in zip(active, keep) if k]
+                    walkers.select(keep)
+
+                if frame % 10 == 0:
+                    logger.info("Through frame: %d, active walkers: %d",
+                                frame, len(active))
+
+            return trajectories
+        finally:
+            caches.restore()
+
+    def _walker_stop_conditions(self, caches, walker, trajectory, running,
+                                trusted=True):
+        caches.use(walker)
+        return self.stop_conditions(trajectory, running, trusted=trusted)
+
     def n_degrees_of_freedom(self):
         topol = self.topology
         return topol.n_atoms * topol.n_spatial
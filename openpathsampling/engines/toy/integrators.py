@@ -110,7 +110,7 @@ class LangevinBAOABIntegrator(LeapfrogVerletIntegrator):
 
 
     def _OU_update(self, sys, mydt):
-        R = np.random.normal(size=len(sys.velocities))
+        R = np.random.normal(size=np.shape(sys.velocities))
         sys.velocities = (self._c1 * sys.velocities +
                           self._c3 * np.sqrt(sys._minv) * R)
 
@@ -8,6 +8,11 @@ from openpathsampling.netcdfplus import StorableObject
 
 class PES(StorableObject):
     """Abstract base class for toy potential energy surfaces.
+
+    The positions of ``sys`` can either be a single configuration of shape
+    ``(n_dof,)`` or a batch of configurations of shape ``(N, n_dof)``. In
+    the latter case, energies are returned as an array of shape ``(N,)``
+    and derivatives with the shape of the positions.
     """
     # For now, we only support additive combinations; maybe someday that can
     # include multiplication, too
@@ -31,7 +36,7 @@ class PES(StorableObject):
         """
         v = sys.velocities
         m = sys.mass
-        return 0.5*np.dot(m, np.multiply(v, v))
+        return 0.5*np.dot(np.multiply(v, v), m)
 
 
 class PES_Combination(PES):
@@ -169,7 +174,7 @@ class HarmonicOscillator(PES):
         """
         dx = sys.positions - self.x0
         k = self.omega*self.omega*sys.mass
-        return 0.5*np.dot(self.A * k, dx * dx)
+        return 0.5*np.dot(dx * dx, self.A * k)
 
     def dVdx(self, sys):
         """Derivative of potential energy (-force)
@@ -206,7 +211,6 @@ class Gaussian(PES):
         self.A = A
         self.alpha = np.array(alpha)
         self.x0 = np.array(x0)
-        self._local_dVdx = np.zeros(self.x0.size)
 
     def to_dict(self):
         dct = super(Gaussian, self).to_dict()
@@ -231,7 +235,7 @@ class Gaussian(PES):
             the potential energy
         """
         dx = sys.positions - self.x0
-        return self.A*np.exp(-np.dot(self.alpha, np.multiply(dx, dx)))
+        return self.A*np.exp(-np.dot(np.multiply(dx, dx), self.alpha))
 
     def dVdx(self, sys):
         """Derivative of potential energy (-force)
@@ -247,10 +251,8 @@ class Gaussian(PES):
             the derivatives of the potential at this point
         """
         dx = sys.positions - self.x0
-        exp_part = self.A*np.exp(-np.dot(self.alpha, np.multiply(dx, dx)))
-        for i in range(len(dx)):
-            self._local_dVdx[i] = -2*self.alpha[i]*dx[i]*exp_part
-        return self._local_dVdx
+        exp_part = self.A*np.exp(-np.dot(np.multiply(dx, dx), self.alpha))
+        return -2*self.alpha*dx*np.expand_dims(exp_part, -1)
 
 
 class OuterWalls(PES):
@@ -269,7 +271,6 @@ class OuterWalls(PES):
         super(OuterWalls, self).__init__()
         self.sigma = np.array(sigma)
         self.x0 = np.array(x0)
-        self._local_dVdx = np.zeros(self.x0.size)
 
     def to_dict(self):
         dct = super(OuterWalls, self).to_dict()
@@ -294,10 +295,7 @@ class OuterWalls(PES):
             the potential energy
         """
         dx = sys.positions - self.x0
-        myV = 0.0
-        for i in range(len(dx)):
-            myV += self.sigma[i]*dx[i]**6
-        return myV
+        return np.dot(dx**6, self.sigma)
 
     def dVdx(self, sys):
         """Derivative of potential energy (-force)
@@ -313,9 +311,7 @@ class OuterWalls(PES):
             the derivatives of the potential at this point
         """
         dx = sys.positions - self.x0
-        for i in range(len(dx)):
-            self._local_dVdx[i] = 6.0*self.sigma[i]*dx[i]**5
-        return self._local_dVdx
+        return 6.0*self.sigma*dx**5
 
 
 class LinearSlope(PES):
@@ -351,7 +347,7 @@ class LinearSlope(PES):
         float
             the potential energy
         """
-        return np.dot(self.m, sys.positions) + self.c
+        return np.dot(sys.positions, self.m) + self.c
 
     def dVdx(self, sys):
         """Derivative of potential energy (-force)
@@ -3,6 +3,8 @@
 @author: JH Prinz
 """
 
+import weakref
+
 import numpy as np
 
 from openpathsampling.integration_tools import (
@@ -598,3 +600,249 @@ class Trajectory(list, StorableObject):
             return paths.Trajectory([trajectories])
 
         return trajectories
+
+
+# ==============================================================================
+# PACKED TRAJECTORY
+# ==============================================================================
+
+
+class PackedTrajectory(object):
+    """
+    Compact, array-backed trajectory for snapshots with numpy features
+
+    Instead of keeping one snapshot object per frame, all numpy features of
+    the snapshots (e.g., ``coordinates`` and ``velocities``) are copied into
+    contiguous, preallocated arrays of shape ``(capacity, ...)``. The
+    arrays grow geometrically when they are full, so appending is amortized
+    O(1). Snapshot objects are only created when a frame is accessed by
+    index or iteration; the coordinates of such a snapshot are read-only
+    views into the packed arrays. Each frame keeps the UUID of the snapshot
+    that was appended, so a materialized snapshot compares equal to (and
+    shares storage and cache entries with) the original one.
+
+    All non-numpy features (such as the ``engine``) must be the same
+    object for all frames and are kept only once.
+
+    Parameters
+    ----------
+    trajectory : iterable of :class:`.BaseSnapshot` or None
+        the snapshots to fill the trajectory with
+    capacity : int
+        number of frames to preallocate on the first append
+
+    Notes
+    -----
+    Snapshot classes with lazy features (e.g., snapshots that load their
+    data from storage or external files) cannot be packed.
+    """
+
+    growth_factor = 2
+
+    def __init__(self, trajectory=None, capacity=16):
+        self.snapshot_class = None
+        self.initial_capacity = max(int(capacity), 1)
+        self._n_frames = 0
+        self._packed = {}
+        self._shared = {}
+        self._uuids = []
+        self._views = weakref.WeakValueDictionary()
+
+        if trajectory is not None:
+            self.extend(trajectory)
+
+    def __str__(self):
+        return 'PackedTrajectory[' + str(len(self)) + ']'
+
+    __repr__ = __str__
+
+    def __len__(self):
+        return self._n_frames
+
+    @property
+    def n_snapshots(self):
+        return len(self)
+
+    @property
+    def capacity(self):
+        """int : number of frames that fit without reallocation"""
+        if not self._packed:
+            return 0
+
+        return len(next(iter(self._packed.values())))
+
+    def _initialize(self, snapshot):
+        cls = snapshot.__class__
+        features = getattr(cls, '__features__', None)
+        if features is None or not features.numpy:
+            raise ValueError(
+                "Snapshots of type '%s' have no numpy features and cannot "
+                "be packed" % cls.__name__)
+
+        if features.lazy:
+            raise ValueError(
+                "Snapshots of type '%s' have lazy features and cannot "
+                "be packed" % cls.__name__)
+
+        self.snapshot_class = cls
+        for name in features.variables:
+            value = getattr(snapshot, name)
+            if name in features.numpy and value is not None \
+                    and not is_simtk_quantity_type(value):
+                value = np.asarray(value)
+                self._packed[name] = np.empty(
+                    (self.initial_capacity,) + value.shape,
+                    dtype=value.dtype)
+            else:
+                self._shared[name] = value
+
+    def _grow(self, n_required):
+        capacity = self.capacity
+        if n_required <= capacity:
+            return
+
+        new_capacity = max(capacity * self.growth_factor, n_required)
+        for name, array in self._packed.items():
+            new_array = np.empty(
+                (new_capacity,) + array.shape[1:], dtype=array.dtype)
+            new_array[:self._n_frames] = array[:self._n_frames]
+            self._packed[name] = new_array
+
+    def append(self, snapshot):
+        """
+        Copy the data of a snapshot into the packed arrays
+
+        Parameters
+        ----------
+        snapshot : :class:`.BaseSnapshot`
+            the snapshot to be added. Must be of the same class as the
+            other snapshots in the trajectory.
+        """
+        if type(snapshot) is LoaderProxy:
+            snapshot = snapshot.__subject__
+
+        if self.snapshot_class is None:
+            self._initialize(snapshot)
+        elif snapshot.__class__ is not self.snapshot_class:
+            raise TypeError(
+                "Cannot add a snapshot of type '%s' to a PackedTrajectory "
+                "of '%s'" % (snapshot.__class__.__name__,
+                             self.snapshot_class.__name__))
+
+        for name, value in self._shared.items():
+            if getattr(snapshot, name) is not value:
+                raise ValueError(
+                    "Feature '%s' is not shared by all snapshots and "
+                    "cannot be packed" % name)
+
+        self._grow(self._n_frames + 1)
+        for name, array in self._packed.items():
+            array[self._n_frames] = getattr(snapshot, name)
+
+        self._uuids.append(snapshot.__uuid__)
+        self._n_frames += 1
+
+    def extend(self, iterable):
+        for snapshot in iterable:
+            self.append(snapshot)
+
+    def __iadd__(self, other):
+        self.extend(other)
+        return self
+
+    def _snapshot(self, idx):
+        snapshot = self._views.get(idx)
+        if snapshot is None:
+            cls = self.snapshot_class
+            snapshot = cls.__new__(cls)
+            snapshot.init_empty()
+            snapshot.__uuid__ = self._uuids[idx]
+            for name, value in self._shared.items():
+                setattr(snapshot, name, value)
+
+            for name, array in self._packed.items():
+                setattr(snapshot, name, self._read_only(array[idx]))
+
+            self._views[idx] = snapshot
+
+        return snapshot
+
+    @staticmethod
+    def _read_only(view):
+        # snapshots are immutable, and their data is shared with the buffer
+        view.flags.writeable = False
+        return view
+
+    def __getitem__(self, index):
+        if hasattr(index, '__iter__'):
+            return Trajectory([self[i] for i in index])
+        elif isinstance(index, slice):
+            return Trajectory(
+                [self._snapshot(i) for i in range(*index.indices(len(self)))])
+
+        n_frames = len(self)
+        if index < 0:
+            index += n_frames
+
+        if not 0 <= index < n_frames:
+            raise IndexError('PackedTrajectory index out of range')
+
+        return self._snapshot(index)
+
+    def __iter__(self):
+        for idx in range(len(self)):
+            yield self._snapshot(idx)
+
+    def __reversed__(self):
+        for idx in range(len(self) - 1, -1, -1):
+            yield self._snapshot(idx).reversed
+
+    def as_proxies(self):
+        """
+        Returns a list of all snapshots in the trajectory
+
+        Returns
+        -------
+        list of :obj:`.BaseSnapshot`
+        """
+        return list(self)
+
+    iter_proxies = __iter__
+
+    def to_trajectory(self):
+        """
+        Convert into a regular :class:`.Trajectory`
+
+        The snapshots of the new trajectory still share their numpy
+        features with this packed trajectory.
+
+        Returns
+        -------
+        :class:`.Trajectory`
+        """
+        return Trajectory(list(self))
+
+    def __getattr__(self, item):
+        """
+        Return a packed feature as a (zero-copy, read-only) numpy array
+
+        Other attributes are taken from a regular :class:`.Trajectory` with
+        the same snapshots. That trajectory is built for each access and not
+        kept, so the snapshots are only alive while the attribute is used.
+        """
+        # avoid infinite recursion before __init__ has run
+        if item.startswith('_'):
+            raise AttributeError(item)
+
+        if item in self._packed:
+            return self._read_only(self._packed[item][:self._n_frames])
+
+        if item == 'xyz' and 'coordinates' in self._packed:
+            return self._read_only(
+                self._packed['coordinates'][:self._n_frames])
+
+        if self.snapshot_class is not None:
+            return getattr(self.to_trajectory(), item)
+
+        raise AttributeError(
+            "'PackedTrajectory' object has no attribute '%s'" % item)
@@ -1572,6 +1572,73 @@ class SequentialEnsemble(Ensemble):
                 slice(subtraj_first, subtraj_final)
         logger.debug("Cache assignments: " + str(cache.contents['assignments']))
 
+    @staticmethod
+    def _set_open_subtraj(cache, ens_num, subtraj, length):
+        """Remember the sub-ensemble that the next frame will extend.
+
+        After a successful `can_append` (`can_prepend`), the frames at the
+        end (start) of the trajectory are assigned to the sub-ensemble
+        `ens_num`. If the next trajectory adds exactly one frame, and that
+        frame keeps the subtrajectory in this sub-ensemble, the answer is
+        True without re-walking the sub-ensemble assignments.
+
+        Parameters
+        ----------
+        cache : `EnsembleCache`
+            the cache to store this in
+        ens_num : integer
+            index of the sub-ensemble that the next frame will extend
+        subtraj : list
+            (proxy) snapshots currently assigned to that sub-ensemble
+        length : integer
+            length of the trajectory this was determined for
+        """
+        cache.contents['open_subtraj'] = {
+            'ens_num': ens_num,
+            'subtraj': list(subtraj),
+            'length': length
+        }
+
+    def _extend_open_subtraj(self, cache, trajectory):
+        """Incremental `can_append`/`can_prepend`, only testing the new frame
+
+        Must be called after `cache.check(trajectory)`.
+
+        Returns
+        -------
+        bool
+            True if the new frame keeps the open sub-ensemble valid (so the
+            trajectory can be extended). False if this can't be decided
+            incrementally; then the full algorithm has to be used.
+        """
+        state = cache.contents.get('open_subtraj')
+        if state is None:
+            return False
+
+        # only one new frame after a successful check can be handled
+        del cache.contents['open_subtraj']
+        if not cache.trusted or len(trajectory) != state['length'] + 1:
+            return False
+
+        get_frame = getattr(trajectory, "get_as_proxy",
+                            trajectory.__getitem__)
+        ens = self.ensembles[state['ens_num']]
+        subtraj = state['subtraj']
+        if cache.direction > 0:
+            subtraj.append(get_frame(-1))
+            result = ens.can_append(subtraj, trusted=True)
+        else:
+            subtraj.insert(0, get_frame(0))
+            result = ens.can_prepend(subtraj, trusted=True)
+
+        if result:
+            state['length'] += 1
+            cache.contents['open_subtraj'] = state
+            if cache.debug_enabled:  # pragma: no cover
+                logger.debug("Incremental check: frame extends ensemble "
+                             + str(state['ens_num']))
+        return result
+
     def transition_frames(self, trajectory, trusted=None):
         # it is easiest to understand this decision tree as a simplified
         # version of the can_append decision tree; see that for detailed
@@ -1736,6 +1803,8 @@ class SequentialEnsemble(Ensemble):
 
         if self._use_cache:
             _ = cache.check(trajectory)
+            if self._extend_open_subtraj(cache, trajectory):
+                return True
             if cache.contents == {}:
                 self.update_cache(cache, 0, 0, 0)
                 self.assign_frames(cache, None)
@@ -1811,7 +1880,11 @@ class SequentialEnsemble(Ensemble):
                                          str(ens.__class__.__name__))
                         self.update_cache(cache, ens_num,
                                           ens_first, subtraj_first)
-                        return ens.can_append(subtraj, trusted=True)
+                        result = ens.can_append(subtraj, trusted=True)
+                        if result and self._use_cache:
+                            self._set_open_subtraj(cache, ens_num, subtraj,
+                                                   traj_final)
+                        return result
                     else:
                         logger.debug(
                             "Returning false due to incomplete assigns: " +
@@ -1861,6 +1934,14 @@ class SequentialEnsemble(Ensemble):
 
                         self.update_cache(cache, ens_num, ens_first,
                                           subtraj_first)
+                        if subtraj_first != "keep":
+                            self._set_open_subtraj(cache, ens_num, [],
+                                                   traj_final)
+                        elif (prev_slice.start ==
+                              cache.contents['subtraj_from']
+                              and prev_slice.stop == traj_final):
+                            self._set_open_subtraj(cache, ens_num,
+                                                   prev_subtraj, traj_final)
                     logger.debug(
                         "All frames assigned, more ensembles to go: "
                         "returning True")
@@ -1916,11 +1997,11 @@ class SequentialEnsemble(Ensemble):
         subtraj_final = len(trajectory)
         ens_final = len(self.ensembles) - 1
         ens_num = ens_final
-        # Make list before slicing
-        ltraj = _get_list_traj(trajectory)
 
         if self._use_cache:
             _ = cache.check(trajectory)
+            if self._extend_open_subtraj(cache, trajectory):
+                return True
             if cache.contents == {}:
                 self.update_cache(cache, ens_num, first_ens, subtraj_final)
                 self.assign_frames(cache, None)
@@ -1936,6 +2017,9 @@ class SequentialEnsemble(Ensemble):
                 ens_num = cache.contents['ens_num']
                 ens_final = cache.contents['ens_from']
 
+        # Make list before slicing
+        ltraj = _get_list_traj(trajectory)
+
         # logging startup
         if logger.isEnabledFor(logging.DEBUG):  # pragma: no cover
             logger.debug(
@@ -1986,8 +2070,12 @@ class SequentialEnsemble(Ensemble):
                         logger.debug("Returning can_prepend")
                         self.update_cache(cache, ens_num, ens_final,
                                           assign_final)
-                        return self.ensembles[ens_num].can_prepend(subtraj,
-                                                                   trusted=True)
+                        ens = self.ensembles[ens_num]
+                        result = ens.can_prepend(subtraj, trusted=True)
+                        if result and self._use_cache:
+                            self._set_open_subtraj(cache, ens_num, subtraj,
+                                                   len(trajectory))
+                        return result
                     else:
                         logger.debug(
                             "Returning false due to incomplete assigns: " +
@@ -2038,6 +2126,15 @@ class SequentialEnsemble(Ensemble):
                                                              subtraj_final)))
                         self.update_cache(cache, ens_num, ens_final,
                                           assign_final)
+                        if assign_final != "keep":
+                            self._set_open_subtraj(cache, ens_num, [],
+                                                   len(trajectory))
+                        elif (prev_slice.start == -len(trajectory)
+                              and prev_slice.stop ==
+                              cache.contents['subtraj_from']):
+                            self._set_open_subtraj(cache, ens_num,
+                                                   prev_subtraj,
+                                                   len(trajectory))
                     logger.debug(
                         "All frames assigned, more ensembles to go: "
                         "returning True")
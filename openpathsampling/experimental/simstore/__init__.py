@@ -11,3 +11,4 @@ from .storable_functions import (
     StorableFunction, StorageFunctionHandler, storable_function_find_uuids
 )
 from .callable_codec import CallableCodec
+from .shared_view import SharedStorageView, SharedArray
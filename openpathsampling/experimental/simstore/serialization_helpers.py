@@ -413,6 +413,25 @@ def _uuids_from_table_row(table_row, schema_entries, allow_lazy=True):
     return (list(uuid), lazy, dependencies)
 
 
+def _prefetch_uuid_rows(uuid_list, backend, known_uuids, allow_lazy):
+    """UUID table rows of everything reachable from ``uuid_list``.
+
+    Uses a single recursive query if the backend supports it; otherwise
+    (and for dependencies the backend can't follow, such as UUIDs within
+    JSON) the rows are loaded level by level. Known UUIDs are excluded
+    within the query, so the query stops at objects that are already
+    loaded.
+    """
+    if not getattr(backend, 'supports_closure_queries', False):
+        return {}
+    new_uuids = [uuid for uuid in uuid_list if uuid not in known_uuids]
+    if not new_uuids:
+        return {}
+    rows = backend.load_uuids_closure(new_uuids, follow_lazy=not allow_lazy,
+                                      exclude=known_uuids)
+    return {row.uuid: row for row in rows}
+
+
 def get_all_uuids_loading(uuid_list, backend, schema, existing_uuids=None,
                           allow_lazy=True):
     """Get all information to reload from UUIDs.
@@ -450,9 +469,15 @@ def get_all_uuids_loading(uuid_list, backend, schema, existing_uuids=None,
     all_table_rows = []
     lazy = set([])
     dependencies = {}
+    uuid_rows_cache = _prefetch_uuid_rows(uuid_list, backend, known_uuids,
+                                          allow_lazy)
     while uuid_list:
         new_uuids = {uuid for uuid in uuid_list if uuid not in known_uuids}
-        uuid_rows = backend.load_uuids_table(new_uuids)
+        uuid_rows = [uuid_rows_cache[uuid] for uuid in new_uuids
+                     if uuid in uuid_rows_cache]
+        missing = [uuid for uuid in new_uuids if uuid not in uuid_rows_cache]
+        if missing:
+            uuid_rows += backend.load_uuids_table(missing)
         new_table_rows = backend.load_table_data(uuid_rows)
         uuid_to_table.update({r.uuid: backend.uuid_row_to_table_name(r)
                               for r in uuid_rows})
@@ -0,0 +1,409 @@
+"""
+Read-only views of a storage that can be shared between processes.
+
+Each process that opens a storage loads the simulation objects and keeps
+its own caches. For analysis that runs in several worker processes on one
+node, the :class:`.SharedStorageView` reads the simulation object tables
+and the array data (e.g., snapshot coordinates) once, and puts the arrays
+into shared memory. Pickling the view (as done when sending it to a worker
+process) only sends the names of the shared memory blocks; the worker
+attaches to them without copying.
+"""
+
+import os
+import collections
+import itertools
+
+import numpy as np
+
+from .my_types import parse_ndarray_type
+from .storage import universal_schema
+
+try:
+    from multiprocessing import shared_memory
+except ImportError:  # Python < 3.8
+    shared_memory = None
+
+import logging
+logger = logging.getLogger(__name__)
+
+DEFAULT_PRELOAD_TABLES = ['simulation_objects', 'storable_functions']
+# rows read from the backend at a time when filling the shared memory
+DEFAULT_CHUNK_SIZE = 1000
+
+UUIDRow = collections.namedtuple('UUIDRow', ['uuid', 'table', 'row'])
+
+
+class SharedArray(object):
+    """NumPy array in shared memory.
+
+    The process that creates the array owns the shared memory, and must
+    call :meth:`.close` to release it. Pickled copies attach to the same
+    memory, and are read-only.
+
+    Parameters
+    ----------
+    shape : Tuple[int]
+        shape of the array
+    dtype : numpy.dtype
+        dtype of the array
+    name : str
+        name of an existing shared memory block to attach to; if None (the
+        default) a new block is created
+    """
+    def __init__(self, shape, dtype, name=None):
+        if shared_memory is None:
+            raise RuntimeError("Shared memory requires Python 3.8 or later")
+        self.shape = tuple(shape)
+        self.dtype = np.dtype(dtype)
+        self.owner = name is None
+        nbytes = int(np.prod(self.shape)) * self.dtype.itemsize
+        self._shm = shared_memory.SharedMemory(name=name,
+                                               create=self.owner,
+                                               size=max(nbytes, 1))
+        self.array = np.ndarray(self.shape, dtype=self.dtype,
+                                buffer=self._shm.buf)
+        if not self.owner:
+            self.array.flags.writeable = False
+
+    @property
+    def name(self):
+        return self._shm.name
+
+    def __getstate__(self):
+        return {'shape': self.shape, 'dtype': self.dtype.str,
+                'name': self.name}
+
+    def __setstate__(self, state):
+        self.__init__(**state)
+
+    def close(self):
+        """Detach from the shared memory (and free it, if owner)"""
+        if self._shm is None:
+            return
+        self.array = None
+        try:
+            self._shm.close()
+        except BufferError:
+            # views of the array are still alive; the memory is released
+            # when the last of them is deleted
+            pass
+        if self.owner:
+            self._shm.unlink()
+        self._shm = None
+
+
+class SharedTable(object):
+    """Contents of a table with array columns, arrays in shared memory.
+
+    Parameters
+    ----------
+    table_name : str
+        name of the table
+    rows : Iterable
+        all rows of the table, as loaded from the backend
+    schema_entries : List[Tuple[str, str]]
+        schema for this table
+    n_rows : int or None
+        number of rows; if given, ``rows`` can be an iterator, and each row
+        is copied into shared memory as it is read
+    """
+    def __init__(self, table_name, rows, schema_entries, n_rows=None):
+        if n_rows is None:
+            rows = list(rows)
+            n_rows = len(rows)
+        self.table_name = table_name
+        self.schema_entries = schema_entries
+        self.uuids = []
+        self.arrays = {}
+        self.columns = {}
+        try:
+            self._fill(rows, n_rows)
+        except Exception:
+            self.close()
+            raise
+        self._setup()
+
+    def _fill(self, rows, n_rows):
+        array_info = {}
+        for attr, type_name in self.schema_entries:
+            ndarray_info = parse_ndarray_type(type_name)
+            if ndarray_info:
+                dtype, shape = ndarray_info
+                self.arrays[attr] = SharedArray((n_rows,) + shape, dtype)
+                array_info[attr] = ndarray_info
+            else:
+                self.columns[attr] = []
+
+        for num, row in enumerate(rows):
+            if num >= n_rows:
+                break
+            self.uuids.append(row.uuid)
+            for attr, (dtype, shape) in array_info.items():
+                data = np.frombuffer(getattr(row, attr), dtype=dtype)
+                self.arrays[attr].array[num] = data.reshape(shape)
+            for attr, column in self.columns.items():
+                column.append(getattr(row, attr))
+
+        if len(self.uuids) != n_rows:
+            raise RuntimeError("Table %s has %d rows; expected %d"
+                               % (self.table_name, len(self.uuids), n_rows))
+
+        for shared in self.arrays.values():
+            shared.array.flags.writeable = False
+
+    def _setup(self):
+        fields = ['uuid'] + [attr for attr, _ in self.schema_entries]
+        self.Row = collections.namedtuple(self.table_name, fields)
+        self.uuid_to_idx = {uuid: idx for idx, uuid in enumerate(self.uuids)}
+
+    def __getstate__(self):
+        return {'table_name': self.table_name,
+                'schema_entries': self.schema_entries,
+                'uuids': self.uuids,
+                'arrays': self.arrays,
+                'columns': self.columns}
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._setup()
+
+    def __contains__(self, uuid):
+        return uuid in self.uuid_to_idx
+
+    def __len__(self):
+        return len(self.uuids)
+
+    def row(self, uuid):
+        """Table row for the given UUID.
+
+        Array columns are read-only views of the shared memory, which the
+        ``ndarray`` attribute handler can use without copying.
+        """
+        idx = self.uuid_to_idx[uuid]
+        values = {attr: shared.array[idx]
+                  for attr, shared in self.arrays.items()}
+        values.update({attr: column[idx]
+                       for attr, column in self.columns.items()})
+        return self.Row(uuid=uuid, **values)
+
+    def close(self):
+        for shared in self.arrays.values():
+            shared.close()
+
+
+class SharedViewBackend(object):
+    """Read-only backend that answers from a :class:`.SharedStorageView`.
+
+    Rows of the preloaded tables and of the shared tables are taken from
+    memory; everything else is passed on to the wrapped backend.
+
+    Parameters
+    ----------
+    backend : :class:`.SQLStorageBackend`
+        backend opened in read mode
+    view : :class:`.SharedStorageView`
+        the view holding the preloaded data
+    """
+    def __init__(self, backend, view):
+        self.backend = backend
+        self.view = view
+
+    @property
+    def identifier(self):
+        # don't collide with other storages of the same file
+        name, mode = self.backend.identifier
+        return name + "#shared", mode
+
+    def __getattr__(self, attr):
+        return getattr(self.backend, attr)
+
+    def _split_uuids(self, uuids):
+        known = self.view.uuid_rows
+        found = [known[uuid] for uuid in uuids if uuid in known]
+        missing = [uuid for uuid in uuids if uuid not in known]
+        return found, missing
+
+    def load_uuids_table(self, uuids, ignore_missing=False):
+        found, missing = self._split_uuids(uuids)
+        if missing:
+            found += self.backend.load_uuids_table(missing, ignore_missing)
+        return found
+
+    def load_uuids_closure(self, uuids, follow_lazy=False, exclude=None):
+        # preloaded objects only refer to each other through JSON, which
+        # the closure doesn't follow
+        if exclude:
+            uuids = [uuid for uuid in uuids if uuid not in exclude]
+        found, missing = self._split_uuids(uuids)
+        if missing:
+            found += self.backend.load_uuids_closure(missing, follow_lazy,
+                                                     exclude)
+        return found
+
+    def load_table_data(self, uuid_table_rows):
+        rows = []
+        remaining = []
+        for uuid_row in uuid_table_rows:
+            row = self.view.get_row(uuid_row.uuid)
+            if row is None:
+                remaining.append(uuid_row)
+            else:
+                rows.append(row)
+        if remaining:
+            rows += self.backend.load_table_data(remaining)
+        return rows
+
+    def table_iterator(self, table_name, chunk_size=None):
+        preloaded = self.view.preloaded.get(table_name)
+        if preloaded is not None:
+            return iter(preloaded)
+        return self.backend.table_iterator(table_name, chunk_size)
+
+
+class SharedStorageView(object):
+    """Read-only view of a storage that can be shared between processes.
+
+    On creation, the rows of the simulation object tables and of all tables
+    with array columns (e.g., snapshot coordinates) are read once; the
+    arrays are copied into shared memory. Pickling the view only sends the
+    row data and the names of the shared memory blocks, so worker processes
+    can get the storage with :attr:`.storage` without reading those tables
+    from the file again, and with snapshot arrays that are views of the
+    shared memory.
+
+    The process that creates the view owns the shared memory, and should
+    call :meth:`.close` (or use the view as a context manager) when the
+    workers are done.
+
+    Parameters
+    ----------
+    storage : :class:`.GeneralStorage`
+        the storage to share; its backend must be able to reopen the file
+        (:meth:`to_dict` / :meth:`from_dict`), and the storage must be
+        recreated by ``from_dict`` of its :meth:`to_dict` with a new
+        ``backend``, as the OPS :class:`.Storage` is
+    tables : List[str]
+        tables with array columns to put into shared memory; default (None)
+        uses all tables with array columns
+    preload : List[str]
+        tables to read into memory; default (None) gives the simulation
+        object and storable function tables
+    """
+    def __init__(self, storage, tables=None, preload=None):
+        if shared_memory is None:
+            raise RuntimeError("SharedStorageView requires Python 3.8 or "
+                               "later")
+        backend = storage.backend
+        self.storage_class = storage.__class__
+        self.storage_dict = {key: value
+                             for key, value in storage.to_dict().items()
+                             if key != 'backend'}
+        self.backend_class = backend.__class__
+        self.backend_dict = backend.to_dict()
+        self.backend_dict['mode'] = 'r'
+
+        schema = backend.schema
+        if tables is None:
+            tables = [
+                table for table, entries in schema.items()
+                if table not in universal_schema
+                and any(parse_ndarray_type(type_name)
+                        for _, type_name in entries)
+            ]
+        if preload is None:
+            preload = [table for table in DEFAULT_PRELOAD_TABLES
+                       if table in schema]
+
+        # rows are kept as (fields, values) so they can be pickled
+        self._preloaded_rows = {}
+        for table in preload:
+            rows = backend.table_iterator(table, DEFAULT_CHUNK_SIZE)
+            fields = ['idx', 'uuid'] + [attr for attr, _ in schema[table]]
+            self._preloaded_rows[table] = (fields,
+                                           [tuple(row) for row in rows])
+
+        # rows of the shared tables are streamed into the shared memory,
+        # so at most one chunk of rows is in memory besides the arrays
+        self.shared_tables = {}
+        try:
+            for table in tables:
+                n_rows = backend.table_len(table)
+                rows = backend.table_iterator(table, DEFAULT_CHUNK_SIZE)
+                self.shared_tables[table] = SharedTable(table, rows,
+                                                        schema[table],
+                                                        n_rows=n_rows)
+                logger.info("Shared %d rows of table %s", n_rows, table)
+        except Exception:
+            self.close()
+            raise
+
+        all_uuids = [row[1] for _, rows in self._preloaded_rows.values()
+                     for row in rows]
+        all_uuids += itertools.chain.from_iterable(
+            table.uuids for table in self.shared_tables.values()
+        )
+        self._uuid_rows = [tuple(row)
+                           for row in backend.load_uuids_table(all_uuids)]
+        self._setup()
+
+    def _setup(self):
+        self._pid = os.getpid()
+        self._storage = None
+        self.preloaded = {}
+        for table, (fields, rows) in self._preloaded_rows.items():
+            Row = collections.namedtuple(table, fields)
+            self.preloaded[table] = [Row(*row) for row in rows]
+        self._row_lookup = {row.uuid: row
+                            for rows in self.preloaded.values()
+                            for row in rows}
+        self.uuid_rows = {row[0]: UUIDRow(*row) for row in self._uuid_rows}
+
+    def __getstate__(self):
+        dynamic = ['_pid', '_storage', 'preloaded', '_row_lookup',
+                   'uuid_rows']
+        return {key: value for key, value in self.__dict__.items()
+                if key not in dynamic}
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._setup()
+
+    def get_row(self, uuid):
+        """Table row of the given UUID, or None if not held by the view"""
+        row = self._row_lookup.get(uuid)
+        if row is not None:
+            return row
+        for table in self.shared_tables.values():
+            if uuid in table:
+                return table.row(uuid)
+        return None
+
+    @property
+    def storage(self):
+        """Storage for the current process, using the shared data"""
+        if self._storage is None or self._pid != os.getpid():
+            # (re)open after pickling or forking
+            backend = self.backend_class.from_dict(self.backend_dict)
+            dct = dict(self.storage_dict)
+            dct['backend'] = SharedViewBackend(backend, self)
+            self._storage = self.storage_class.from_dict(dct)
+            self._pid = os.getpid()
+        return self._storage
+
+    def close(self):
+        """Close the storage of this process and detach the shared memory.
+
+        In the process that created the view, this frees the shared memory.
+        """
+        if getattr(self, '_storage', None) is not None:
+            self._storage.close()
+            self._storage = None
+        for table in self.shared_tables.values():
+            table.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
@@ -1,9 +1,10 @@
 import os
 import collections
 from collections import abc
+from contextlib import contextmanager
 import sqlalchemy as sql
 from .storage import universal_schema
-from .tools import group_by, compare_sets, grouper
+from .tools import group_by, compare_sets
 from . import tools
 # import ujson as json  # ujson is no longer maintained
 import json
@@ -72,6 +73,48 @@ def sql_db_execute(engine, statements, execmany_dict=None):
         results = results[0]
     return results
 
+# rows of the uuid table for objects that have not been written yet
+UUIDRow = collections.namedtuple('UUIDRow', ['uuid', 'table', 'row'])
+
+
+class WriteBatch(object):
+    """Rows waiting to be written to the database in a single transaction.
+
+    Parameters
+    ----------
+    max_rows : int
+        number of pending rows (objects and storable function results) at
+        which the batch should be flushed
+    """
+    def __init__(self, max_rows):
+        self.max_rows = max_rows
+        self.rows = collections.OrderedDict()
+        self.uuid_rows = collections.OrderedDict()
+        self.function_results = collections.OrderedDict()
+        self.next_idx = {}
+
+    def clear(self):
+        self.rows.clear()
+        self.uuid_rows.clear()
+        self.function_results.clear()
+        self.next_idx.clear()
+
+    @property
+    def is_full(self):
+        return len(self) >= self.max_rows
+
+    def __len__(self):
+        return (sum(len(rows) for rows in self.rows.values())
+                + sum(len(res) for res in self.function_results.values()))
+
+
+def _set_sqlite_pragmas(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.close()
+
+
 from openpathsampling.netcdfplus import StorableNamedObject
 class SQLStorageBackend(StorableNamedObject):
     """Generic storage backend for SQL.
@@ -104,6 +147,11 @@ class SQLStorageBackend(StorableNamedObject):
         self.kwargs = kwargs
         self.debug = False
         self.max_query_size = 900
+        self._batch = None
+        # connection that keeps the temporary table of UUIDs excluded from
+        # closure queries, and the UUIDs currently in that table
+        self._closure_connection = None
+        self._closure_excluded = set([])
 
         # maps a specific type name, to generic type info, e.g.
         # 'ndarray.float32(1651,3)': 'ndarray'
@@ -201,6 +249,9 @@ class SQLStorageBackend(StorableNamedObject):
             self.schema = self.database_schema()
             self.table_to_number, self.number_to_table = \
                     self.internal_tables_from_db()
+            if mode == "a":
+                # files from older versions lack these
+                self.create_uuid_indexes()
 
     @classmethod
     def from_engine(cls, engine, connection_uri=None, **kwargs):
@@ -222,9 +273,128 @@ class SQLStorageBackend(StorableNamedObject):
 
 
     def close(self):
+        self.flush()
+        if self._closure_connection is not None:
+            self._closure_connection.close()
+            self._closure_connection = None
         # is this necessary?
         self.engine.dispose()
 
+    @property
+    def is_batching(self):
+        """bool : whether writes are collected in a :class:`.WriteBatch`
+        """
+        return self._batch is not None
+
+    def enable_batching(self, max_rows=10000):
+        """Collect writes and flush them in a single transaction.
+
+        New objects and storable function results are kept in memory until
+        ``max_rows`` are pending, or until :meth:`.flush` is called, and
+        are then written with one ``executemany`` per table. Pending
+        objects are found by :meth:`.load_uuids_table`; other reads flush
+        the batch first. For SQLite, this also switches the database to
+        write-ahead logging with ``synchronous=NORMAL``.
+
+        Parameters
+        ----------
+        max_rows : int
+            number of pending rows that triggers a flush
+        """
+        if self._batch is None:
+            self._batch = WriteBatch(max_rows)
+        else:
+            self._batch.max_rows = max_rows
+
+        if self.engine.dialect.name == 'sqlite':
+            if not sql.event.contains(self.engine, 'connect',
+                                      _set_sqlite_pragmas):
+                sql.event.listen(self.engine, 'connect',
+                                 _set_sqlite_pragmas)
+            # connections already in the pool don't see the listener
+            with self.engine.connect() as conn:
+                _set_sqlite_pragmas(conn.connection, None)
+
+    def disable_batching(self):
+        """Flush pending writes and go back to writing on every call.
+        """
+        self.flush()
+        self._batch = None
+
+    @contextmanager
+    def batch_writes(self, max_rows=10000):
+        """Context manager to batch all writes within the block.
+
+        Everything pending is written at the end of the block, also if an
+        exception is raised. See :meth:`.enable_batching`.
+        """
+        was_batching = self.is_batching
+        self.enable_batching(max_rows)
+        try:
+            yield self
+        finally:
+            if was_batching:
+                self.flush()
+            else:
+                self.disable_batching()
+
+    def flush(self):
+        """Write all pending rows of the batch in one transaction.
+        """
+        batch = self._batch
+        if not batch:
+            return
+
+        logger.debug("Flushing %d rows", len(batch))
+        uuid_table = self.metadata.tables['uuid']
+        # an empty list would insert a row of default values
+        with self.engine.begin() as conn:
+            for table_name, rows in batch.rows.items():
+                if rows:
+                    conn.execute(self.metadata.tables[table_name].insert(),
+                                 rows)
+            if batch.uuid_rows:
+                conn.execute(uuid_table.insert(),
+                             [dict(row._asdict())
+                              for row in batch.uuid_rows.values()])
+            for table_name, results in batch.function_results.items():
+                if results:
+                    conn.execute(
+                        self.metadata.tables[table_name].insert(),
+                        [{'uuid': uuid, 'value': value}
+                         for uuid, value in results.items()]
+                    )
+
+        batch.clear()
+
+    def _next_batch_idx(self, table_name):
+        batch = self._batch
+        if table_name not in batch.next_idx:
+            table = self.metadata.tables[table_name]
+            max_idx_query = sql.select([sql.func.max(table.c.idx)])
+            with self.engine.connect() as conn:
+                max_idx = conn.execute(max_idx_query).scalar()
+            # SQL counts from 1
+            batch.next_idx[table_name] = (max_idx or 0) + 1
+        return batch.next_idx[table_name]
+
+    def _add_to_batch(self, table_name, objects):
+        batch = self._batch
+        table_num = self.table_to_number[table_name]
+        idx = self._next_batch_idx(table_name)
+        rows = batch.rows.setdefault(table_name, [])
+        for obj in objects:
+            row = dict(obj)
+            row['idx'] = idx
+            rows.append(row)
+            batch.uuid_rows[obj['uuid']] = UUIDRow(obj['uuid'], table_num,
+                                                   idx)
+            idx += 1
+
+        batch.next_idx[table_name] = idx
+        if batch.is_full:
+            self.flush()
+
     @property
     def metadata(self):
         return self._metadata
@@ -285,12 +455,12 @@ class SQLStorageBackend(StorableNamedObject):
     def _load_from_table(self, table_name, idx_list):
         # this is not public API (assumes idx_list, which is reserved by not
         # guaranteed)
+        self.flush()
         table = self.metadata.tables[table_name]
         results = []
         with self.engine.connect() as conn:
-            for block in grouper(idx_list, 1000):
-                or_stmt = sql.or_(*(table.c.idx == idx for idx in block))
-                sel = table.select(or_stmt)
+            for block in tools.block(list(idx_list), self.max_query_size):
+                sel = table.select().where(table.c.idx.in_(block))
                 results.extend(list(conn.execute(sel)))
 
         return results
@@ -327,6 +497,24 @@ class SQLStorageBackend(StorableNamedObject):
 
         self.metadata.create_all(self.engine)
         self.schema.update(schema)
+        self.create_uuid_indexes()
+
+    def create_uuid_indexes(self):
+        """Index the ``uuid`` column of all data tables.
+
+        This makes finding the rows of given UUIDs, as done when saving and
+        in :meth:`.load_uuids_closure`, independent of the table size.
+        Existing indexes are kept.
+        """
+        for table_name in self.schema:
+            if table_name in universal_schema:
+                continue
+            table = self.metadata.tables[table_name]
+            index_name = table_name + '_uuid_index'
+            if any(index.name == index_name for index in table.indexes):
+                continue
+            index = sql.Index(index_name, table.c.uuid)
+            index.create(self.engine, checkfirst=True)
 
     def has_table(self, table_name):
         """Returns whether this table is known to the database.
@@ -385,6 +573,17 @@ class SQLStorageBackend(StorableNamedObject):
         unknown_uuids -= set(found_results.keys())
 
         # only store the results that haven't been stored
+        if self._batch is not None:
+            pending = self._batch.function_results.setdefault(
+                table_name, collections.OrderedDict()
+            )
+            pending.update((uuid, result_dict[uuid])
+                           for uuid in unknown_uuids)
+            self.known_uuids[table_name].update(set_uuids)
+            if self._batch.is_full:
+                self.flush()
+            return
+
         results = [{'uuid': uuid, 'value': result_dict[uuid]}
                    for uuid in unknown_uuids]
         table = self.metadata.tables[table_name]
@@ -424,6 +623,10 @@ class SQLStorageBackend(StorableNamedObject):
 
         logger.debug("Found {} UUIDs".format(len(results)))
         result_dict = {uuid: value for uuid, value in results}
+        if self._batch is not None:
+            pending = self._batch.function_results.get(table_name, {})
+            result_dict.update({uuid: pending[uuid] for uuid in uuids
+                                if uuid in pending})
         return result_dict
 
     def load_storable_function_table(self, table_name):
@@ -448,6 +651,10 @@ class SQLStorageBackend(StorableNamedObject):
         objects : list of dict
             dict representation of the objects to be added
         """
+        if self._batch is not None:
+            self._add_to_batch(table_name, objects)
+            return
+
         # this will insert objects into the table
         table = self.metadata.tables[table_name]
         table_num = self.table_to_number[table_name]
@@ -501,6 +708,12 @@ class SQLStorageBackend(StorableNamedObject):
         uuid_table = self.metadata.tables['uuid']
         logger.debug("Looking for {} UUIDs".format(len(uuids)))
         results = []
+        if self._batch is not None:
+            # objects waiting in the batch are answered from memory
+            pending = self._batch.uuid_rows
+            results = [pending[uuid] for uuid in uuids if uuid in pending]
+            uuids = [uuid for uuid in uuids if uuid not in pending]
+
         for uuid_block in tools.block(uuids, self.max_query_size):
             logger.debug("New block of {} UUIDs".format(len(uuid_block)))
             uuid_sel = uuid_table.select().\
@@ -520,6 +733,154 @@ class SQLStorageBackend(StorableNamedObject):
 
         return results
 
+    @property
+    def supports_closure_queries(self):
+        """bool : whether :meth:`.load_uuids_closure` can be used
+
+        This needs SQLite 3.34 or later, which allows several recursive
+        selects in a common table expression.
+        """
+        if self.engine.dialect.name != 'sqlite':
+            return False
+        dbapi = self.engine.dialect.dbapi
+        return dbapi.sqlite_version_info >= (3, 34, 0)
+
+    def _closure_selects(self, follow_lazy, exclude_table=None):
+        # one recursive select per column that refers to other objects
+        quote = self.engine.dialect.identifier_preparer.quote
+        uuid_types = {'uuid', 'lazy'} if follow_lazy else {'uuid'}
+        join = "FROM closure c JOIN {table} t ON t.uuid = c.uuid"
+        if exclude_table is None:
+            exclude = ""
+        else:
+            exclude = " AND {value} NOT IN (SELECT uuid FROM %s)" % (
+                exclude_table
+            )
+        selects = []
+        for table_name, entries in self.schema.items():
+            if table_name in universal_schema:
+                continue
+            for attr, attr_type in entries:
+                fmt = {'table': quote(table_name), 'col': quote(attr)}
+                if attr_type in uuid_types:
+                    value = "t.{col}"
+                    select = ("SELECT " + value + " " + join
+                              + " WHERE t.{col} IS NOT NULL")
+                elif attr_type == 'list_uuid':
+                    # entries are encoded as 'UUID(...)', see decode_uuid
+                    value = "substr(j.value, 6, length(j.value) - 6)"
+                    select = ("SELECT " + value + " "
+                              + join + ", json_each(t.{col}) j "
+                              + "WHERE j.type = 'text'")
+                else:
+                    continue
+                select += exclude.format(value=value)
+                selects.append(select.format(**fmt))
+        return selects
+
+    def _update_closure_exclude(self, exclude):
+        """Make the temporary exclude table contain exactly ``exclude``.
+
+        The table is kept between calls, on its own connection, so only the
+        UUIDs that changed since the last call are written.
+        """
+        conn = self._closure_connection
+        if conn is None:
+            conn = self._closure_connection = self.engine.connect()
+            conn.execute(sql.text(
+                "CREATE TEMP TABLE IF NOT EXISTS closure_exclude "
+                "(uuid TEXT PRIMARY KEY)"
+            ))
+            conn.execute(sql.text("DELETE FROM temp.closure_exclude"))
+            self._closure_excluded = set([])
+
+        excluded = self._closure_excluded
+        removed = [uuid for uuid in excluded if uuid not in exclude]
+        added = [uuid for uuid in exclude if uuid not in excluded]
+        if removed:
+            conn.execute(
+                sql.text("DELETE FROM temp.closure_exclude WHERE uuid = :u"),
+                [{'u': uuid} for uuid in removed]
+            )
+            excluded.difference_update(removed)
+        if added:
+            conn.execute(
+                sql.text("INSERT INTO temp.closure_exclude VALUES (:u)"),
+                [{'u': uuid} for uuid in added]
+            )
+            excluded.update(added)
+        return conn
+
+    def load_uuids_closure(self, uuids, follow_lazy=False, exclude=None):
+        """Load the UUID table rows of objects and all their dependencies.
+
+        Dependencies in ``uuid`` and ``list_uuid`` columns (and ``lazy``
+        columns, if ``follow_lazy``) are followed recursively within the
+        database, so the whole closure takes one query per block of
+        ``max_query_size`` input UUIDs, independent of the depth of the
+        object graph. UUIDs within ``json_obj`` columns are not followed.
+        Requires :attr:`.supports_closure_queries`.
+
+        Parameters
+        ----------
+        uuids : Iterable[str]
+            UUIDs to start from
+        follow_lazy : bool
+            whether to include the dependencies in ``lazy`` columns
+        exclude : Iterable[str] or None
+            UUIDs that are neither returned nor followed (e.g., objects
+            that are already loaded). They are kept in a temporary table
+            that the recursive query checks, so that the query stops at
+            known objects. The table persists between calls, so repeated
+            loads with a growing cache only write the new UUIDs.
+
+        Returns
+        -------
+        list
+            rows of the UUID table, including those for ``uuids`` (except
+            excluded ones)
+        """
+        self.flush()
+        if not exclude:
+            exclude = set([])
+        elif not isinstance(exclude, (set, frozenset)):
+            exclude = set(exclude)
+        uuids = [uuid for uuid in uuids if uuid not in exclude]
+        if not uuids:
+            return []
+
+        if exclude:
+            conn = self._update_closure_exclude(exclude)
+            selects = self._closure_selects(follow_lazy,
+                                            "temp.closure_exclude")
+        else:
+            conn = self._closure_connection or self.engine.connect()
+            selects = self._closure_selects(follow_lazy)
+
+        results = {}
+        try:
+            for uuid_block in tools.block(uuids, self.max_query_size):
+                if not uuid_block:
+                    continue
+                params = {'u%d' % num: uuid
+                          for num, uuid in enumerate(uuid_block)}
+                initial = "VALUES " + ", ".join("(:%s)" % key
+                                                for key in params)
+                query = (
+                    "WITH RECURSIVE closure(uuid) AS ("
+                    + " UNION ".join([initial] + selects)
+                    + ") SELECT u.* FROM closure c "
+                    + "JOIN uuid u ON u.uuid = c.uuid"
+                )
+                rows = list(conn.execute(sql.text(query), params))
+                results.update((row.uuid, row) for row in rows)
+        finally:
+            if conn is not self._closure_connection:
+                conn.close()
+
+        logger.debug("Found {} UUIDs in closure".format(len(results)))
+        return list(results.values())
+
     def load_table_data(self, uuid_table_rows):
         # this pulls out a table the information for the relevant UUIDs
         uuid_table_rows = list(uuid_table_rows)  # iterator to list
@@ -574,6 +935,7 @@ class SQLStorageBackend(StorableNamedObject):
         -------
         ??? TODO
         """
+        self.flush()
         table = self.metadata.tables[table_name]
         with self.engine.connect() as conn:
             results = conn.execute(table.select())
@@ -598,18 +960,43 @@ class SQLStorageBackend(StorableNamedObject):
         """
         return self.number_to_table[uuid_row.table]
 
-    def table_iterator(self, table_name):
-        """Iterate over l rows in the table
+    def table_iterator(self, table_name, chunk_size=None):
+        """Iterate over all rows in the table
+
+        Parameters
+        ----------
+        table_name : str
+            name of the table
+        chunk_size : int or None
+            if given, rows are read in chunks of this size (in order of
+            their index), so only one chunk is in memory at a time; by
+            default, all rows are read at once
         """
-        # TODO: this can probably be done in a more low-level way that
-        # doesn't require memory caching everything
+        self.flush()
         table = self.metadata.tables[table_name]
-        with self.engine.connect() as conn:
-            results = list(conn.execute(table.select()))
-        for row in results:
-            yield row
+        if chunk_size is None:
+            # TODO: this can probably be done in a more low-level way that
+            # doesn't require memory caching everything
+            with self.engine.connect() as conn:
+                results = list(conn.execute(table.select()))
+            for row in results:
+                yield row
+            return
+
+        last_idx = 0  # SQL counts from 1
+        while True:
+            sel = table.select().where(table.c.idx > last_idx)\
+                    .order_by(table.c.idx).limit(chunk_size)
+            with self.engine.connect() as conn:
+                results = list(conn.execute(sel))
+            for row in results:
+                yield row
+            if len(results) < chunk_size:
+                return
+            last_idx = results[-1].idx
 
     def table_len(self, table_name):
+        self.flush()
         table = self.metadata.tables[table_name]
         count_query = sql.select([sql.func.count()]).select_from(table)
         with self.engine.connect() as conn:
@@ -625,6 +1012,7 @@ class SQLStorageBackend(StorableNamedObject):
         return count
 
     def table_get_item(self, table_name, item):
+        self.flush()
         table = self.metadata.tables[table_name]
         # SQL counts from 1; Python counts from 0
         item_sel = table.select().where(table.c.idx == item + 1)
@@ -0,0 +1,121 @@
+import gc
+import os
+import pickle
+import multiprocessing
+
+import numpy as np
+import pytest
+
+from .shared_view import *
+
+import openpathsampling as paths
+from openpathsampling.tests.test_helpers import make_1d_traj
+from openpathsampling.experimental.storage.ops_storage import Storage
+
+pytestmark = pytest.mark.skipif(shared_memory is None,
+                                reason="shared memory requires Python 3.8")
+
+
+def _first_frame(view):
+    # module-level so that it can be sent to spawned worker processes
+    storage = view.storage
+    traj = storage.trajectories[0]
+    coords = traj[1].coordinates
+    return (float(coords[0, 0]), coords.flags.writeable,
+            storage.ensembles['len3'].name)
+
+
+class TestSharedArray(object):
+    def setup(self):
+        self.shared = SharedArray((3, 2), np.float32)
+        self.shared.array[:] = np.arange(6).reshape(3, 2)
+
+    def teardown(self):
+        self.shared.close()
+
+    def test_pickle_attaches(self):
+        copy = pickle.loads(pickle.dumps(self.shared))
+        assert not copy.owner
+        assert copy.name == self.shared.name
+        np.testing.assert_array_equal(copy.array, self.shared.array)
+        assert not copy.array.flags.writeable
+        self.shared.array[0, 0] = 10.0
+        assert copy.array[0, 0] == 10.0
+        copy.close()
+
+    def test_close_unlinks(self):
+        name = self.shared.name
+        self.shared.close()
+        with pytest.raises(FileNotFoundError):
+            SharedArray((3, 2), np.float32, name=name)
+
+
+class TestSharedStorageView(object):
+    def setup(self):
+        self.filename = "test_shared_view.sql"
+        self._delete_file()
+        storage = Storage(self.filename, 'w')
+        storage.save(paths.LengthEnsemble(3).named('len3'))
+        storage.save(make_1d_traj([0.1, 0.2, 0.3]))
+        storage.close()
+        del storage
+        gc.collect()
+        self.storage = Storage(self.filename, 'r')
+        self.view = SharedStorageView(self.storage)
+
+    def _delete_file(self):
+        if os.path.isfile(self.filename):
+            os.remove(self.filename)
+
+    def teardown(self):
+        self.view.close()
+        self.storage.close()
+        self._delete_file()
+
+    def test_contents(self):
+        assert list(self.view.shared_tables) == ['snapshot0']
+        snapshots = self.view.shared_tables['snapshot0']
+        assert len(snapshots) == 3
+        coords = snapshots.arrays['coordinates'].array
+        assert coords.shape == (3, 1, 3)
+        np.testing.assert_allclose(coords[:, 0, 0], [0.1, 0.2, 0.3])
+        assert len(self.view.preloaded['simulation_objects']) > 0
+
+    def test_streamed_table(self):
+        # rows from an iterator give the same table as from a list
+        backend = self.storage.backend
+        schema = backend.schema['snapshot0']
+        rows = list(backend.table_iterator('snapshot0'))
+        streamed = SharedTable('snapshot0', iter(rows), schema, n_rows=3)
+        expected = self.view.shared_tables['snapshot0']
+        assert streamed.uuids == expected.uuids
+        np.testing.assert_array_equal(
+            streamed.arrays['coordinates'].array,
+            expected.arrays['coordinates'].array
+        )
+        streamed.close()
+        with pytest.raises(RuntimeError):
+            SharedTable('snapshot0', iter(rows[:2]), schema, n_rows=3)
+
+    def test_storage(self):
+        storage = self.view.storage
+        assert storage is not self.storage
+        assert storage is self.view.storage
+        traj = storage.trajectories[0]
+        coords = traj[1].coordinates
+        np.testing.assert_allclose(coords, [[0.2, 0.0, 0.0]], rtol=1e-6)
+        # a view of the shared memory, not a copy
+        assert not coords.flags.writeable
+        assert not coords.flags.owndata
+
+    def test_pickled_view(self):
+        copy = pickle.loads(pickle.dumps(self.view))
+        assert copy.preloaded == self.view.preloaded
+        assert _first_frame(copy) == _first_frame(self.view)
+        copy.close()
+
+    def test_worker_processes(self):
+        ctx = multiprocessing.get_context('spawn')
+        with ctx.Pool(2) as pool:
+            results = pool.map(_first_frame, [self.view] * 2)
+        assert results == [_first_frame(self.view)] * 2
@@ -235,6 +235,162 @@ class TestSQLStorageBackend(object):
             for attr in dct:
                 assert getattr(row, attr) == dct[attr]
 
+        # reading in chunks gives the same rows
+        for chunk_size in [1, 2, len(table_iter), len(table_iter) + 1]:
+            chunked = list(self.database.table_iterator(table, chunk_size))
+            assert chunked == table_iter
+
+    def _raw_rows(self, table_name):
+        table = self.database.metadata.tables[table_name]
+        with self.database.engine.connect() as conn:
+            return list(conn.execute(table.select()))
+
+    def test_batch_writes(self):
+        schema = {'samples': self.schema['samples']}
+        self.database.register_schema(schema, self.table_to_class)
+        sample_dict = self._sample_data_dict()
+        self.database.enable_batching()
+        self.database.add_to_table('samples', sample_dict[:2])
+        assert self._raw_rows('samples') == []
+        # pending objects are found without writing them
+        uuid_rows = self.database.load_uuids_table(
+            [s['uuid'] for s in sample_dict]
+        )
+        assert [(r.uuid, r.table, r.row) for r in uuid_rows] == [
+            (s['uuid'], 0, idx + 1) for idx, s in enumerate(sample_dict[:2])
+        ]
+        assert self._raw_rows('uuid') == []
+
+        self.database.flush()
+        self.database.add_to_table('samples', sample_dict[2:])
+        self.database.disable_batching()
+        assert not self.database.is_batching
+        samples = {row.idx: row.uuid for row in self._raw_rows('samples')}
+        uuids = {row.uuid: row.row for row in self._raw_rows('uuid')}
+        assert len(samples) == len(uuids) == 3
+        for uuid, row in uuids.items():
+            assert samples[row] == uuid
+
+    def test_batch_reads_flush(self):
+        schema = {'samples': self.schema['samples']}
+        self.database.register_schema(schema, self.table_to_class)
+        sample_dict = self._sample_data_dict()
+        with self.database.batch_writes():
+            self.database.add_to_table('samples', sample_dict)
+            assert self.database.table_len('samples') == 3
+            row = self.database.table_get_item('samples', 1)
+            assert row.uuid == sample_dict[1]['uuid']
+        assert not self.database.is_batching
+
+    def test_batch_max_rows(self):
+        schema = {'samples': self.schema['samples']}
+        self.database.register_schema(schema, self.table_to_class)
+        self.database.enable_batching(max_rows=3)
+        sample_dict = self._sample_data_dict()
+        self.database.add_to_table('samples', sample_dict[:2])
+        assert len(self._raw_rows('samples')) == 0
+        self.database.add_to_table('samples', sample_dict[2:])
+        assert len(self._raw_rows('samples')) == 3
+
+    def test_batch_storable_function_results(self):
+        self.database.register_storable_function('func', 'float')
+        self.database.enable_batching()
+        self.database.add_storable_function_results('func', {'a': 1.0,
+                                                             'b': 2.0})
+        assert self._raw_rows('func') == []
+        results = self.database.load_storable_function_results('func',
+                                                               ['a', 'c'])
+        assert results == {'a': 1.0}
+        self.database.flush()
+        assert len(self._raw_rows('func')) == 2
+        # nothing new to write
+        self.database.add_storable_function_results('func', {'a': 1.0})
+        self.database.flush()
+        assert len(self._raw_rows('func')) == 2
+
+    def test_batch_sqlite_wal(self):
+        database = SQLStorageBackend('test.sql', mode='w')
+        database.enable_batching()
+        with database.engine.connect() as conn:
+            mode = conn.execute("PRAGMA journal_mode").scalar()
+        database.close()
+        assert mode == 'wal'
+
+    def test_uuid_indexes(self):
+        self._add_sample_data()
+        inspector = sql.inspect(self.database.engine)
+        indexes = inspector.get_indexes('samples')
+        assert [(idx['name'], idx['column_names']) for idx in indexes] == \
+                [('samples_uuid_index', ['uuid'])]
+        # creating them again does nothing
+        self.database.create_uuid_indexes()
+        assert len(inspector.get_indexes('samples')) == 1
+
+    def _add_closure_data(self):
+        schema = {
+            'sample_sets': [('samples', 'list_uuid')],
+            'samples': [('trajectory', 'uuid'), ('details', 'lazy')],
+            'trajectories': [('snapshots', 'list_uuid')],
+            'details': [('json', 'json_obj')],
+        }
+        self.database.register_schema(schema, dict.fromkeys(schema, tuple))
+        self.database.add_to_table('details', [
+            {'uuid': 'det', 'json': '{"a": "UUID(snap0)"}'}
+        ])
+        self.database.add_to_table('trajectories', [
+            {'uuid': 'traj0', 'snapshots': '["UUID(snap0)", "UUID(snap1)"]'},
+            {'uuid': 'traj1', 'snapshots': '["UUID(snap1)"]'},
+        ])
+        self.database.add_to_table('samples', [
+            {'uuid': 'samp0', 'trajectory': 'traj0', 'details': 'det'},
+            {'uuid': 'samp1', 'trajectory': 'traj1', 'details': None},
+        ])
+        self.database.add_to_table('sample_sets', [
+            {'uuid': 'sset', 'samples': '["UUID(samp0)", "UUID(samp1)"]'}
+        ])
+
+    def test_load_uuids_closure(self):
+        if not self.database.supports_closure_queries:
+            pytest.skip("SQLite too old for closure queries")
+        self._add_closure_data()
+        closure = self.database.load_uuids_closure(['sset'])
+        assert {row.uuid for row in closure} == \
+                {'sset', 'samp0', 'samp1', 'traj0', 'traj1'}
+        expected = {r.uuid: r for r in self.database.load_uuids_table(
+            ['sset', 'samp0', 'samp1', 'traj0', 'traj1', 'det']
+        )}
+        for row in closure:
+            assert tuple(row) == tuple(expected[row.uuid])
+        # UUIDs in JSON are not followed
+        closure = self.database.load_uuids_closure(['samp0', 'samp1'],
+                                                   follow_lazy=True)
+        assert {row.uuid for row in closure} == \
+                {'samp0', 'samp1', 'traj0', 'traj1', 'det'}
+        assert self.database.load_uuids_closure([]) == []
+
+    def test_load_uuids_closure_exclude(self):
+        if not self.database.supports_closure_queries:
+            pytest.skip("SQLite too old for closure queries")
+        self._add_closure_data()
+        # excluded UUIDs are not followed: traj1 is only reachable via samp1
+        closure = self.database.load_uuids_closure(['sset'],
+                                                   exclude={'samp1'})
+        assert {row.uuid for row in closure} == {'sset', 'samp0', 'traj0'}
+        # excluded UUIDs deeper in the graph are also not returned
+        closure = self.database.load_uuids_closure(
+            ['sset'], exclude={'traj0', 'traj1'}
+        )
+        assert {row.uuid for row in closure} == {'sset', 'samp0', 'samp1'}
+        assert self.database.load_uuids_closure(['sset'],
+                                                exclude={'sset'}) == []
+        # the temporary table doesn't affect later queries
+        closure = self.database.load_uuids_closure(['sset'])
+        assert len(closure) == 5
+        closure = self.database.load_uuids_closure(['sset'],
+                                                   exclude={'traj1'})
+        assert {row.uuid for row in closure} == \
+                {'sset', 'samp0', 'samp1', 'traj0'}
+
     def test_table_len(self):
         schema = {'samples': [('replica', 'int'),
                              ('ensemble', 'uuid'),
@@ -450,10 +450,13 @@ class TwoWayShootingStrategy(SingleEnsembleMoveStrategy):
     replace : bool
         whether to replace existing movers, default True. See
         :class:`.MoveStrategy` documentation for details.
+    engine_pool : :class:`.EnginePool` or None
+        if given, the two halves of each shot run at the same time (see
+        :class:`.AbstractTwoWayShootingMover`). Default None.
     """
     _level = levels.MOVER
     def __init__(self, modifier, selector=None, ensembles=None, engine=None,
-                 group="shooting", replace=True):
+                 group="shooting", replace=True, engine_pool=None):
         super(TwoWayShootingStrategy, self).__init__(
             ensembles=ensembles, group=group, replace=replace
         )
@@ -462,6 +465,7 @@ class TwoWayShootingStrategy(SingleEnsembleMoveStrategy):
             selector = paths.UniformSelector()
         self.selector = selector
         self.engine = engine
+        self.engine_pool = engine_pool
 
     def make_movers(self, scheme):
         parameters = self.get_parameters(
@@ -474,7 +478,8 @@ class TwoWayShootingStrategy(SingleEnsembleMoveStrategy):
                 ensemble=ens,
                 selector=sel,
                 modifier=mod,
-                engine=eng
+                engine=eng,
+                engine_pool=self.engine_pool
             ).named("TwoWayShooting " + ens.name)
             for (ens, sel, mod, eng) in parameters
         ]
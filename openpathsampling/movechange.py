@@ -82,6 +82,18 @@ class MoveChange(TreeMixin, StorableObject):
             'cls': self.__class__.__name__
         }
 
+    @classmethod
+    def from_dict(cls, dct):
+        # mirrors MoveChangeStore._load: subclasses have different __init__
+        # signatures, so we set the stored attributes directly
+        obj = cls.__new__(cls)
+        MoveChange.__init__(obj, mover=dct['mover'])
+        obj.samples = dct['samples']
+        obj.input_samples = dct.get('input_samples')
+        obj.subchanges = dct['subchanges']
+        obj.details = dct['details']
+        return obj
+
     # hook for TreeMixin
     @property
     def _subnodes(self):
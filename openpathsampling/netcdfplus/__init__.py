@@ -1,6 +1,6 @@
 from .base import StorableNamedObject, StorableObject, create_to_dict
 from .cache import WeakKeyCache, WeakLRUCache, WeakValueCache, MaxCache, \
-    NoCache, Cache, LRUCache, LRUChunkLoadingCache
+    NoCache, Cache, LRUCache, LRUChunkLoadingCache, CacheStats
 from .dictify import ObjectJSON, StorableObjectJSON, UUIDObjectJSON
 from .netcdfplus import NetCDFPlus
 
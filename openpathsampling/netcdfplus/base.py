@@ -50,6 +50,24 @@ class StorableObject(object):
     def ruuid(uid):
         return uid ^ 1
 
+    @staticmethod
+    def reset_uuid_generator():
+        """
+        Start a new, independent range of UUIDs for newly created objects
+
+        A forked process inherits the UUID counter of its parent. Call this
+        in the child before creating storable objects, otherwise parent
+        and child (or several children) create objects with identical UUIDs.
+        """
+        StorableObject.INSTANCE_UUID = list(uuid.uuid4().fields[:-1])
+        StorableObject.CREATION_COUNT = 0
+        StorableObject.ACTIVE_LONG = int(uuid.UUID(
+            fields=tuple(
+                StorableObject.INSTANCE_UUID +
+                [StorableObject.CREATION_COUNT]
+            )
+        ))
+
     def __init__(self):
         self.__uuid__ = StorableObject.get_uuid()
 
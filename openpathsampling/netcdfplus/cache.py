@@ -4,10 +4,117 @@ import weakref
 __author__ = 'Jan-Hendrik Prinz'
 
 
+class CacheStats(object):
+    """
+    Counters for the use of a cache
+
+    Attributes
+    ----------
+    hits : int
+        number of lookups that found the object in the cache
+    misses : int
+        number of lookups that did not find the object in the cache
+    evictions : int
+        number of objects (or chunks) removed to keep the size limit. For a
+        :class:`WeakLRUCache` these are only moved to the weak references.
+    chunk_loads : int
+        number of chunks read from the file (only
+        :class:`LRUChunkLoadingCache`)
+    """
+
+    fields = ('hits', 'misses', 'evictions', 'chunk_loads')
+
+    def __init__(self, hits=0, misses=0, evictions=0, chunk_loads=0):
+        self.hits = hits
+        self.misses = misses
+        self.evictions = evictions
+        self.chunk_loads = chunk_loads
+
+    @property
+    def lookups(self):
+        """
+        int : the number of lookups, hits and misses
+        """
+        return self.hits + self.misses
+
+    @property
+    def hit_rate(self):
+        """
+        float : the fraction of lookups that were hits, 0 without lookups
+        """
+        lookups = self.lookups
+        return float(self.hits) / lookups if lookups else 0.0
+
+    def reset(self):
+        """
+        Set all counters to zero
+        """
+        for field in self.fields:
+            setattr(self, field, 0)
+
+    def copy(self):
+        return CacheStats(**self.to_dict())
+
+    def to_dict(self):
+        return {field: getattr(self, field) for field in self.fields}
+
+    def __add__(self, other):
+        return CacheStats(**{
+            field: getattr(self, field) + getattr(other, field)
+            for field in self.fields
+        })
+
+    def __sub__(self, other):
+        return CacheStats(**{
+            field: getattr(self, field) - getattr(other, field)
+            for field in self.fields
+        })
+
+    def __eq__(self, other):
+        return isinstance(other, CacheStats) and \
+            self.to_dict() == other.to_dict()
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __repr__(self):
+        return 'CacheStats(%s)' % ', '.join(
+            '%s=%d' % (field, getattr(self, field)) for field in self.fields
+        )
+
+
 class Cache(object):
     """
     A cache like dict
+
+    Attributes
+    ----------
+    stats : :class:`CacheStats` or None
+        usage counters, if enabled by :meth:`enable_stats`. Counting is
+        off by default, so that it does not slow down normal use.
     """
+
+    stats = None
+
+    def enable_stats(self):
+        """
+        Start counting hits, misses and evictions in :attr:`stats`
+
+        Returns
+        -------
+        :class:`CacheStats`
+            the counters; existing counters are kept
+        """
+        if self.stats is None:
+            self.stats = CacheStats()
+        return self.stats
+
+    def disable_stats(self):
+        """
+        Stop counting and remove :attr:`stats`
+        """
+        self.stats = None
+
     @property
     def count(self):
         """
@@ -100,6 +207,8 @@ class NoCache(Cache):
         super(NoCache, self).__init__()
 
     def __getitem__(self, item):
+        if self.stats is not None:
+            self.stats.misses += 1
         raise KeyError('No Cache has no items')
 
     def __contains__(self, item):
@@ -137,6 +246,19 @@ class MaxCache(dict, Cache):
         super(MaxCache, self).__init__()
         Cache.__init__(self)
 
+    def __getitem__(self, item):
+        if self.stats is None:
+            return dict.__getitem__(self, item)
+
+        try:
+            obj = dict.__getitem__(self, item)
+        except KeyError:
+            self.stats.misses += 1
+            raise
+
+        self.stats.hits += 1
+        return obj
+
     @property
     def count(self):
         return len(self), 0
@@ -173,10 +295,8 @@ class LRUCache(Cache):
 
     @size_limit.setter
     def size_limit(self, new_size):
-        if new_size < self.size_limit:
-            self._check_size_limit()
-
         self._size_limit = new_size
+        self._check_size_limit()
 
     def __iter__(self):
         return iter(self._cache)
@@ -185,8 +305,16 @@ class LRUCache(Cache):
         return reversed(self._cache)
 
     def __getitem__(self, item):
-        obj = self._cache.pop(item)
+        try:
+            obj = self._cache.pop(item)
+        except KeyError:
+            if self.stats is not None:
+                self.stats.misses += 1
+            raise
+
         self._cache[item] = obj
+        if self.stats is not None:
+            self.stats.hits += 1
         return obj
 
     def __setitem__(self, key, value, **kwargs):
@@ -196,6 +324,8 @@ class LRUCache(Cache):
     def _check_size_limit(self):
         while len(self._cache) > self.size_limit:
             self._cache.popitem(last=False)
+            if self.stats is not None:
+                self.stats.evictions += 1
 
     def __contains__(self, item):
         return item in self._cache
@@ -258,20 +388,25 @@ class WeakLRUCache(Cache):
         try:
             obj = self._cache.pop(item)
             self._cache[item] = obj
-            return obj
         except KeyError:
-            obj = self._weak_cache[item]
+            try:
+                obj = self._weak_cache[item]
+            except KeyError:
+                if self.stats is not None:
+                    self.stats.misses += 1
+                raise
             del self._weak_cache[item]
             self._cache[item] = obj
             self._check_size_limit()
-            return obj
+
+        if self.stats is not None:
+            self.stats.hits += 1
+        return obj
 
     @size_limit.setter
     def size_limit(self, new_size):
-        if new_size < self.size_limit:
-            self._check_size_limit()
-
         self._size_limit = new_size
+        self._check_size_limit()
 
     def __setitem__(self, key, value, **kwargs):
         try:
@@ -311,6 +446,8 @@ class WeakLRUCache(Cache):
         if self.size_limit is not None:
             while len(self._cache) > self.size_limit:
                 self._weak_cache.__setitem__(*self._cache.popitem(last=False))
+                if self.stats is not None:
+                    self.stats.evictions += 1
 
     def __contains__(self, item):
         return item in self._cache or item in self._weak_cache
@@ -445,6 +582,8 @@ class LRUChunkLoadingCache(Cache):
                 right = min(self._size, left + self.chunksize)
                 self._chunkdict[chunk_idx] = []
                 self._chunkdict[chunk_idx].extend(self.variable[left:right])
+                if self.stats is not None:
+                    self.stats.chunk_loads += 1
 
                 self._check_size_limit()
 
@@ -457,6 +596,8 @@ class LRUChunkLoadingCache(Cache):
 
                 if right > left:
                     chunk.extend(self.variable[left:right])
+                    if self.stats is not None:
+                        self.stats.chunk_loads += 1
 
     def _update_chunk_order(self, chunk_idx):
         chunk = self._chunkdict[chunk_idx]
@@ -472,10 +613,15 @@ class LRUChunkLoadingCache(Cache):
                 obj = self._chunkdict[chunk_idx][item % chunksize]
                 if chunk_idx != self._firstchunk:
                     self._update_chunk_order(chunk_idx)
+                if self.stats is not None:
+                    self.stats.hits += 1
                 return obj
             except IndexError:
                 pass
 
+        if self.stats is not None:
+            self.stats.misses += 1
+
         self.load_chunk(chunk_idx)
 
         try:
@@ -522,6 +668,8 @@ class LRUChunkLoadingCache(Cache):
     def _check_size_limit(self):
         if len(self._chunkdict) > self.max_chunks:
             self._chunkdict.popitem(last=False)
+            if self.stats is not None:
+                self.stats.evictions += 1
 
     def __contains__(self, item):
         return any(item in chunk for chunk in self._chunkdict)
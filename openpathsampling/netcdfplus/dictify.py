@@ -590,6 +590,13 @@ class ObjectJSON(object):
         simplified = ujson.loads(json_string)
         return self.build(simplified)
 
+    def from_json_many(self, json_strings):
+        """
+        Build objects from several json strings, which are parsed at once
+        """
+        simplified = ujson.loads('[' + ','.join(json_strings) + ']')
+        return [self.build(obj) for obj in simplified]
+
     def unit_to_json(self, unit):
         simple = self.unit_to_dict(unit)
         return self.to_json(simple)
@@ -715,7 +722,8 @@ class CachedUUIDObjectJSON(ObjectJSON):
     def build(self, jsn):
         if type(jsn) is dict:
             if '_obj_uuid' in jsn:
-                uuid = UUID(jsn['_obj_uuid'])
+                # keys of the cache are integer UUIDs like in `simplify`
+                uuid = int(UUID(jsn['_obj_uuid']))
                 if uuid in self.uuid_cache:
                     return self.uuid_cache[uuid]
                 elif '_cls' in jsn and '_dict' in jsn:
@@ -6,6 +6,7 @@ import abc
 import logging
 import os.path
 from collections import OrderedDict
+from contextlib import contextmanager
 from uuid import UUID
 
 import netCDF4
@@ -796,6 +797,92 @@ class NetCDFPlus(netCDF4.Dataset):
 
         return image
 
+    def _stats_stores(self, stores=None):
+        if stores is None:
+            stores = self.objects.keys()
+        return [(name, self._stores[name]) for name in stores]
+
+    def enable_cache_stats(self, stores=None):
+        """
+        Start counting hits, misses and evictions of the caches
+
+        Parameters
+        ----------
+        stores : list of str or None
+            names of the stores to count for, if None all stores
+        """
+        for name, store in self._stats_stores(stores):
+            store.cache.enable_stats()
+
+    def disable_cache_stats(self, stores=None):
+        """
+        Stop counting for the caches
+
+        Parameters
+        ----------
+        stores : list of str or None
+            names of the stores, if None all stores
+        """
+        for name, store in self._stats_stores(stores):
+            store.cache.disable_stats()
+
+    def cache_stats(self):
+        """
+        Return the counters of all caches that count
+
+        Returns
+        -------
+        dict of str: :class:`openpathsampling.netcdfplus.cache.CacheStats`
+            a copy of the counters for each store name
+        """
+        return {
+            name: store.cache.stats.copy()
+            for name, store in self._stats_stores()
+            if store.cache.stats is not None
+        }
+
+    @contextmanager
+    def record_cache_stats(self, stores=None):
+        """
+        Count the use of the caches within a `with` block
+
+        The yielded dict is filled when the block ends. Counting is enabled
+        for the block only, unless it was enabled before.
+
+        Parameters
+        ----------
+        stores : list of str or None
+            names of the stores to count for, if None all stores
+
+        Yields
+        ------
+        dict of str: :class:`openpathsampling.netcdfplus.cache.CacheStats`
+            the counts within the block for each store name
+
+        Examples
+        --------
+        >>> with storage.record_cache_stats() as stats:
+        ...     analysis.calculate(storage.steps)
+        >>> stats['snapshots'].hit_rate
+        """
+        enabled = []
+        start = {}
+        for name, store in self._stats_stores(stores):
+            if store.cache.stats is None:
+                enabled.append(name)
+            start[name] = store.cache.enable_stats().copy()
+
+        recorded = {}
+        try:
+            yield recorded
+        finally:
+            for name, store in self._stats_stores(start.keys()):
+                # a store may have created a new cache without counters
+                if store.cache.stats is not None:
+                    recorded[name] = store.cache.stats - start[name]
+                    if name in enabled:
+                        store.cache.disable_stats()
+
     def get_var_types(self):
         """
         List all allowed variable type to be used in `create_variable`
@@ -1050,7 +1137,8 @@ class NetCDFPlus(netCDF4.Dataset):
                         description=None,
                         chunksizes=None,
                         simtk_unit=None,
-                        maskable=False):
+                        maskable=False,
+                        compression=None):
         """
         Create a new variable in the netCDF storage.
 
@@ -1094,10 +1182,20 @@ class NetCDFPlus(netCDF4.Dataset):
             exist and if they have not yet been written they are filled with
             a fill_value which is treated as a non-set variable. The created
             variable will interpret this values as `None` when returned
+        compression : dict or None
+            options for the compression of the variable, passed on to
+            `netCDF4.Dataset.createVariable`, e.g. `zlib`, `complevel`,
+            `shuffle` and `least_significant_digit`. The latter quantizes
+            floats to the given number of decimal digits, so that they
+            compress much better. Values are decompressed transparently on
+            reading. Not supported for variable length variables.
         """
 
         ncfile = self
 
+        if compression is None:
+            compression = {}
+
         if type(dimensions) is str:
             dimensions = [dimensions]
 
@@ -1143,6 +1241,9 @@ class NetCDFPlus(netCDF4.Dataset):
             chunksizes = tuple(chunksizes)
 
         if variable_length:
+            if compression:
+                raise ValueError(
+                    'Variable length variables cannot be compressed')
             vlen_t = ncfile.createVLType(nc_type, var_name + '_vlen')
             ncvar = ncfile.createVariable(
                 var_name, vlen_t, dimensions, chunksizes=chunksizes
@@ -1152,6 +1253,7 @@ class NetCDFPlus(netCDF4.Dataset):
         else:
             ncvar = ncfile.createVariable(
                 var_name, nc_type, dimensions, chunksizes=chunksizes,
+                **compression
             )
 
         setattr(ncvar, 'var_type', var_type)
@@ -1214,6 +1316,95 @@ class NetCDFPlus(netCDF4.Dataset):
             if name not in self.vars:
                 self.create_variable_delegate(name)
 
+    def memmap_variable(self, var_name, filename=None, chunksize=10000):
+        """
+        Serve a numeric variable from a read-only memory-mapped array
+
+        Variables with an unlimited dimension are stored in chunks by
+        netCDF4, so the file itself cannot be mapped. Instead the variable
+        is exported once in blocks of `chunksize` entries to a `.npy` file
+        that later sessions map directly. If that file cannot be written the
+        variable is read into memory instead.
+
+        Afterwards `self.vars[var_name][idx]` returns read-only views into
+        the array instead of freshly read copies.
+
+        Parameters
+        ----------
+        var_name : str
+            the name of the variable, which needs a `numpy.*` type
+        filename : str or None
+            the `.npy` file to be used. Default is
+            `<storage filename>.<var_name>.npy`
+        chunksize : int
+            the number of entries read from the netCDF file at once
+
+        Returns
+        -------
+        numpy.ndarray
+            the read-only array, indexed like the variable
+        """
+        if self.mode != 'r':
+            raise RuntimeError(
+                'Memory mapping requires a storage opened with mode="r"')
+
+        var = self.variables[var_name]
+
+        if not getattr(var, 'var_type', '').startswith('numpy.'):
+            raise ValueError(
+                "Variable '%s' is not a numpy variable" % var_name)
+
+        if filename is None:
+            filename = '%s.%s.npy' % (self.filename, var_name)
+
+        shape = tuple(var.shape)
+        dtype = np.dtype(var.dtype)
+
+        array = None
+        if os.path.isfile(filename) and \
+                os.path.getmtime(filename) >= os.path.getmtime(self.filename):
+            array = np.load(filename, mmap_mode='r')
+            if array.shape != shape or array.dtype != dtype:
+                array = None
+
+        if array is None and 0 not in shape:
+            try:
+                array = NetCDFPlus._export_variable(
+                    var, filename, shape, dtype, chunksize)
+            except (IOError, OSError):
+                logger.info('Could not write %s. Reading `%s` into memory '
+                            'instead' % (filename, var_name))
+
+        if array is None:
+            array = np.empty(shape, dtype)
+            NetCDFPlus._copy_variable(var, array, chunksize)
+            array.flags.writeable = False
+
+        self.vars[var_name].variable = array
+
+        return array
+
+    @staticmethod
+    def _copy_variable(var, array, chunksize):
+        for start in range(0, len(array), chunksize):
+            array[start:start + chunksize] = np.ma.getdata(
+                var[start:start + chunksize])
+
+    @staticmethod
+    def _export_variable(var, filename, shape, dtype, chunksize):
+        temp_filename = filename + '.part'
+        array = np.lib.format.open_memmap(
+            temp_filename, mode='w+', dtype=dtype, shape=shape)
+        NetCDFPlus._copy_variable(var, array, chunksize)
+        array.flush()
+        del array
+
+        if os.path.isfile(filename):
+            os.remove(filename)
+        os.rename(temp_filename, filename)
+
+        return np.load(filename, mmap_mode='r')
+
     @staticmethod
     def get_value_parameters(value):
         """
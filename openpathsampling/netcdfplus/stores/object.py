@@ -1,7 +1,10 @@
+import binascii
 import logging
 # from uuid import UUID
 from weakref import WeakValueDictionary
 
+import numpy as np
+
 from openpathsampling.netcdfplus.base import StorableNamedObject, StorableObject
 from openpathsampling.netcdfplus.cache import MaxCache, Cache, NoCache, \
     WeakLRUCache
@@ -61,6 +64,266 @@ class HashedList(dict):
         return self._list
 
 
+# hex digit value of each ASCII character; 255 for non-hex characters
+_HEX_VALUES = np.full(256, 255, dtype=np.uint8)
+_HEX_VALUES[np.frombuffer(b'0123456789', dtype=np.uint8)] = np.arange(10)
+_HEX_VALUES[np.frombuffer(b'abcdef', dtype=np.uint8)] = np.arange(10, 16)
+_HEX_VALUES[np.frombuffer(b'ABCDEF', dtype=np.uint8)] = np.arange(10, 16)
+_UUID_DASHES = [8, 13, 18, 23]
+_UUID_HEX = [i for i in range(36) if i not in _UUID_DASHES]
+
+
+def uuid_strings_to_keys(strings):
+    """
+    Convert UUID strings to 16-byte keys, vectorized
+
+    Parameters
+    ----------
+    strings : array-like of str
+        UUIDs in the form `xxxxxxxx-xxxx-xxxx-xxxx-xxxxxxxxxxxx`
+
+    Returns
+    -------
+    numpy.ndarray of dtype `S16` or `None`
+        the big-endian bytes of the UUIDs, which sort like the UUIDs
+        themselves. `None` if any string is not a valid UUID.
+    """
+    n = len(strings)
+    try:
+        chars = np.array(strings, dtype='S36').view(np.uint8).reshape(n, 36)
+    except (UnicodeEncodeError, ValueError):
+        return None
+
+    if not np.all(chars[:, _UUID_DASHES] == ord('-')):
+        return None
+
+    nibbles = _HEX_VALUES[chars[:, _UUID_HEX]]
+    if np.any(nibbles == 255):
+        return None
+
+    key_bytes = (nibbles[:, 0::2] << 4) | nibbles[:, 1::2]
+    return np.ascontiguousarray(key_bytes).view('S16').reshape(n)
+
+
+def uuid_to_key(uuid):
+    """The 16-byte key of a UUID in long format"""
+    return binascii.unhexlify('%032x' % uuid)
+
+
+def key_to_uuid(key):
+    """The UUID in long format of a 16-byte key"""
+    # numpy strips trailing zero bytes from `S16` items
+    return int(binascii.hexlify(key.ljust(16, b'\0')), 16)
+
+
+class UUIDIndex(HashedList):
+    """
+    HashedList of UUIDs that keeps UUIDs read from a file in NumPy arrays
+
+    The UUIDs of all stored objects are read when a file is opened. Instead
+    of a dict with one Python int per object, these are kept as 16-byte keys
+    in a sorted NumPy array and found by bisection (see
+    :meth:`extend_uuid_strings`). UUIDs that are added later, and marks,
+    are kept in the dict as in :class:`HashedList`, which takes precedence.
+    """
+    def __init__(self):
+        super(UUIDIndex, self).__init__()
+        self._clear_bulk()
+
+    def _clear_bulk(self):
+        # keys in the order of the positions, and sorted with their positions
+        self._bulk = np.empty(0, dtype='S16')
+        self._sorted_keys = np.empty(0, dtype='S16')
+        self._sorted_pos = np.empty(0, dtype=np.int64)
+        self._n_bulk = 0
+        # number of keys in the dict that are not in the bulk part
+        self._n_extra = 0
+        self._moved = {}
+
+    def extend_uuid_strings(self, strings):
+        """
+        Add UUIDs read from a file, in the order of their positions
+
+        Parameters
+        ----------
+        strings : array-like of str
+            the UUIDs as stored, e.g. `store.variables['uuid'][:]`
+
+        Returns
+        -------
+        bool
+            False (and nothing is added) if the index is not empty or the
+            strings can not be converted; use :meth:`extend` then
+        """
+        if len(self) > 0:
+            return False
+
+        keys = uuid_strings_to_keys(strings)
+        if keys is None:
+            return False
+
+        order = np.argsort(keys, kind='stable')
+        self._bulk = keys
+        self._sorted_keys = keys[order]
+        self._sorted_pos = order.astype(np.int64)
+        # like dict.update, a UUID stored twice counts once
+        if len(keys) > 1:
+            self._n_bulk = 1 + int(np.count_nonzero(
+                self._sorted_keys[1:] != self._sorted_keys[:-1]))
+        else:
+            self._n_bulk = len(keys)
+        return True
+
+    def _bulk_pos(self, key):
+        if not len(self._sorted_keys):
+            return None
+        # the last of equal keys, which is the last stored
+        pos = np.searchsorted(self._sorted_keys, key, side='right') - 1
+        # items of `S16` arrays lose trailing zero bytes
+        if pos >= 0 and self._sorted_keys[pos] == key.rstrip(b'\0'):
+            return int(self._sorted_pos[pos])
+        return None
+
+    def _in_bulk(self, key):
+        return self._bulk_pos(uuid_to_key(key)) is not None
+
+    def _dict_set(self, key, value):
+        if not dict.__contains__(self, key) and not self._in_bulk(key):
+            self._n_extra += 1
+        dict.__setitem__(self, key, value)
+
+    def _dict_del(self, key):
+        dict.__delitem__(self, key)
+        if not self._in_bulk(key):
+            self._n_extra -= 1
+
+    def __len__(self):
+        return self._n_bulk + self._n_extra
+
+    def append(self, key):
+        self._dict_set(key, len(self))
+        self._list.append(key)
+
+    def extend(self, t):
+        if len(self._bulk):
+            for key in t:
+                self.append(key)
+        else:
+            super(UUIDIndex, self).extend(t)
+            self._n_extra = dict.__len__(self)
+
+    def __setitem__(self, key, value):
+        self._dict_set(key, value)
+        if value < len(self._bulk):
+            if key_to_uuid(self._bulk[value]) != key:
+                self._moved[value] = key
+        else:
+            self._list[value - len(self._bulk)] = key
+
+    def _find_bulk(self, key):
+        pos = self._bulk_pos(uuid_to_key(key))
+        if pos is not None:
+            # remember UUIDs that are used; a dict lookup is much faster
+            dict.__setitem__(self, key, pos)
+        return pos
+
+    def __getitem__(self, key):
+        try:
+            return dict.__getitem__(self, key)
+        except KeyError:
+            pos = self._find_bulk(key)
+            if pos is None:
+                raise
+            return pos
+
+    def __delitem__(self, key):
+        self._dict_del(key)
+
+    def get(self, key, d=None):
+        try:
+            return self[key]
+        except KeyError:
+            return d
+
+    def __contains__(self, key):
+        return dict.__contains__(self, key) or \
+            self._find_bulk(key) is not None
+
+    def get_many(self, keys):
+        """
+        Return the positions of many UUIDs at once
+
+        Parameters
+        ----------
+        keys : list of int
+            UUIDs in long format
+
+        Returns
+        -------
+        list of int or `None`
+            the position of each UUID, `None` for unknown UUIDs
+        """
+        result = [dict.get(self, key) for key in keys]
+        missing = [n for n, value in enumerate(result) if value is None]
+        if missing and len(self._sorted_keys):
+            search = np.array([uuid_to_key(keys[n]) for n in missing],
+                              dtype='S16')
+            found = np.searchsorted(self._sorted_keys, search,
+                                    side='right') - 1
+            valid = found >= 0
+            found[~valid] = 0
+            valid &= self._sorted_keys[found] == search
+            for n, pos, ok in zip(missing, self._sorted_pos[found], valid):
+                if ok:
+                    result[n] = int(pos)
+        return result
+
+    def index(self, key):
+        n_bulk = len(self._bulk)
+        if key < n_bulk:
+            if key in self._moved:
+                return self._moved[key]
+            return key_to_uuid(self._bulk[key])
+        return self._list[key - n_bulk]
+
+    def keys(self):
+        keys = []
+        seen = set()
+        for key in self.list + list(dict.keys(self)):
+            if key not in seen:
+                seen.add(key)
+                keys.append(key)
+        return keys
+
+    def __iter__(self):
+        return iter(self.keys())
+
+    def items(self):
+        return [(key, self[key]) for key in self.keys()]
+
+    def values(self):
+        return [value for _, value in self.items()]
+
+    def mark(self, key):
+        if key not in self:
+            self._dict_set(key, -2)
+
+    def unmark(self, key):
+        # only marks (and UUIDs added since the file was opened) can be
+        # removed
+        if dict.__contains__(self, key):
+            self._dict_del(key)
+
+    def clear(self):
+        super(UUIDIndex, self).clear()
+        self._clear_bulk()
+
+    @property
+    def list(self):
+        return [self.index(pos) for pos in range(len(self._bulk))] + \
+            self._list
+
+
 class ObjectStore(StorableNamedObject):
     """
     Base Class for storing complex objects in a netCDF4 file. It holds a
@@ -78,6 +341,9 @@ class ObjectStore(StorableNamedObject):
         or string for named objects. This is only used for cached access
         if caching is not `False`. Must be of type
         :obj:`openpathsampling.netcdfplus.base.StorableObject` or subclassed.
+    compression : dict of str: dict
+        compression options by variable name, used by
+        :meth:`create_variable` for variables created later on
 
     """
     _restore_non_initial_attr = False
@@ -179,6 +445,9 @@ class ObjectStore(StorableNamedObject):
         # dimension names
         self._dimension_prefix_store = None
 
+        # compression options by variable name, used when creating variables
+        self.compression = dict()
+
         self.variables = dict()
         self.vars = dict()
         self.units = dict()
@@ -237,13 +506,17 @@ class ObjectStore(StorableNamedObject):
         self.index = self.create_uuid_index()
 
     def create_uuid_index(self):
-        return HashedList()
+        return UUIDIndex()
 
     def restore(self):
         self.load_indices()
 
     def load_indices(self):
         self.index.clear()
+        if hasattr(self.index, 'extend_uuid_strings'):
+            # read the strings and convert them in one go
+            if self.index.extend_uuid_strings(self.variables['uuid'][:]):
+                return
         self.index.extend(self.vars['uuid'][:])
 
     @property
@@ -309,7 +582,11 @@ class ObjectStore(StorableNamedObject):
             caching = WeakLRUCache(caching)
 
         if isinstance(caching, Cache):
+            # keep counting in the new cache; the transfer is not counted
+            stats, self.cache.stats = self.cache.stats, None
             self.cache = caching.transfer(self.cache)
+            if self.cache.stats is None:
+                self.cache.stats = stats
 
     def idx(self, obj):
         """
@@ -334,7 +611,7 @@ class ObjectStore(StorableNamedObject):
         Add iteration over all elements in the storage
         """
         # we want to iterator in the order object were saved!
-        for uuid in self.index._list:
+        for uuid in self.index.list:
             yield self.load(uuid)
 
     def __len__(self):
@@ -425,10 +702,9 @@ class ObjectStore(StorableNamedObject):
             elif type(item) is str:
                 return self.load(item)
             elif type(item) is slice:
-                return [self.load(idx)
-                        for idx in range(*item.indices(len(self)))]
+                return self.load_many(range(*item.indices(len(self))))
             elif type(item) is list:
-                return [self.load(idx) for idx in item]
+                return self.load_many(item)
             elif item is Ellipsis:
                 return iter(self)
         except KeyError:
@@ -573,7 +849,8 @@ class ObjectStore(StorableNamedObject):
             chunksizes=None,
             description=None,
             simtk_unit=None,
-            maskable=False
+            maskable=False,
+            compression=None
     ):
         """
         Create a new variable in the netCDF storage. This is just a helper
@@ -616,8 +893,15 @@ class ObjectStore(StorableNamedObject):
             exist and if they have not yet been written they are filled with
             a fill_value which is treated as a non-set variable. The created
             variable will interpret this values as `None` when returned
+        compression : dict or None
+            options for the compression of the variable, see
+            :meth:`.NetCDFPlus.create_variable`. If None, the entry for
+            `var_name` in :attr:`compression` is used, if present
         """
 
+        if compression is None:
+            compression = self.compression.get(var_name)
+
         # add the main dimension to the var_type
 
         if type(dimensions) is str:
@@ -668,7 +952,8 @@ class ObjectStore(StorableNamedObject):
             chunksizes=chunksizes,
             description=description,
             simtk_unit=simtk_unit,
-            maskable=maskable
+            maskable=maskable,
+            compression=compression
         )
 
     @property
@@ -790,6 +1075,135 @@ class ObjectStore(StorableNamedObject):
 
         return obj
 
+    def load_many(self, indices):
+        """
+        Returns several objects from the storage at once.
+
+        This gives the same objects as :meth:`load` for each index, but the
+        UUIDs are looked up together, and objects that are not in the cache
+        are read in contiguous slices, with one netCDF call per slice of a
+        variable (see :meth:`_load_many`).
+
+        Parameters
+        ----------
+        indices : iterable of int
+            integer indices or UUIDs (in long format) of the objects
+
+        Returns
+        -------
+        list of :py:class:`openpathsampling.netcdfplus.base.StorableObject`
+            the loaded objects, in the order of `indices`
+        """
+        indices = list(indices)
+        if type(self).load != ObjectStore.load:
+            # the store has its own way of loading
+            return [self.load(idx) for idx in indices]
+
+        objs = [None] * len(indices)
+        n_idxs = [None] * len(indices)
+        uuid_pos = []
+        for pos, idx in enumerate(indices):
+            if not isinstance(idx, (long, int)):
+                raise ValueError(
+                    'indices need to be a 32-byte UUID in long format or a '
+                    'simple int ')
+            if idx < 1000000000:
+                n_idxs[pos] = idx
+            else:
+                uuid_pos.append(pos)
+
+        if uuid_pos:
+            uuids = [indices[pos] for pos in uuid_pos]
+            if hasattr(self.index, 'get_many'):
+                found = self.index.get_many(uuids)
+            else:
+                found = [self.index.get(uuid) for uuid in uuids]
+
+            for pos, n_idx in zip(uuid_pos, found):
+                if n_idx is None:
+                    # not in this store, so load looks in the fallbacks
+                    objs[pos] = self.load(indices[pos])
+                else:
+                    n_idxs[pos] = n_idx
+
+        to_load = set()
+        for pos, n_idx in enumerate(n_idxs):
+            if n_idx is None or n_idx < 0:
+                continue
+            try:
+                objs[pos] = self.cache[n_idx]
+            except KeyError:
+                to_load.add(n_idx)
+
+        length = len(self)
+        if to_load and max(to_load) >= length:
+            logger.warning(
+                'Trying to load from IDX #%d > number of object %d' %
+                (max(to_load), length))
+        to_load = sorted(n_idx for n_idx in to_load if n_idx < length)
+
+        loaded = {}
+        for n_idx, obj in zip(to_load, self._load_many(to_load)):
+            try:
+                # loaded while loading another object; keep that one
+                obj = self.cache[n_idx]
+            except KeyError:
+                if obj is not None:
+                    self._get_id(n_idx, obj)
+                    self.cache[n_idx] = obj
+            loaded[n_idx] = obj
+
+        for pos, n_idx in enumerate(n_idxs):
+            if n_idx in loaded:
+                objs[pos] = loaded[n_idx]
+
+        return objs
+
+    def _load_many(self, n_idxs):
+        """
+        Load objects from the file, without using the cache
+
+        Parameters
+        ----------
+        n_idxs : list of int
+            sorted, unique integer indices of stored objects
+
+        Returns
+        -------
+        list of :py:class:`openpathsampling.netcdfplus.base.StorableObject`
+            the objects, in the order of `n_idxs`
+        """
+        if type(self)._load != ObjectStore._load:
+            return [self._load(n_idx) for n_idx in n_idxs]
+
+        objs = []
+        for start, stop in self._index_runs(n_idxs):
+            jsons = self.variables['json'][start:stop]
+            objs.extend(self.simplifier.from_json_many(jsons))
+        return objs
+
+    @staticmethod
+    def _index_runs(n_idxs):
+        """
+        Split sorted, unique indices into ranges of consecutive indices
+
+        Parameters
+        ----------
+        n_idxs : list of int
+
+        Returns
+        -------
+        list of (int, int)
+            start and stop of each range, as for a slice
+        """
+        runs = []
+        for n_idx in n_idxs:
+            if runs and runs[-1][1] == n_idx:
+                runs[-1][1] += 1
+            else:
+                runs.append([n_idx, n_idx + 1])
+        return [tuple(run) for run in runs]
+
     @staticmethod
     def reference(obj):
         return obj.__uuid__
@@ -58,6 +58,16 @@ class VariableStore(ObjectStore):
         args = [self.vars[var][idx] for var in self.var_names]
         return self.content_class(*args)
 
+    def _load_many(self, n_idxs):
+        if type(self)._load != VariableStore._load:
+            return super(VariableStore, self)._load_many(n_idxs)
+
+        objs = []
+        for start, stop in self._index_runs(n_idxs):
+            columns = [self.vars[var][start:stop] for var in self.var_names]
+            objs.extend(self.content_class(*args) for args in zip(*columns))
+        return objs
+
     def initialize(self):
         super(VariableStore, self).initialize()
 
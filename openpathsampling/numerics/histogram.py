@@ -109,9 +109,9 @@ class SparseHistogram(object):
         if weights is None:
             weights = [1.0]*len(data)
 
-        part_hist = sum((collections.Counter({self.map_to_bins(d) : w})
-                         for (d, w) in zip (data, weights)),
-                        collections.Counter({}))
+        part_hist = collections.Counter()
+        for (d, w) in zip(data, weights):
+            part_hist[self.map_to_bins(d)] += w
 
         self._histogram += part_hist
         self.count += len(data) if weights is None else sum(weights)
@@ -88,11 +88,17 @@ class ResamplingStatistics(object):
         the list `inputs` and return a pandas.DataFrame
     inputs : list
         each element of inputs is can be used as input to `function`
+    results : list of pandas.DataFrame
+        (optional) results of `function` for each element of `inputs`, if
+        they were already calculated (e.g., in parallel). If None (default),
+        they are calculated here.
     """
-    def __init__(self, function, inputs):
+    def __init__(self, function, inputs, results=None):
         self.function = function
         self.inputs = inputs
-        self.results = [self.function(inp) for inp in self.inputs]
+        if results is None:
+            results = [self.function(inp) for inp in self.inputs]
+        self.results = results
         self._mean = None
         self._std = None
         self._sorted_series = None
@@ -148,6 +154,23 @@ class ResamplingStatistics(object):
                 df.loc[idx, col] = self.sorted_series[(idx, col)].iloc[rank]
         return df
 
+    def confidence_interval(self, confidence=0.95):
+        """Confidence interval, from the percentiles of the results.
+
+        Parameters
+        ----------
+        confidence : float
+            fraction of the results within the interval; default 0.95 gives
+            the interval between the 2.5th and 97.5th percentiles
+
+        Returns
+        -------
+        tuple of pd.DataFrame
+            the lower and upper bounds of the interval
+        """
+        tail = 50.0 * (1.0 - confidence)
+        return (self.percentile(tail), self.percentile(100.0 - tail))
+
 class BlockResampling(object):
     """Select samples according to block resampling.
 
@@ -7,6 +7,7 @@ from __future__ import print_function
 # from several files.
 import pandas as pd
 import numpy as np
+from scipy.special import logsumexp
 import sys
 import logging
 logger = logging.getLogger(__name__)
@@ -40,20 +41,44 @@ class WHAM(object):
         maximum number of iterations. Default 1000000
     cutoff : float
         windowing cutoff, as fraction of maximum value. Default 0.05
+    interfaces : list of float
+        values of the interfaces, used to remove anything below the
+        interface from each histogram. Default None, in which case leading
+        constant values are removed.
+    method : str
+        solver for the WHAM equations. 'fixed_point' (default) is the
+        plain self-consistent iteration; 'anderson' uses Anderson (DIIS)
+        mixing of the recent iterations; 'newton' uses Newton steps with
+        the analytical Jacobian of the iteration. The accelerated methods
+        fall back to the plain iteration when a step increases the
+        difference, and typically converge in far fewer iterations.
 
     Attributes
     ----------
     sample_every : int
         frequency (in iterations) to report debug information
+    mixing_depth : int
+        number of previous iterations used by Anderson mixing. Default 10.
+    convergence : tuple (int, float)
+        number of iterations and final difference of the last call to
+        :meth:`.generate_lnZ`
     """
+    methods = ['fixed_point', 'anderson', 'newton']
+
     def __init__(self, tol=1e-10, max_iter=1000000, cutoff=0.05,
-                 interfaces=None):
+                 interfaces=None, method='fixed_point'):
         self.tol = tol
         self.max_iter = max_iter
         self.cutoff = cutoff
         self.interfaces = interfaces
+        if method not in self.methods:
+            raise ValueError("Unknown WHAM method '%s'. Use one of %s"
+                             % (method, self.methods))
+        self.method = method
 
         self.sample_every = max_iter + 1
+        self.mixing_depth = 10
+        self.convergence = None
         self._float_format = "10.8"
         self.lnZ = None
 
@@ -130,9 +155,7 @@ class WHAM(object):
         # clear things that don't pass the cutoff
         hist_max = df.max(axis=0)
         raw_cutoff = cutoff*hist_max
-        cleaned_df = df.apply(
-            lambda s: [x if x > raw_cutoff[s.name] else 0.0 for x in s]
-        )
+        cleaned_df = df.where(df.gt(raw_cutoff, axis='columns'), 0.0)
 
         if self.interfaces is not None:
             # use the interfaces values to set anything before that value to
@@ -140,31 +163,19 @@ class WHAM(object):
             if type(self.interfaces) is not pd.Series:
                 self.interfaces = pd.Series(data=self.interfaces,
                                             index=df.columns)
-            greater_almost_equal = lambda a, b: (a >= b or
-                                                 abs(a - b) < 10e-10)
-            cleaned_df = cleaned_df.apply(
-                lambda s: [
-                    (
-                        s.iloc[i]
-                        if greater_almost_equal(s.index[i],
-                                                self.interfaces[s.name])
-                        else 0.0
-                    )
-                    for i in range(len(s))
-                ]
-            )
+            lambdas = np.asarray(df.index, dtype=float)[:, np.newaxis]
+            ifaces = self.interfaces[df.columns].values[np.newaxis, :]
+            greater_almost_equal = ((lambdas >= ifaces)
+                                    | (np.abs(lambdas - ifaces) < 10e-10))
+            cleaned_df = cleaned_df.where(greater_almost_equal, 0.0)
         else:
             # clear duplicates of leading values
-            test_f = lambda val1, val2, val_max: (
-                abs(val1 - val2) > tol or abs(val1 - val_max) > tol
-            )
-            cleaned_df = cleaned_df.apply(
-                lambda s: [
-                    s.iloc[i]
-                    if test_f(s.iloc[i], s.iloc[i+1], s.max()) else 0.0
-                    for i in range(len(s)-1)
-                ] + [s.iloc[-1]]
-            )
+            values = cleaned_df.values
+            val_max = cleaned_df.max(axis=0).values
+            keep = np.ones(values.shape, dtype=bool)
+            keep[:-1] = ((np.abs(values[:-1] - values[1:]) > tol)
+                         | (np.abs(values[:-1] - val_max) > tol))
+            cleaned_df = cleaned_df.where(keep, 0.0)
         return cleaned_df
 
     def unweighting_tis(self, cleaned_df):
@@ -188,9 +199,7 @@ class WHAM(object):
         pandas.DataFrame
             unweighting values for the input dataframe
         """
-        unweighting = cleaned_df.copy().applymap(
-            lambda x: 1.0 if x > 0.0 else 0.0
-        )
+        unweighting = (cleaned_df > 0.0).astype(float)
         return unweighting
 
     def sum_k_Hk_Q(self, cleaned_df):
@@ -246,8 +255,7 @@ class WHAM(object):
         pandas.DataFrame
             weighted counts matrix, size n_hists by n_dims
         """
-        weighted_counts = unweighting.apply(lambda s: [x * n_entries[s.name]
-                                                       for x in s])
+        weighted_counts = unweighting.multiply(n_entries, axis='columns')
         return weighted_counts
 
     def generate_lnZ(self, lnZ, unweighting, weighted_counts, sum_k_Hk_Q,
@@ -255,6 +263,10 @@ class WHAM(object):
         r"""
         Perform the WHAM iteration to estimate ln(Z_i) for each histogram.
 
+        Each iteration is done for all histograms at once, in log space;
+        see :meth:`.log_wham_iteration`. The solver is selected by
+        :attr:`.method`.
+
         Parameters
         ----------
         lnZ : pandas.Series, one per histogram (length n_hists)
@@ -279,73 +291,128 @@ class WHAM(object):
         """
         if tol is None:
             tol = self.tol
-        diff = self.tol + 1  # always start above the tolerance
+        diff = tol + 1  # always start above the tolerance
+        best_diff = np.inf
+        # Anderson mixing isn't monotonic, so only restart it if it goes
+        # clearly wrong
+        worse_factor = 10.0 if self.method == 'anderson' else 1.0
         iteration = 0
         hists = weighted_counts.columns
-        # TODO: probably faster if we make wc this a sparse matrix
-        wc = weighted_counts.values
-        unw = unweighting.values
-        lnZ_old = pd.Series(data=lnZ, index=hists)
-        Z_new = pd.Series(index=hists, dtype='float64')
-        sum_k_Hk_byQ = sum_k_Hk_Q.values
+        with np.errstate(divide='ignore'):
+            ln_numerator = (np.log(unweighting.values)
+                            + np.log(sum_k_Hk_Q.values)[:, np.newaxis])
+            ln_wc = np.log(weighted_counts.values)
+        lnZ_old = np.array(lnZ, dtype=float)
+        history = []
         while diff > tol and iteration < self.max_iter:
-            Z_old = np.exp(lnZ_old)
-            reciprocal_Z_old = (1.0 / Z_old).values
-            for i in range(len(hists)):
-                #############################################################
-                # this is equation 7.3.10 in F&S
-                # Z_i^{(new)} =
-                #    \int \dd{Q} w_{i,Q}
-                #    \times \frac{\sum_{j=1}^n H_j(Q)}
-                #                {\sum_{k=1}^n w_{k,Q} M_k / Z_k^{(old)}}
-                # where F&S explicitly use w_{i,Q} = e^{-\beta W_i}
-                #
-                # Matching terms from F&S to our variables:
-                #   w_i = w_{i,Q} = $e^{-\beta W_i}$
-                #       * this is a column (len == n_bins) from a matrix
-                #         size n_hists \times n_bins
-                #       * from "unweighting", which is Boltzmann in umbrella
-                #         sampling (F&S), but 1 or 0 in TIS
-                #       * see unweighting_tis: not entirely clear why this
-                #         is a matrix, not an vector length n_hists
-                #   sum_k_Hk_byQ = $\sum_{j=1}^n H_j(Q)$
-                #       * this is a function of Q, thus len == n_bins
-                #   wc = w_{k,Q} * M_k = $e^{-\beta W_k} M_k$
-                #       * note that this is element-wise multiplication
-                #       * matrix, size n_hists \times n_bins
-                #   reciprocal_Z_old = $1/Z_k^{(old)}$
-                #       * vector, len == n_hists
-                #
-                # Note that we do all of this with matrix/vector
-                # multiplication, which numpy can do very quickly.
-                #############################################################
-
-                w_i = unw[:, i]
-
-                # numerator: w_{i,Q} * sum_k_Hk_byQ
-                numerator_byQ = np.multiply(w_i, sum_k_Hk_byQ)
-
-                # denominator: wc * Z^{-1}
-                sum_over_Z_byQ = wc.dot(reciprocal_Z_old)
-
-                # divide each entry, and add them (integrate over Q in F&S)
-                # we intentially allow invalid (0/0) to give NaN; gets
-                # removed by using the np.nansum)
-                with np.errstate(divide='ignore', invalid='ignore'):
-                    addends_k = np.divide(numerator_byQ, sum_over_Z_byQ)
-                Z_new[hists[i]] = np.nansum(addends_k)
-
-            lnZ_new = np.log(Z_new)
-
+            lnZ_new, ln_addends = self.log_wham_iteration(
+                lnZ_old, ln_numerator, ln_wc
+            )
             iteration += 1
             diff = self.get_diff(lnZ_old, lnZ_new, iteration)
-            lnZ_old = lnZ_new - lnZ_new.iloc[0]
-
+            fixed_point = lnZ_new - lnZ_new[0]
+            got_worse = diff > worse_factor * best_diff
+            if self.method == 'fixed_point' or got_worse:
+                # plain iteration; also used when an accelerated step made
+                # things worse
+                step = fixed_point
+                history = []
+            elif self.method == 'anderson':
+                step = self._anderson_step(lnZ_old, fixed_point, history)
+            else:
+                step = self._newton_step(lnZ_old, lnZ_new, ln_addends,
+                                         ln_wc, fixed_point)
+            if not np.all(np.isfinite(step)):
+                step = fixed_point
+                history = []
+            best_diff = min(diff, best_diff)
+            lnZ_old = step
+
+        lnZ_old = pd.Series(data=lnZ_old, index=hists)
         logger.info("iterations=" + str(iteration) + " diff=" + str(diff))
         logger.info("       lnZ=" + str(lnZ_old))
         self.convergence = (iteration, diff)
         return lnZ_old
 
+    @staticmethod
+    def log_wham_iteration(lnZ, ln_numerator, ln_wc):
+        r"""
+        One WHAM iteration for all histograms, in log space.
+
+        This is equation 7.3.10 in F&S,
+
+        .. math::
+            Z_i^{(new)} = \sum_Q w_{i,Q} \frac{\sum_{j=1}^n H_j(Q)}
+                                         {\sum_{k=1}^n w_{k,Q} M_k
+                                          / Z_k^{(old)}}
+
+        written with logsumexp, so that very small crossing probabilities
+        don't underflow. Bins where the denominator is zero don't
+        contribute.
+
+        Parameters
+        ----------
+        lnZ : numpy.ndarray, length n_hists
+            current values of ln(Z_k)
+        ln_numerator : numpy.ndarray, n_bins by n_hists
+            :math:`\ln(w_{i,Q} \sum_j H_j(Q))`
+        ln_wc : numpy.ndarray, n_bins by n_hists
+            logarithm of the weighted counts :math:`w_{k,Q} M_k`
+
+        Returns
+        -------
+        lnZ_new : numpy.ndarray, length n_hists
+            new (unnormalized) values of ln(Z_i)
+        ln_addends : numpy.ndarray, n_bins by n_hists
+            logarithm of each term in the sum over Q
+        """
+        with np.errstate(invalid='ignore', divide='ignore'):
+            ln_denominator = logsumexp(ln_wc - lnZ[np.newaxis, :], axis=1)
+            ln_addends = ln_numerator - ln_denominator[:, np.newaxis]
+            ln_addends[np.isneginf(ln_denominator)] = -np.inf
+            lnZ_new = logsumexp(ln_addends, axis=0)
+        return lnZ_new, ln_addends
+
+    def _anderson_step(self, lnZ, fixed_point, history):
+        # Anderson (DIIS) mixing: combine the last iterations so that the
+        # linearized residual is minimized
+        history.append((lnZ, fixed_point))
+        if len(history) > self.mixing_depth + 1:
+            history.pop(0)
+        if len(history) < 2:
+            return fixed_point
+        inputs = np.array([h[0] for h in history])
+        outputs = np.array([h[1] for h in history])
+        residuals = outputs - inputs
+        d_residuals = np.diff(residuals, axis=0).T
+        d_outputs = np.diff(outputs, axis=0).T
+        gamma = np.linalg.lstsq(d_residuals, residuals[-1], rcond=None)[0]
+        step = outputs[-1] - d_outputs.dot(gamma)
+        return step - step[0]
+
+    @staticmethod
+    def _newton_step(lnZ, lnZ_new, ln_addends, ln_wc, fixed_point):
+        # Newton step for the residual lnZ_new - lnZ_new[0] - lnZ, keeping
+        # lnZ[0] = 0. The Jacobian of the iteration is dlnZ_new_i/dlnZ_j =
+        # \sum_Q p_{iQ} q_{Qj}, where p is the weight of each bin in the sum
+        # for Z_i, and q the weight of each histogram in the denominator.
+        with np.errstate(invalid='ignore', over='ignore'):
+            weights_p = np.exp(ln_addends - lnZ_new[np.newaxis, :]).T
+            ln_q = ln_wc - lnZ[np.newaxis, :]
+            weights_q = np.exp(ln_q - logsumexp(ln_q, axis=1)[:, np.newaxis])
+        weights_p = np.nan_to_num(weights_p)
+        weights_q = np.nan_to_num(weights_q)
+        jacobian = weights_p.dot(weights_q)
+        jacobian = (jacobian[1:, 1:] - jacobian[0, 1:][np.newaxis, :]
+                    - np.identity(len(lnZ) - 1))
+        lnZ = lnZ - lnZ[0]
+        residual = (fixed_point - lnZ)[1:]
+        try:
+            delta = np.linalg.solve(jacobian, -residual)
+        except np.linalg.LinAlgError:
+            return fixed_point
+        return np.concatenate([[0.0], lnZ[1:] + delta])
+
     def get_diff(self, lnZ_old, lnZ_new, iteration):
         """Calculate the difference for this iteration.
 
@@ -366,8 +433,7 @@ class WHAM(object):
             difference between old and new to use for convergence testing
         """
         # get error
-        diff = 0
-        diff = sum(abs(lnZ_old - lnZ_new))
+        diff = np.abs(np.asarray(lnZ_old) - np.asarray(lnZ_new)).sum()
         # check status (mainly for debugging)
         if (iteration % self.sample_every == 0):  # pragma: no cover
             logger.debug("niteration = " + str(iteration))
@@ -395,22 +461,17 @@ class WHAM(object):
         pandas.Series
             the WHAM-reweighted combined histogram, unnormalized
         """
-        Z = np.exp(lnZ)
-        Z0_over_Zi = Z.iloc[0] / Z
-        output = pd.Series(index=sum_k_Hk_Q.index, name="WHAM",
-                           dtype='float64')
-        for val in sum_k_Hk_Q.index:
-            sum_w_over_Z = sum([
-                weighted_counts.loc[val, hist_i] * Z0_over_Zi[hist_i]
-                for hist_i in Z.index
-            ])
-            # explicitly allow NaN results for simplcity (should only occur
-            # when numerator and denominator are 0) ... this will leave NaNs
-            # in the histogram in those locations; if all values of the
-            # total histogram are NaN, that gets caught in the main
-            # wham_bam_histogram routine
-            with np.errstate(divide='ignore', invalid='ignore'):
-                output[val] = sum_k_Hk_Q[val] / sum_w_over_Z
+        lnZ = np.asarray(lnZ, dtype=float)
+        Z0_over_Zi = np.exp(lnZ[0] - lnZ)
+        sum_w_over_Z = weighted_counts.values.dot(Z0_over_Zi)
+        # explicitly allow NaN results for simplcity (should only occur
+        # when numerator and denominator are 0) ... this will leave NaNs
+        # in the histogram in those locations; if all values of the
+        # total histogram are NaN, that gets caught in the main
+        # wham_bam_histogram routine
+        with np.errstate(divide='ignore', invalid='ignore'):
+            output = pd.Series(data=sum_k_Hk_Q.values / sum_w_over_Z,
+                               index=sum_k_Hk_Q.index, name="WHAM")
 
         return output
 
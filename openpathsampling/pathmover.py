@@ -762,9 +762,11 @@ class EngineMover(SampleMover):
     @property
     def engine(self):
         if self._engine is not None:
-            return self._engine
+            engine = self._engine
         else:
-            return self.default_engine
+            engine = self.default_engine
+        # in tasks of an EnginePool, use the copy reserved for the task
+        return paths.engines.engine_pool.thread_engine(engine)
 
     @engine.setter
     def engine(self, engine):
@@ -2248,7 +2250,25 @@ class OneWayExtendMover(SpecializedRandomChoiceMover):
 
 
 class AbstractTwoWayShootingMover(EngineMover):
-    def __init__(self, ensemble, selector, modifier, engine=None):
+    """Base class for two-way shooting movers.
+
+    Parameters
+    ----------
+    ensemble : :class:`.Ensemble`
+        ensemble for this shooting mover
+    selector : :class:`.ShootingPointSelector`
+        how to select the shooting point
+    modifier : :class:`.SnapshotModifier`
+        how to modify the shooting point
+    engine : :class:`.DynamicsEngine`
+        the dynamics engine to use
+    engine_pool : :class:`.EnginePool` or None
+        if given, and the engine supports it, the second half of the shot
+        runs while the first half is running. The trial trajectories are
+        the same as in a serial run. Default None.
+    """
+    def __init__(self, ensemble, selector, modifier, engine=None,
+                 engine_pool=None):
         super(AbstractTwoWayShootingMover, self).__init__(
             ensemble=ensemble,
             target_ensemble=ensemble,
@@ -2256,33 +2276,103 @@ class AbstractTwoWayShootingMover(EngineMover):
             engine=engine
         )
         self.modifier = modifier
+        self.engine_pool = engine_pool
 
     # required for concrete class; not really used
     @property
     def direction(self):  # pragma: no cover
         return 'bidrectional'
 
-    def _make_forward_trajectory(self, trajectory, initial_snapshot,
-                                 shooting_index):
+    def _forward_condition(self, trajectory, shooting_index):
         fwd_ens = paths.PrefixTrajectoryEnsemble(
             self.target_ensemble,
             trajectory[0:shooting_index]
         )
+        return fwd_ens.can_append
+
+    def _backward_condition(self, trajectory, shooting_index):
+        bkwd_ens = paths.SuffixTrajectoryEnsemble(
+            self.target_ensemble,
+            trajectory[shooting_index + 1:]
+        )
+        return bkwd_ens.can_prepend
+
+    def _make_forward_trajectory(self, trajectory, initial_snapshot,
+                                 shooting_index):
+        running = self._forward_condition(trajectory, shooting_index)
         fwd_partial = self.engine.generate(initial_snapshot,
-                                           running=[fwd_ens.can_append])
+                                           running=[running])
         return fwd_partial
 
     def _make_backward_trajectory(self, trajectory, initial_snapshot,
                                   shooting_index):
         # run backward
-        bkwd_ens = paths.SuffixTrajectoryEnsemble(
-            self.target_ensemble,
-            trajectory[shooting_index + 1:]
-        )
+        running = self._backward_condition(trajectory, shooting_index)
         bkwd_partial = self.engine.generate(initial_snapshot.reversed,
-                                            running=[bkwd_ens.can_prepend])
+                                            running=[running])
         return bkwd_partial
 
+    def _use_engine_pool(self):
+        pool = self.engine_pool
+        return pool is not None and pool.supports(self.engine)
+
+    def _generate_concurrently(self, make_first, second_initial,
+                               second_condition):
+        """Run the second half of the shot while the first half runs.
+
+        The running condition of the second half depends on the first half,
+        so the second half runs with a :class:`.DeferredCondition`, which
+        is resolved when the first half is done.
+
+        Parameters
+        ----------
+        make_first : function()
+            generates the first half (in this thread)
+        second_initial : :class:`.Snapshot`
+            initial snapshot of the second half
+        second_condition : function(first_partial)
+            creates the running condition of the second half from the
+            trajectory of the first half
+
+        Returns
+        -------
+        first_partial : :class:`.Trajectory`
+        second_partial : :class:`.Trajectory`
+        """
+        deferred = paths.engines.engine_pool.DeferredCondition(
+            max_length=self.engine.options.get('n_frames_max')
+        )
+        task = self.engine_pool.submit(
+            self.engine, second_initial, running=[deferred]
+        )
+        try:
+            first_partial = make_first()
+            deferred.resolve(second_condition(first_partial))
+        except BaseException:
+            # the serial run would never have started the second half
+            deferred.abort()
+            try:
+                task.result()
+            except Exception:
+                logger.debug("Error in aborted trajectory", exc_info=True)
+            raise
+
+        try:
+            second_partial = task.result()
+        except paths.engines.EngineError as e:
+            # if the error came after the frame where the serial run would
+            # have stopped, the serial run would not have seen the error
+            last_trajectory = getattr(e, 'last_trajectory', None)
+            if (last_trajectory is None
+                    or deferred.replay(last_trajectory) is None):
+                raise
+            second_partial = last_trajectory
+
+        if deferred.stop_length is not None:
+            second_partial = second_partial[:deferred.stop_length]
+
+        return first_partial, second_partial
+
     def _run(self, trajectory, shooting_index):
         # to override the default implementation in EngineMover
         raise NotImplementedError
@@ -2316,13 +2406,28 @@ class ForwardFirstTwoWayShootingMover(AbstractTwoWayShootingMover):
         original = trajectory[shooting_index]
         modified = self.modifier(original)
 
-        fwd_partial = self._make_forward_trajectory(trajectory, modified,
-                                                    shooting_index)
-        # TODO: come up with a test that shows why you need mid_traj here;
-        # should be a SeqEns with OptionalEnsembles. Exact example is hard!
-        mid_traj = trajectory[0:shooting_index] + fwd_partial
-        bkwd_partial = self._make_backward_trajectory(mid_traj, modified,
-                                                      shooting_index)
+        if self._use_engine_pool():
+            def backward_condition(fwd_partial):
+                mid_traj = trajectory[0:shooting_index] + fwd_partial
+                return self._backward_condition(mid_traj, shooting_index)
+
+            fwd_partial, bkwd_partial = self._generate_concurrently(
+                lambda: self._make_forward_trajectory(trajectory, modified,
+                                                      shooting_index),
+                modified.reversed,
+                backward_condition
+            )
+        else:
+            fwd_partial = self._make_forward_trajectory(trajectory,
+                                                        modified,
+                                                        shooting_index)
+            # TODO: come up with a test that shows why you need mid_traj
+            # here; should be a SeqEns with OptionalEnsembles. Exact example
+            # is hard!
+            mid_traj = trajectory[0:shooting_index] + fwd_partial
+            bkwd_partial = self._make_backward_trajectory(mid_traj,
+                                                          modified,
+                                                          shooting_index)
 
         # join the two
         trial_trajectory = bkwd_partial.reversed + fwd_partial[1:]
@@ -2360,18 +2465,34 @@ class BackwardFirstTwoWayShootingMover(AbstractTwoWayShootingMover):
         original = trajectory[shooting_index]
         modified = self.modifier(original)
 
-        bkwd_partial = self._make_backward_trajectory(trajectory, modified,
-                                                      shooting_index)
-        #logger.info("Complete backward shot (length " +
-                    #str(len(bkwd_partial)) + ")")
-        # TODO: come up with a test that shows why you need mid_traj here;
-        # should be a SeqEns with OptionalEnsembles. Exact example is hard!
-        mid_traj = bkwd_partial.reversed + trajectory[shooting_index + 1:]
-        mid_traj_shoot_idx = len(bkwd_partial) - 1
-        fwd_partial = self._make_forward_trajectory(mid_traj, modified,
-                                                    mid_traj_shoot_idx)
-        #logger.info("Complete forward shot (length " +
-                    #str(len(fwd_partial)) + ")")
+        if self._use_engine_pool():
+            def forward_condition(bkwd_partial):
+                mid_traj = (bkwd_partial.reversed
+                            + trajectory[shooting_index + 1:])
+                mid_traj_shoot_idx = len(bkwd_partial) - 1
+                return self._forward_condition(mid_traj, mid_traj_shoot_idx)
+
+            bkwd_partial, fwd_partial = self._generate_concurrently(
+                lambda: self._make_backward_trajectory(trajectory, modified,
+                                                       shooting_index),
+                modified,
+                forward_condition
+            )
+        else:
+            bkwd_partial = self._make_backward_trajectory(trajectory,
+                                                          modified,
+                                                          shooting_index)
+            #logger.info("Complete backward shot (length " +
+                        #str(len(bkwd_partial)) + ")")
+            # TODO: come up with a test that shows why you need mid_traj
+            # here; should be a SeqEns with OptionalEnsembles. Exact example
+            # is hard!
+            mid_traj = bkwd_partial.reversed + trajectory[shooting_index + 1:]
+            mid_traj_shoot_idx = len(bkwd_partial) - 1
+            fwd_partial = self._make_forward_trajectory(mid_traj, modified,
+                                                        mid_traj_shoot_idx)
+            #logger.info("Complete forward shot (length " +
+                        #str(len(fwd_partial)) + ")")
 
         # join the two
         trial_trajectory = bkwd_partial.reversed + fwd_partial[1:]
@@ -2381,19 +2502,22 @@ class BackwardFirstTwoWayShootingMover(AbstractTwoWayShootingMover):
 
 
 class TwoWayShootingMover(SpecializedRandomChoiceMover):
-    def __init__(self, ensemble, selector, modifier, engine=None):
+    def __init__(self, ensemble, selector, modifier, engine=None,
+                 engine_pool=None):
         movers = [
             ForwardFirstTwoWayShootingMover(
                 ensemble=ensemble,
                 selector=selector,
                 modifier=modifier,
-                engine=engine
+                engine=engine,
+                engine_pool=engine_pool
             ),
             BackwardFirstTwoWayShootingMover(
                 ensemble=ensemble,
                 selector=selector,
                 modifier=modifier,
-                engine=engine
+                engine=engine,
+                engine_pool=engine_pool
             )
         ]
         super(TwoWayShootingMover, self).__init__(movers=movers)
@@ -2410,6 +2534,10 @@ class TwoWayShootingMover(SpecializedRandomChoiceMover):
     def modifier(self):
         return self.movers[0].modifier
 
+    @property
+    def engine_pool(self):
+        return self.movers[0].engine_pool
+
 
 class MinusMover(SubPathMover):
     """
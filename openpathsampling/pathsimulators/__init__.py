@@ -2,6 +2,8 @@ from .path_simulator import PathSimulator, MCStep
 from .bootstrap_init_conds import FullBootstrapping, Bootstrapping
 from .direct_md import DirectSimulation
 from .path_sampling import PathSampling
+from .background_writer import BackgroundStorageWriter
+from .concurrent_moves import ConcurrentMoveScheduler
 from .shoot_snapshots import (
     ShootFromSnapshotsSimulation, CommittorSimulation
 )
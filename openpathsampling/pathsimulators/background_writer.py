@@ -0,0 +1,112 @@
+import logging
+import sys
+import threading
+
+from future.utils import raise_
+
+try:
+    import queue
+except ImportError:  # pragma: no cover
+    import Queue as queue  # Py2
+
+logger = logging.getLogger(__name__)
+
+# marker put in the queue to end the writer thread
+_STOP = object()
+
+
+class BackgroundStorageWriter(object):
+    """Run storage operations in a background thread.
+
+    Storage operations (e.g., saving an :class:`.MCStep` and syncing) are
+    put into a bounded queue and executed in order by a single writer
+    thread. When the queue is full, :meth:`submit` blocks until the writer
+    has caught up, so memory use stays bounded even if saving is slower
+    than the simulation.
+
+    If an operation fails, all later operations are skipped and the error
+    is raised in the submitting thread on the next call to :meth:`submit`,
+    :meth:`flush` or :meth:`close`.
+
+    Parameters
+    ----------
+    max_queue_size : int
+        maximum number of pending operations
+
+    Notes
+    -----
+    The storage itself is not thread-safe. While the writer is running, the
+    simulation must not use the storage directly; this includes CVs with
+    a disk cache that load values from the same storage (for this reason,
+    :class:`.PathSampling` doesn't save in background if there are such
+    CVs).
+    """
+    def __init__(self, max_queue_size=10):
+        self.max_queue_size = max_queue_size
+        self._queue = queue.Queue(maxsize=max_queue_size)
+        self._exc_info = None
+        self.failed = False
+        self._thread = threading.Thread(target=self._work,
+                                        name="BackgroundStorageWriter")
+        self._thread.daemon = True
+        self._thread.start()
+
+    def _work(self):
+        while True:
+            task = self._queue.get()
+            try:
+                if task is _STOP:
+                    return
+
+                func, args = task
+                if not self.failed:
+                    func(*args)
+            except Exception:
+                logger.exception("Error in background storage writer")
+                self.failed = True
+                self._exc_info = sys.exc_info()
+            finally:
+                self._queue.task_done()
+
+    @property
+    def n_pending(self):
+        """int : number of operations not yet executed"""
+        return self._queue.qsize()
+
+    def _raise_if_failed(self):
+        if self._exc_info is not None:
+            exc_info = self._exc_info
+            self._exc_info = None
+            raise_(*exc_info)
+
+    def submit(self, func, *args):
+        """Queue ``func(*args)`` to be run by the writer thread.
+
+        Blocks while the queue is full.
+        """
+        self._raise_if_failed()
+        if not self._thread.is_alive():
+            raise RuntimeError("BackgroundStorageWriter is closed")
+
+        self._queue.put((func, args))
+
+    def flush(self):
+        """Wait until all queued operations are done."""
+        self._queue.join()
+        self._raise_if_failed()
+
+    def close(self, raise_errors=True):
+        """Run all queued operations and stop the writer thread.
+
+        Parameters
+        ----------
+        raise_errors : bool
+            if False, an error of the writer is only logged. Use this when
+            closing the writer while another exception is handled.
+        """
+        if self._thread.is_alive():
+            self._queue.put(_STOP)
+            self._thread.join()
+
+        if raise_errors:
+            self._raise_if_failed()
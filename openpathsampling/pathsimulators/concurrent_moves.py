@@ -0,0 +1,183 @@
+import logging
+import sys
+import time
+
+from future.utils import raise_
+
+import openpathsampling as paths
+from openpathsampling.engines.engine_pool import EnginePool
+
+logger = logging.getLogger(__name__)
+
+
+class _PlannedMove(object):
+    """A move whose random choices in the move decision tree are drawn.
+
+    Attributes
+    ----------
+    choices : list of (:class:`.RandomChoiceMover`, :class:`.Details`)
+        the choices from the root mover down, with the selection details
+    mover : :class:`.PathMover`
+        the chosen mover, which makes the actual move
+    resources : set
+        ensembles (and engines that can not be copied) used by the move;
+        moves with disjoint resources are independent
+    engines : list of :class:`.DynamicsEngine`
+        engines of the move that are copied to run concurrently
+    """
+    def __init__(self, choices, mover):
+        self.choices = choices
+        self.mover = mover
+        self.resources = set(mover.input_ensembles)
+        self.resources.update(mover.output_ensembles)
+        self.engines = []
+        engines = {}
+        for submover in mover:
+            if isinstance(submover, paths.EngineMover):
+                engine = submover.engine
+                if engine is not None:
+                    engines[engine.__uuid__] = engine
+        for engine in engines.values():
+            if EnginePool.supports(engine):
+                self.engines.append(engine)
+            else:
+                self.resources.add(engine)
+
+    def move(self, sample_set):
+        """Make the move; returns the change as the root mover would"""
+        change = self.mover.move(sample_set)
+        for selection_mover, details in reversed(self.choices):
+            change = paths.RandomChoiceMoveChange(
+                subchange=change,
+                mover=selection_mover,
+                details=details
+            )
+        return change
+
+
+class ConcurrentMoveScheduler(object):
+    """Run independent MC moves of a move scheme at the same time.
+
+    The random choices of the move decision tree (the root mover and the
+    group choosers, which are :class:`.RandomChoiceMover` objects with
+    fixed weights) do not depend on the sample set. They are drawn ahead
+    for up to ``n_moves`` steps. The longest run of upcoming moves that use
+    disjoint ensembles (e.g., shooting moves in different interfaces) then
+    runs concurrently, each in its own thread, starting from the same
+    sample set. Since each move only sees samples that the earlier moves in
+    the run do not change, applying the results in order gives the same
+    Markov chain as running the moves one after the other.
+
+    Engines that support it (see :class:`.EnginePool`) are copied for each
+    concurrent move. Moves that use the same engine without that support
+    do not run at the same time.
+
+    Parameters
+    ----------
+    root_mover : :class:`.PathMover`
+        the move decision tree
+    n_moves : int
+        maximum number of moves running at the same time
+    """
+    def __init__(self, root_mover, n_moves=2):
+        self.root_mover = root_mover
+        self.n_moves = n_moves
+        self.pool = EnginePool(max_workers=n_moves)
+        self.exc_info = None
+        self._planned = []
+
+    def _plan(self, sample_set):
+        choices = []
+        mover = self.root_mover
+        # only plain random choices have weights independent of samples
+        while type(mover) is paths.RandomChoiceMover:
+            weights = mover._selector(sample_set)
+            submover, details = mover.select_mover(weights)
+            choices.append((mover, details))
+            mover = submover
+        return _PlannedMove(choices, mover)
+
+    def next_moves(self, sample_set, n_max=None):
+        """Remove the next independent moves from the planned moves.
+
+        Parameters
+        ----------
+        sample_set : :class:`.SampleSet`
+            the current sample set
+        n_max : int or None
+            maximum number of moves to return (e.g., the number of steps
+            left in the simulation)
+
+        Returns
+        -------
+        list of :class:`._PlannedMove`
+            moves that use disjoint resources, in the order of the chain
+        """
+        n_max = self.n_moves if n_max is None else min(n_max, self.n_moves)
+        while len(self._planned) < n_max:
+            self._planned.append(self._plan(sample_set))
+
+        moves = []
+        used = set()
+        for planned in self._planned[:n_max]:
+            if used & planned.resources:
+                break
+            moves.append(planned)
+            used.update(planned.resources)
+
+        del self._planned[:len(moves)]
+        return moves
+
+    def run(self, sample_set, n_max=None):
+        """Run the next independent moves.
+
+        Parameters
+        ----------
+        sample_set : :class:`.SampleSet`
+            the current sample set
+        n_max : int or None
+            maximum number of moves
+
+        Returns
+        -------
+        list of (:class:`.MoveChange`, float)
+            the change (as from the root mover) and the time each move took,
+            in the order in which they must be applied to ``sample_set``.
+            If a move raised an error, the list ends before that move, and
+            the error is in :attr:`.exc_info`.
+        """
+        moves = self.next_moves(sample_set, n_max)
+
+        def timed_move(planned):
+            time_start = time.time()
+            change = planned.move(sample_set)
+            return change, time.time() - time_start
+
+        # the first move runs in this thread, with the original engines
+        tasks = [self.pool.run_task(timed_move, (planned,), planned.engines)
+                 for planned in moves[1:]]
+        results = []
+        self.exc_info = None
+        try:
+            results.append(timed_move(moves[0]))
+        except Exception:
+            self.exc_info = sys.exc_info()
+
+        for task in tasks:
+            try:
+                result = task.result()
+            except Exception:
+                if self.exc_info is None:
+                    self.exc_info = sys.exc_info()
+            else:
+                if self.exc_info is None:
+                    results.append(result)
+
+        return results
+
+    def raise_error(self):
+        """Raise the error of the last :meth:`.run`, if there was one"""
+        if self.exc_info is not None:
+            exc_info = self.exc_info
+            self.exc_info = None
+            raise_(*exc_info)
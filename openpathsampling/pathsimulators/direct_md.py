@@ -14,6 +14,13 @@ try:
 except NameError:
     xrange = range
 
+
+def _copy_run_state(run_state):
+    # the most recent state is a volume, all others are dicts
+    return {key: value if key == 'most_recent_state' else dict(value)
+            for key, value in run_state.items()}
+
+
 class DirectSimulation(PathSimulator):
     """
     Direct simulation to calculate rates and fluxes.
@@ -52,6 +59,13 @@ class DirectSimulation(PathSimulator):
         number of transition events for each pair of states
     n_flux_events : dict with keys 2-tuple of paths.Volume, values int
         number of flux events for each (state, interface) pair
+    chunk_size : int or None
+        if not None (and there is a storage), the frames are saved in
+        trajectories of ``chunk_size`` steps while the simulation runs,
+        instead of one trajectory at the end. Each chunk is saved with a
+        checkpoint of the transition and flux events found since the
+        previous checkpoint, so that the run can be continued with
+        :meth:`.restart_at_checkpoint`. Default None.
     """
     def __init__(self, storage=None, engine=None, states=None,
                  flux_pairs=None, initial_snapshot=None):
@@ -63,6 +77,10 @@ class DirectSimulation(PathSimulator):
             self.flux_pairs = []
         self.initial_snapshot = initial_snapshot
         self.save_every = 1
+        self.chunk_size = None
+        self._checkpoint = None
+        # number of transitions and flux events in earlier checkpoints
+        self._n_checkpointed = None
 
         # TODO: might set these elsewhere for reloading purposes?
         self.transition_count = []
@@ -77,15 +95,40 @@ class DirectSimulation(PathSimulator):
         self.transition_count = results['transition_count']
         self.flux_events = results['flux_events']
 
+    def _initial_run_state(self):
+        return {'most_recent_state': None,
+                'first_interface_exit': {p: -1 for p in self.flux_pairs},
+                'last_state_visit': {s: -1 for s in self.states},
+                'was_in_interface': {p: None for p in self.flux_pairs}}
+
+    @property
+    def streaming(self):
+        """bool : whether frames are saved in chunks of ``chunk_size``"""
+        return self.storage is not None and self.chunk_size is not None
+
     def run(self, n_steps):
-        most_recent_state = None
-        first_interface_exit = {p: -1 for p in self.flux_pairs}
-        last_state_visit = {s: -1 for s in self.states}
-        was_in_interface = {p: None for p in self.flux_pairs}
-        local_traj = paths.Trajectory([self.initial_snapshot])
-        self.engine.current_snapshot = self.initial_snapshot
+        if self.streaming and self._checkpoint is not None:
+            # continue where the last chunk ended
+            checkpoint = self._checkpoint
+            run_state = _copy_run_state({
+                key: getattr(checkpoint, key)
+                for key in self._initial_run_state()
+            })
+            step_offset = checkpoint.step
+            current_snapshot = checkpoint.trajectory[-1]
+        else:
+            run_state = self._initial_run_state()
+            step_offset = 0
+            current_snapshot = self.initial_snapshot
+
+        most_recent_state = run_state['most_recent_state']
+        first_interface_exit = run_state['first_interface_exit']
+        last_state_visit = run_state['last_state_visit']
+        was_in_interface = run_state['was_in_interface']
+        local_traj = paths.Trajectory([current_snapshot])
+        self.engine.current_snapshot = current_snapshot
         self.engine.start()
-        for step in xrange(n_steps):
+        for step in xrange(step_offset, step_offset + n_steps):
             frame = self.engine.generate_next_frame()
 
             # update the most recent state if we're in a state
@@ -131,12 +174,145 @@ class DirectSimulation(PathSimulator):
 
             if self.storage is not None:
                 local_traj += [frame]
+                if self.streaming and len(local_traj) > self.chunk_size:
+                    run_state['most_recent_state'] = most_recent_state
+                    self._save_checkpoint(local_traj, step + 1, run_state)
+                    # chunks overlap by one frame, so each chunk is a
+                    # continuous trajectory
+                    local_traj = paths.Trajectory([frame])
 
         self.engine.stop(local_traj)
 
-        if self.storage is not None:
+        if self.streaming:
+            if len(local_traj) > 1:
+                run_state['most_recent_state'] = most_recent_state
+                self._save_checkpoint(local_traj, step_offset + n_steps,
+                                      run_state)
+        elif self.storage is not None:
             self.storage.save(local_traj)
 
+    def _save_checkpoint(self, trajectory, step, run_state):
+        # only the events since the previous checkpoint are saved; the
+        # previous checkpoint is referenced by UUID (not as an object), so
+        # loading a checkpoint doesn't load the whole chain recursively
+        if self._n_checkpointed is None:
+            previous = None
+            n_transitions = 0
+            n_flux_events = {p: 0 for p in self.flux_events}
+        else:
+            previous = format(self._checkpoint.__uuid__, 'x')
+            (n_transitions, n_flux_events) = self._n_checkpointed
+
+        checkpoint = paths.Details(
+            simulation=self,
+            step=step,
+            previous=previous,
+            trajectory=trajectory,
+            new_transition_count=self.transition_count[n_transitions:],
+            new_flux_events={p: events[n_flux_events[p]:]
+                             for p, events in self.flux_events.items()},
+            **_copy_run_state(run_state)
+        )
+        self.storage.save(checkpoint)
+        self.storage.sync()
+        self._checkpoint = checkpoint
+        self._n_checkpointed = (
+            len(self.transition_count),
+            {p: len(events) for p, events in self.flux_events.items()}
+        )
+        self.step = step
+        logger.info("Saved frames up to step %d", step)
+
+    def _checkpoint_chain(self, checkpoint, storage):
+        """All checkpoints up to ``checkpoint``, from first to last"""
+        chain = [checkpoint]
+        while chain[-1].previous is not None:
+            chain.append(storage.details.load(int(chain[-1].previous, 16)))
+        return list(reversed(chain))
+
+    def last_checkpoint(self, storage=None):
+        """
+        Last checkpoint of this simulation saved in the storage.
+
+        Parameters
+        ----------
+        storage : :class:`.Storage`
+            storage to search; default (None) uses ``self.storage``
+
+        Returns
+        -------
+        :class:`.Details`
+            the last checkpoint, or None if no checkpoint was saved
+        """
+        if storage is None:
+            storage = self.storage
+        for idx in reversed(range(len(storage.details))):
+            details = storage.details[idx]
+            simulation = getattr(details, 'simulation', None)
+            if simulation is not None \
+                    and simulation.__uuid__ == self.__uuid__:
+                return details
+        return None
+
+    def restart_at_checkpoint(self, checkpoint=None, storage=None):
+        """
+        Continue a streaming run from a checkpoint.
+
+        In streaming mode (``chunk_size`` is not None), the frames are
+        saved every ``chunk_size`` steps as a trajectory, together with the
+        transition and flux events since the previous checkpoint. The
+        events up to the checkpoint are collected from the chain of
+        checkpoints that leads to it. After this, :meth:`.run` continues
+        from the last frame of the checkpoint, with the step numbers
+        counting on from those of the checkpoint.
+
+        Parameters
+        ----------
+        checkpoint : :class:`.Details`
+            the checkpoint to continue from; default (None) uses the last
+            checkpoint of this simulation in the storage
+        storage : :class:`.Storage`
+            If given this will change the storage used to store the frames.
+            The earlier checkpoints are read from the current storage (if
+            any), and the first checkpoint in the new storage contains all
+            events up to that point.
+        """
+        old_storage = self.storage
+        if storage is not None:
+            self.storage = storage
+        if old_storage is None:
+            old_storage = self.storage
+
+        if checkpoint is None:
+            checkpoint = self.last_checkpoint()
+            if checkpoint is None:
+                raise RuntimeError("No checkpoint found for this simulation")
+
+        if checkpoint.simulation.__uuid__ != self.__uuid__:
+            raise RuntimeWarning(
+                'Trying to continue from the checkpoint of another '
+                'simulation.')
+
+        transition_count = []
+        flux_events = {p: [] for p in checkpoint.new_flux_events}
+        for link in self._checkpoint_chain(checkpoint, old_storage):
+            transition_count.extend(link.new_transition_count)
+            for p, events in link.new_flux_events.items():
+                flux_events[p].extend(events)
+
+        self.load_results({'transition_count': transition_count,
+                           'flux_events': flux_events})
+        self._checkpoint = checkpoint
+        if self.storage is old_storage:
+            self._n_checkpointed = (
+                len(transition_count),
+                {p: len(events) for p, events in flux_events.items()}
+            )
+        else:
+            # the new storage doesn't have the earlier checkpoints
+            self._n_checkpointed = None
+        self.step = checkpoint.step
+
     @property
     def transitions(self):
         prev_state = None
@@ -4,6 +4,8 @@ import os
 
 import openpathsampling as paths
 from .path_simulator import PathSimulator, MCStep
+from .background_writer import BackgroundStorageWriter
+from .concurrent_moves import ConcurrentMoveScheduler
 from ..ops_logging import initialization_logging
 
 
@@ -16,6 +18,22 @@ class PathSampling(PathSimulator):
 
     Takes a single move_scheme and generates samples from that, keeping one
     per replica after each move.
+
+    Attributes
+    ----------
+    save_in_background : bool
+        if True, steps are saved and the storage is synced by a
+        :class:`.BackgroundStorageWriter` thread, so that the next MC step
+        can start while the previous one is being written. Not possible if
+        the storage has CVs with a disk cache. Default False.
+    background_queue_size : int
+        maximum number of storage operations waiting for the background
+        writer; the simulation pauses when the queue is full
+    concurrent_moves : int
+        if larger than 1, up to this many MC steps whose moves act on
+        different ensembles run at the same time, using a
+        :class:`.ConcurrentMoveScheduler`. The steps are saved in the
+        same order as they would be in a serial run. Default 1.
     """
 
     calc_name = "PathSampling"
@@ -49,6 +67,10 @@ class PathSampling(PathSimulator):
                                ['move_scheme', 'sample_set'])
         self.live_visualizer = None
         self.status_update_frequency = 1
+        self.save_in_background = False
+        self.background_queue_size = 10
+        self.concurrent_moves = 1
+        self._writer = None
 
         if initialize:
             samples = []
@@ -110,11 +132,23 @@ class PathSampling(PathSimulator):
 
         """
         if self.storage is not None and self._current_step is not None:
-            try:
-                # new storage does a stash here, not a save
-                self.storage.stash(self._current_step)
-            except AttributeError:
-                self.storage.steps.save(self._current_step)
+            if self._writer is not None:
+                self._writer.submit(self._save_step, self._current_step)
+            else:
+                self._save_step(self._current_step)
+
+    def _save_step(self, step):
+        try:
+            # new storage does a stash here, not a save
+            self.storage.stash(step)
+        except AttributeError:
+            self.storage.steps.save(step)
+
+    def sync_storage(self):
+        if self._writer is not None:
+            self._writer.submit(super(PathSampling, self).sync_storage)
+        else:
+            super(PathSampling, self).sync_storage()
 
     @classmethod
     def from_step(cls, storage, step, initialize=True):
@@ -212,18 +246,23 @@ class PathSampling(PathSimulator):
                                                    time_reversal)
                         for r in originals])
 
-        original_output_stream.write("Decorrelating trajectories....\n")
-        to_decorrelate = n_correlated(self.sample_set, originals)
-        # walrus in py38!
-        while to_decorrelate:
-            out_str = "Step {}: {} of {} trajectories still correlated\n"
-            paths.tools.refresh_output(
-                out_str.format(self.step + 1, to_decorrelate, len(originals)),
-                refresh=False,
-                output_stream=original_output_stream
-            )
-            self.run(1)
+        def decorrelate():
             to_decorrelate = n_correlated(self.sample_set, originals)
+            # walrus in py38!
+            while to_decorrelate:
+                out_str = "Step {}: {} of {} trajectories still correlated\n"
+                paths.tools.refresh_output(
+                    out_str.format(self.step + 1, to_decorrelate,
+                                   len(originals)),
+                    refresh=False,
+                    output_stream=original_output_stream
+                )
+                self.run(1)
+                to_decorrelate = n_correlated(self.sample_set, originals)
+
+        original_output_stream.write("Decorrelating trajectories....\n")
+        # all steps use the same background writer (if any)
+        self._with_writer(decorrelate)
 
         paths.tools.refresh_output(
             "Step {}: All trajectories decorrelated!\n".format(self.step+1),
@@ -234,6 +273,44 @@ class PathSampling(PathSimulator):
         self.output_stream = original_output_stream
 
     def run(self, n_steps):
+        self._with_writer(self._run, n_steps)
+
+    def _check_background_storage(self):
+        # the writer thread and the simulation would both use the storage
+        # if CVs load their values from a disk cache, but netCDF access is
+        # not thread-safe
+        cvs = getattr(self.storage.snapshots, 'attribute_list', {})
+        if cvs:
+            raise RuntimeError(
+                "Can't save in background: the storage has CVs with a "
+                "disk cache (" + ", ".join(cv.name for cv in cvs) + "). "
+                "Set save_in_background to False."
+            )
+
+    def _with_writer(self, func, *args):
+        """Call ``func(*args)``, with a background writer if requested.
+
+        The writer is closed (i.e., all its operations are finished) when
+        ``func`` returns. If a writer is already running, it is used.
+        """
+        if self.save_in_background and self.storage is not None \
+                and self._writer is None:
+            self._check_background_storage()
+            self._writer = BackgroundStorageWriter(self.background_queue_size)
+            try:
+                func(*args)
+            except BaseException:
+                # save everything that was queued before the error
+                self._writer.close(raise_errors=False)
+                raise
+            else:
+                self._writer.close()
+            finally:
+                self._writer = None
+        else:
+            func(*args)
+
+    def _run(self, n_steps):
         mcstep = None
 
         # cvs = list()
@@ -245,6 +322,12 @@ class PathSampling(PathSimulator):
 
         initial_time = time.time()
 
+        scheduler = None
+        if self.concurrent_moves > 1:
+            scheduler = ConcurrentMoveScheduler(self.root_mover,
+                                                self.concurrent_moves)
+        pending = []
+
         for nn in range(n_steps):
             self.step += 1
             logger.info("Beginning MC cycle " + str(self.step))
@@ -271,11 +354,26 @@ class PathSampling(PathSimulator):
                     output_stream=self.output_stream
                 )
 
-            time_start = time.time()
-            movepath = self._mover.move(self.sample_set, step=self.step)
+            if scheduler is None:
+                time_start = time.time()
+                movepath = self._mover.move(self.sample_set, step=self.step)
+                time_elapsed = time.time() - time_start
+            else:
+                if not pending:
+                    # an error stops the run where the serial run would stop
+                    scheduler.raise_error()
+                    pending = scheduler.run(self.sample_set, n_steps - nn)
+                    if not pending:
+                        scheduler.raise_error()
+                change, time_elapsed = pending.pop(0)
+                movepath = paths.PathSimulatorMoveChange(
+                    change,
+                    mover=self._mover,
+                    details=paths.Details(step=self.step)
+                )
+
             samples = movepath.results
             new_sampleset = self.sample_set.apply_samples(samples)
-            time_elapsed = time.time() - time_start
 
             # TODO: we can save this with the MC steps for timing? The bit
             # below works, but is only a temporary hack
@@ -1,5 +1,10 @@
 import logging
+import multiprocessing
+import sys
+
 import openpathsampling as paths
+from openpathsampling.netcdfplus import StorableObject
+from openpathsampling.netcdfplus.dictify import CachedUUIDObjectJSON
 
 logger = logging.getLogger(__name__)
 from .path_simulator import PathSimulator, MCStep
@@ -94,7 +99,8 @@ class ShootFromSnapshotsSimulation(PathSimulator):
         return obj
 
 
-    def run(self, n_per_snapshot, as_chain=False):
+    def run(self, n_per_snapshot, as_chain=False, n_workers=None,
+            seed=None):
         """Run the simulation.
 
         Parameters
@@ -107,13 +113,54 @@ class ShootFromSnapshotsSimulation(PathSimulator):
             input to the modifier is the previous (modified) snapshot.
             Useful for modifications that can't cover the whole range from a
             given snapshot.
+        n_workers : int or None
+            if larger than 1, the shots are run in that many worker
+            processes (see notes). Default (None) runs all shots in this
+            process.
+        seed : int or None
+            if given, all random number generators are reseeded from
+            ``(seed, shot_number)`` before each shot. The results are then
+            reproducible and independent of ``n_workers``.
+
+        Notes
+        -----
+        Worker processes are created by forking, so each worker has its own
+        copy of the engine and of all other simulation objects. They only
+        run the shots; the resulting steps are sent back to this process,
+        which saves them to storage in the same order as a serial run
+        would. If ``as_chain`` is True, all shots from the same initial
+        snapshot are run by the same worker. Forking is not available on
+        Windows; there, the shots are run in this process.
         """
         self.step = 0
-        snap_num = 0
         self.output_stream.write("\n")
-        for snapshot in self.initial_snapshots:
+        if n_workers is not None and n_workers > 1 and not _can_fork():
+            logger.info("Can't fork worker processes; running serially")
+            n_workers = None
+
+        global_state = None
+        if seed is not None:
+            # a seeded run leaves the random state of the calling process
+            # unchanged, both when run serially (where each shot reseeds)
+            # and in parallel
+            global_state = paths.rng.get_global_state()
+        elif n_workers is not None and n_workers > 1:
+            # forked workers would otherwise share the same RNG state
+            seed = int(paths.default_rng().integers(2**32))
+
+        try:
+            if n_workers is not None and n_workers > 1:
+                self._run_parallel(n_per_snapshot, as_chain, n_workers,
+                                   seed)
+            else:
+                self._run_serial(n_per_snapshot, as_chain, seed)
+        finally:
+            if global_state is not None:
+                paths.rng.set_global_state(global_state)
+
+    def _run_serial(self, n_per_snapshot, as_chain, seed):
+        for snap_num, snapshot in enumerate(self.initial_snapshots):
             start_snap = snapshot
-            # do what we need to get the snapshot set up
             for step in range(n_per_snapshot):
                 paths.tools.refresh_output(
                     "Working on snapshot %d / %d; shot %d / %d\n" % (
@@ -123,38 +170,133 @@ class ShootFromSnapshotsSimulation(PathSimulator):
                     output_stream=self.output_stream,
                     refresh=self.allow_refresh
                 )
+                shot_number = snap_num * n_per_snapshot + step
+                start_snap = self._start_snapshot(snapshot, start_snap,
+                                                  as_chain, seed,
+                                                  shot_number)
+                sample_set, new_pmc = self._shoot(start_snap)
+                self._save_step(sample_set, new_pmc)
+
+    def _start_snapshot(self, snapshot, previous, as_chain, seed,
+                        shot_number):
+        if seed is not None:
+            paths.rng.seed_all([seed, shot_number])
+
+        if as_chain:
+            return self.randomizer(previous)
+        else:
+            return self.randomizer(snapshot)
+
+    def _shoot(self, start_snap):
+        sample_set = paths.SampleSet([
+            paths.Sample(replica=0,
+                         trajectory=paths.Trajectory([start_snap]),
+                         ensemble=self.starting_ensemble)
+        ])
+        sample_set.sanity_check()
+        new_pmc = self.mover.move(sample_set)
+        return sample_set, new_pmc
+
+    def _save_step(self, sample_set, new_pmc):
+        samples = new_pmc.results
+        new_sample_set = sample_set.apply_samples(samples)
+
+        mcstep = MCStep(
+            simulation=self,
+            mccycle=self.step,
+            previous=sample_set,
+            active=new_sample_set,
+            change=new_pmc
+        )
 
-                if as_chain:
-                    start_snap = self.randomizer(start_snap)
-                else:
-                    start_snap = self.randomizer(snapshot)
-
-                sample_set = paths.SampleSet([
-                    paths.Sample(replica=0,
-                                 trajectory=paths.Trajectory([start_snap]),
-                                 ensemble=self.starting_ensemble)
-                ])
-                sample_set.sanity_check()
-                new_pmc = self.mover.move(sample_set)
-                samples = new_pmc.results
-                new_sample_set = sample_set.apply_samples(samples)
-
-                mcstep = MCStep(
-                    simulation=self,
-                    mccycle=self.step,
-                    previous=sample_set,
-                    active=new_sample_set,
-                    change=new_pmc
+        if self.storage is not None:
+            self.storage.steps.save(mcstep)
+            if self.step % self.save_frequency == 0:
+                self.sync_storage()
+
+        self.step += 1
+
+    def _run_parallel(self, n_per_snapshot, as_chain, n_workers, seed):
+        global _worker_simulation
+
+        n_snapshots = len(self.initial_snapshots)
+        if as_chain:
+            tasks = [
+                (snap_num, list(range(snap_num * n_per_snapshot,
+                                      (snap_num + 1) * n_per_snapshot)))
+                for snap_num in range(n_snapshots)
+            ]
+        else:
+            tasks = [
+                (snap_num, [snap_num * n_per_snapshot + step])
+                for snap_num in range(n_snapshots)
+                for step in range(n_per_snapshot)
+            ]
+
+        # all objects of this simulation are known to the workers; results
+        # that refer to them are rebuilt with our instances, not copies
+        serializer = CachedUUIDObjectJSON()
+        serializer.simplify(self)
+
+        n_total = n_snapshots * n_per_snapshot
+        _worker_simulation = (self, as_chain, seed)
+        try:
+            if hasattr(multiprocessing, 'get_context'):
+                pool = multiprocessing.get_context('fork').Pool(
+                    n_workers, initializer=_init_worker
                 )
+            else:
+                # Python 2 always forks
+                pool = multiprocessing.Pool(n_workers,
+                                            initializer=_init_worker)
+            try:
+                for results in pool.imap(_run_shots_in_worker, tasks):
+                    for result in results:
+                        sample_set, new_pmc = serializer.from_json(result)
+                        self._save_step(sample_set, new_pmc)
+                        paths.tools.refresh_output(
+                            "Finished shot %d / %d\n" % (self.step, n_total),
+                            output_stream=self.output_stream,
+                            refresh=self.allow_refresh
+                        )
+            finally:
+                pool.terminate()
+                pool.join()
+        finally:
+            _worker_simulation = None
+
+
+# (simulation, as_chain, seed) of the parallel run; set in the parent and
+# inherited by the forked worker processes
+_worker_simulation = None
+
+
+def _can_fork():
+    if hasattr(multiprocessing, 'get_all_start_methods'):
+        return 'fork' in multiprocessing.get_all_start_methods()
+    else:
+        # Python 2: multiprocessing forks, except on Windows
+        return sys.platform != 'win32'
+
+
+def _init_worker():
+    StorableObject.reset_uuid_generator()
 
-                if self.storage is not None:
-                    self.storage.steps.save(mcstep)
-                    if self.step % self.save_frequency == 0:
-                        self.sync_storage()
 
-                self.step += 1
-            snap_num += 1
+def _run_shots_in_worker(task):
+    simulation, as_chain, seed = _worker_simulation
+    snap_num, shot_numbers = task
+    snapshot = simulation.initial_snapshots[snap_num]
+    serializer = CachedUUIDObjectJSON()
+    results = []
+    start_snap = snapshot
+    for shot_number in shot_numbers:
+        start_snap = simulation._start_snapshot(snapshot, start_snap,
+                                                as_chain, seed, shot_number)
+        sample_set, new_pmc = simulation._shoot(start_snap)
+        results.append(serializer.to_json((sample_set, new_pmc)))
 
+    return results
 
 
 class CommittorSimulation(ShootFromSnapshotsSimulation):
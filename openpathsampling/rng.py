@@ -1,3 +1,5 @@
+import random
+
 import numpy as np
 
 
@@ -18,3 +20,68 @@ else:
 
 def default_rng():
     return DEFAULT_RNG
+
+
+def seed_all(seed):
+    """Reseed all random number generators used in OPS.
+
+    This resets the OPS default generator in place (so objects that keep a
+    reference to it use the new state), numpy's global random state, and
+    Python's ``random`` module. It is used to make independent pieces of a
+    simulation (e.g., single shots run in different processes)
+    reproducible.
+
+    Parameters
+    ----------
+    seed : int or list of int
+        entropy used to create a :class:`numpy.random.SeedSequence` (or,
+        with numpy < 1.17, to seed a :class:`numpy.random.RandomState` that
+        generates the seeds)
+    """
+    if isinstance(DEFAULT_RNG, np.random.RandomState):
+        # Legacy support: no SeedSequence before numpy 1.17
+        seeder = np.random.RandomState(seed)
+        ops_seed, np_seed, py_seed = seeder.randint(2**31 - 1, size=3)
+        DEFAULT_RNG.seed(ops_seed)
+    else:
+        seed_seq = np.random.SeedSequence(seed)
+        np_seed, py_seed = seed_seq.generate_state(2)
+        bit_generator = type(DEFAULT_RNG.bit_generator)(seed_seq)
+        DEFAULT_RNG.bit_generator.state = bit_generator.state
+
+    np.random.seed(np_seed)
+    random.seed(int(py_seed))
+
+
+def get_global_state():
+    """State of all random number generators reseeded by :func:`seed_all`.
+
+    Returns
+    -------
+    tuple
+        the state of the OPS default generator, of numpy's global random
+        state, and of Python's ``random``; to be restored with
+        :func:`set_global_state`
+    """
+    if isinstance(DEFAULT_RNG, np.random.RandomState):
+        ops_state = DEFAULT_RNG.get_state()
+    else:
+        ops_state = DEFAULT_RNG.bit_generator.state
+    return (ops_state, np.random.get_state(), random.getstate())
+
+
+def set_global_state(state):
+    """Restore a state from :func:`get_global_state`.
+
+    Parameters
+    ----------
+    state : tuple
+        the state returned by :func:`get_global_state`
+    """
+    (ops_state, np_state, py_state) = state
+    if isinstance(DEFAULT_RNG, np.random.RandomState):
+        DEFAULT_RNG.set_state(ops_state)
+    else:
+        DEFAULT_RNG.bit_generator.state = ops_state
+    np.random.set_state(np_state)
+    random.setstate(py_state)
@@ -6,5 +6,6 @@ from .stores import (
     SnapshotWrapperStore)
 
 from .storage import Storage, AnalysisStorage
+from .cache_budget import CacheBudget, BudgetCache
 
 from .util import join_md_storage, split_md_storage
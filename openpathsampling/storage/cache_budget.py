@@ -0,0 +1,264 @@
+"""
+Share a fixed memory budget between the caches of a storage.
+
+The caching modes of :meth:`.Storage.set_caching_mode` set the number of
+cached objects per store. How much memory this takes depends on the
+system: a cached snapshot of a solvated protein is a million times larger
+than a snapshot of a toy model. :class:`.CacheBudget` instead starts from a
+budget in bytes. It estimates the size of an object in each store (for
+snapshots, from the number of atoms and the other feature dimensions) and
+regularly redistributes the budget between the stores according to how
+often their caches are used.
+"""
+
+import logging
+
+import numpy as np
+
+from openpathsampling.netcdfplus import WeakLRUCache
+
+logger = logging.getLogger(__name__)
+
+# rough sizes (bytes) of a loaded Python object and of one stored reference
+# (UUID, proxy, JSON field) of an object; only used for estimates
+OBJECT_OVERHEAD = 1000
+REFERENCE_SIZE = 100
+
+
+class BudgetCache(WeakLRUCache):
+    """:class:`.WeakLRUCache` that reports its lookups to a budget.
+
+    The cache always counts its use in :attr:`.stats`.
+
+    Parameters
+    ----------
+    size_limit : int
+        number of objects kept with strong references
+    budget : :class:`.CacheBudget` or None
+        the budget to notify about lookups
+    """
+    def __init__(self, size_limit=100, budget=None):
+        super(BudgetCache, self).__init__(size_limit)
+        self.budget = budget
+        self.enable_stats()
+
+    def __getitem__(self, item):
+        try:
+            return super(BudgetCache, self).__getitem__(item)
+        finally:
+            if self.budget is not None:
+                self.budget.tick()
+
+
+class CacheBudget(object):
+    """Distribute a memory budget between the caches of several stores.
+
+    Each store gets a :class:`.BudgetCache`. Every ``rebalance_interval``
+    cache lookups, :meth:`.rebalance` divides the budget between the stores
+    in proportion to their (exponentially smoothed) number of lookups. A
+    store whose cache had no misses and that does not use its share keeps
+    only what it uses (plus some headroom); the rest goes to the other
+    stores. The number of cached objects of a store is its share of the
+    budget divided by :meth:`.object_size`.
+
+    The object sizes are estimates: the bytes of the fixed-size (numeric)
+    variables of a store plus a constant overhead per object and per
+    reference. They are meant to keep the total cache size in the right
+    range, not to be exact.
+
+    Parameters
+    ----------
+    storage : :class:`.Storage`
+        the storage with the stores
+    budget : int
+        total memory for the caches of the ``stores``, in bytes
+    stores : list of str
+        names of the stores sharing the budget; default
+        :attr:`.default_stores`
+    min_size : int
+        minimal number of cached objects per store
+    rebalance_interval : int
+        number of cache lookups between rebalancing; 0 to only rebalance
+        when :meth:`.rebalance` is called
+    object_sizes : dict of str: int
+        fixed object sizes (bytes) for some stores, instead of estimates
+    decay : float
+        weight of the lookups before the last rebalancing, between 0 and 1
+
+    Attributes
+    ----------
+    caches : dict of str: :class:`.BudgetCache`
+        the caches of the stores
+    sizes : dict of str: int
+        current number of cached objects per store
+    """
+    default_stores = ['snapshots', 'trajectories', 'samples', 'movechanges',
+                      'steps']
+    headroom = 1.25
+
+    def __init__(self, storage, budget, stores=None, min_size=10,
+                 rebalance_interval=10000, object_sizes=None, decay=0.5):
+        if budget <= 0:
+            raise ValueError("The cache budget must be positive")
+        self.storage = storage
+        self.budget = budget
+        if stores is None:
+            stores = [name for name in self.default_stores
+                      if hasattr(storage, name)]
+        self.stores = stores
+        self.min_size = min_size
+        self.rebalance_interval = rebalance_interval
+        self.object_sizes = dict(object_sizes or {})
+        self.decay = decay
+        self.caches = {}
+        self.sizes = {}
+        self._activity = {name: 1.0 for name in stores}
+        self._last_stats = {}
+        self._n_lookups = 0
+
+    def install(self):
+        """Replace the caches of the stores and set their initial sizes"""
+        for name in self.stores:
+            store = getattr(self.storage, name)
+            cache = BudgetCache(self.min_size, budget=self)
+            store.set_caching(cache)
+            self.caches[name] = cache
+            self._last_stats[name] = cache.stats.copy()
+        self.rebalance()
+        return self
+
+    def tick(self):
+        """Count one cache lookup; rebalances when the interval is reached"""
+        self._n_lookups += 1
+        if self.rebalance_interval and \
+                self._n_lookups >= self.rebalance_interval:
+            self.rebalance()
+
+    def recent_stats(self, store_name):
+        """Cache use of a store since the last rebalancing.
+
+        Parameters
+        ----------
+        store_name : str
+            name of the store in the storage
+
+        Returns
+        -------
+        :class:`.CacheStats`
+        """
+        cache = self.caches[store_name]
+        if cache.stats is None:
+            # counting was switched off; start again
+            self._last_stats[store_name] = cache.enable_stats().copy()
+        return cache.stats - self._last_stats[store_name]
+
+    def object_size(self, store_name):
+        """Estimated memory of one cached object of a store, in bytes.
+
+        Parameters
+        ----------
+        store_name : str
+            name of the store in the storage
+
+        Returns
+        -------
+        int
+        """
+        if store_name in self.object_sizes:
+            return self.object_sizes[store_name]
+
+        store = getattr(self.storage, store_name)
+        if store_name == 'snapshots':
+            # weighted by the number of snapshots of each type
+            sizes = []
+            counts = []
+            for sub_store, _ in store.type_list.values():
+                sizes.append(self._variable_bytes(sub_store.prefix))
+                counts.append(len(sub_store))
+            if not sizes:
+                return OBJECT_OVERHEAD
+            if sum(counts) == 0:
+                counts = None
+            return int(OBJECT_OVERHEAD + np.average(sizes, weights=counts))
+
+        size = OBJECT_OVERHEAD + self._variable_bytes(store.prefix)
+        if store_name == 'trajectories':
+            # a trajectory holds one reference per snapshot
+            size += REFERENCE_SIZE * self._mean_cached_length(store_name)
+        return int(size)
+
+    def _variable_bytes(self, prefix):
+        """Bytes per object of the variables of a store with ``prefix``"""
+        total = 0
+        for var in self.storage.variables.values():
+            if not var.dimensions or var.dimensions[0] != prefix:
+                continue
+            if isinstance(var.dtype, np.dtype):
+                total += var.dtype.itemsize * int(np.prod(var.shape[1:]))
+            else:
+                # variable length: references or JSON
+                total += REFERENCE_SIZE
+        return total
+
+    def _mean_cached_length(self, store_name, n_sample=100):
+        """Mean length of the most recently used objects in the cache"""
+        cache = self.caches.get(store_name)
+        if cache is None:
+            return 0
+        objs = list(cache._cache.values())[-n_sample:]
+        if not objs:
+            return 0
+        return float(np.mean([len(obj) for obj in objs]))
+
+    def rebalance(self):
+        """Divide the budget between the stores using the recent lookups"""
+        object_sizes = {name: self.object_size(name) for name in self.stores}
+        recent = {name: self.recent_stats(name) for name in self.caches}
+        for name, stats in recent.items():
+            self._activity[name] = (self.decay * self._activity[name]
+                                    + (1.0 - self.decay) * stats.lookups)
+
+        # stores without misses that don't fill their share keep what they
+        # use; repeat until no more budget is freed this way
+        remaining = float(self.budget)
+        active = list(self.stores)
+        allocation = {}
+        while active:
+            total = sum(self._activity[name] for name in active)
+            if total > 0:
+                share = {name: remaining * self._activity[name] / total
+                         for name in active}
+            else:
+                share = {name: remaining / len(active) for name in active}
+
+            capped = []
+            for name in active:
+                stats = recent.get(name)
+                if stats is None or stats.misses > 0 or stats.hits == 0:
+                    continue
+                used = (self.headroom * self.caches[name].count[0]
+                        * object_sizes[name])
+                if used < share[name]:
+                    capped.append((name, used))
+
+            if not capped:
+                allocation.update(share)
+                break
+
+            for name, used in capped:
+                allocation[name] = used
+                remaining -= used
+                active.remove(name)
+
+        for name in self.stores:
+            size = max(self.min_size,
+                       int(allocation[name] // object_sizes[name]))
+            self.sizes[name] = size
+            cache = self.caches.get(name)
+            if cache is not None:
+                cache.size_limit = size
+                self._last_stats[name] = cache.stats.copy()
+
+        logger.debug("Rebalanced cache sizes: %s", self.sizes)
+        self._n_lookups = 0
+        return dict(self.sizes)
@@ -5,6 +5,7 @@ Created on 06.07.2014
 """
 
 import logging
+import os
 import time
 
 import openpathsampling as paths
@@ -12,6 +13,7 @@ from openpathsampling.netcdfplus import NetCDFPlus, WeakLRUCache, ObjectStore, \
     ImmutableDictStore, NamedObjectStore, PseudoAttributeStore
 
 from .stores import SnapshotWrapperStore
+from .cache_budget import CacheBudget
 
 import openpathsampling.engines as peng
 
@@ -94,6 +96,7 @@ class Storage(NetCDFPlus):
         self.create_store('shootingpointselectors',
                           NamedObjectStore(paths.ShootingPointSelector))
         self.create_store('engines', NamedObjectStore(peng.DynamicsEngine))
+        self.create_store('enginepools', ObjectStore(peng.EnginePool))
         self.create_store('pathsimulators',
                           paths.storage.PathSimulatorStore())
         self.create_store('transitions', NamedObjectStore(paths.Transition))
@@ -196,6 +199,111 @@ class Storage(NetCDFPlus):
                 store = getattr(self, store_name)
                 store.set_caching(caching)
 
+    def set_cache_budget(self, budget, stores=None, **kwargs):
+        r"""
+        Share a memory budget between the caches of the main stores
+
+        Instead of a fixed number of objects per store (as in
+        :meth:`.set_caching_mode`), the caches of the ``stores`` get sizes
+        from a total budget in bytes, using estimated object sizes, and the
+        budget is regularly redistributed to the caches that are used most.
+
+        Parameters
+        ----------
+        budget : int
+            memory for the caches, in bytes
+        stores : list of str or None
+            the stores sharing the budget; if None, snapshots, trajectories,
+            samples, movechanges and steps
+        kwargs :
+            further options of :class:`.CacheBudget`
+
+        Returns
+        -------
+        :class:`.CacheBudget`
+            the object managing the budget
+        """
+        self.cache_budget = CacheBudget(self, budget, stores=stores,
+                                        **kwargs).install()
+        return self.cache_budget
+
+    def memmap_coordinates(self, directory=None):
+        """
+        Serve the stored coordinates of all snapshots from memory-mapped
+        arrays
+
+        Only possible for storages opened read-only. Coordinates of loaded
+        snapshots become read-only views into the arrays, see
+        :meth:`.NetCDFPlus.memmap_variable`.
+
+        Parameters
+        ----------
+        directory : str or None
+            where to put the `.npy` files holding the arrays. If None, next
+            to the storage file
+
+        Returns
+        -------
+        dict of str: numpy.ndarray
+            the arrays by the name of the store that indexes them. This is
+            the snapshot store for snapshots with a `coordinates` feature and
+            its `statics` store for snapshots with `statics`
+        """
+        arrays = {}
+        for store in self.snapshots.store_snapshot_list:
+            for name in [store.prefix, store.prefix + 'statics']:
+                var_name = name + '_coordinates'
+                if var_name in self.variables:
+                    filename = None
+                    if directory is not None:
+                        filename = os.path.join(
+                            directory, '%s.%s.npy' % (
+                                os.path.basename(self.filename), var_name))
+                    arrays[name] = self.memmap_variable(var_name, filename)
+
+        return arrays
+
+    def precompute_cvs(self, cvs=None, n_workers=None, chunk_size=1000):
+        """
+        Compute the missing values of CVs for all stored snapshots in
+        parallel and store them
+
+        CVs that are not saved yet are saved, and CVs without a disk cache
+        get one. New disk caches are filled here (instead of one snapshot
+        after the other on creation). See
+        :meth:`.SnapshotWrapperStore.precompute_cvs` for details.
+
+        Parameters
+        ----------
+        cvs : list of :obj:`openpathsampling.CollectiveVariable` or None
+            the CVs to compute. If None, all CVs with a disk cache
+        n_workers : int or None
+            number of worker processes. If None, the number of CPUs. With
+            1, everything is computed in this process
+        chunk_size : int
+            number of snapshots sent to a worker at once
+
+        Returns
+        -------
+        dict
+            the number of values computed for each CV
+        """
+        if cvs is None:
+            cvs = [cv for cv in self.cvs if self.cvs.has_cache(cv)]
+
+        self.snapshots._defer_cv_fill = True
+        try:
+            for cv in cvs:
+                if cv.__uuid__ not in self.cvs.index:
+                    self.cvs.save(cv)
+                if not self.cvs.has_cache(cv):
+                    self.cvs.add_diskcache(cv)
+        finally:
+            self.snapshots._defer_cv_fill = False
+
+        return self.snapshots.precompute_cvs(
+            cvs, n_workers=n_workers, chunk_size=chunk_size)
+
     def check_version(self):
         super(Storage, self).check_version()
         try:
@@ -241,6 +349,7 @@ class Storage(NetCDFPlus):
             'pathmovers': True,
             'shootingpointselectors': True,
             'engines': True,
+            'enginepools': True,
             'pathsimulators': True,
             'volumes': True,
             'ensembles': True,
@@ -276,6 +385,7 @@ class Storage(NetCDFPlus):
             'pathmovers': True,
             'shootingpointselectors': True,
             'engines': True,
+            'enginepools': True,
             'pathsimulators': True,
             'volumes': True,
             'ensembles': True,
@@ -311,6 +421,7 @@ class Storage(NetCDFPlus):
             'pathmovers': WeakLRUCache(10),
             'shootingpointselectors': WeakLRUCache(10),
             'engines': WeakLRUCache(10),
+            'enginepools': WeakLRUCache(10),
             'pathsimulators': WeakLRUCache(10),
             'volumes': WeakLRUCache(10),
             'ensembles': WeakLRUCache(10),
@@ -347,6 +458,7 @@ class Storage(NetCDFPlus):
             'pathmovers': True,
             'shootingpointselectors': True,
             'engines': True,
+            'enginepools': True,
             'pathsimulators': True,
             'volumes': True,
             'ensembles': True,
@@ -382,6 +494,7 @@ class Storage(NetCDFPlus):
             'pathmovers': False,
             'shootingpointselectors': False,
             'engines': False,
+            'enginepools': False,
             'pathsimulators': False,
             'volumes': False,
             'ensembles': False,
@@ -419,6 +532,7 @@ class Storage(NetCDFPlus):
             'pathmovers': False,
             'shootingpointselectors': False,
             'engines': False,
+            'enginepools': False,
             'pathsimulators': False,
             'volumes': False,
             'ensembles': False,
@@ -453,6 +567,7 @@ class Storage(NetCDFPlus):
             'pathmovers': True,
             'shootingpointselectors': True,
             'engines': True,
+            'enginepools': True,
             'pathsimulators': True,
             'volumes': True,
             'ensembles': True,
@@ -474,7 +589,8 @@ class AnalysisStorage(Storage):
 
     """
 
-    def __init__(self, filename, caching_mode='analysis'):
+    def __init__(self, filename, caching_mode='analysis',
+                 memmap_coordinates=False):
         """
         Open a storage in read-only and do caching useful for analysis.
 
@@ -488,6 +604,10 @@ class AnalysisStorage(Storage):
             size system and lots of memory you might want to try `unlimited`
             which will not load all objects but keep every object you load.
             This is fastest but might crash for large storages.
+        memmap_coordinates : bool or str
+            If True, snapshot coordinates are served from memory-mapped
+            arrays, see :meth:`.Storage.memmap_coordinates`. A string is
+            used as the directory for the array files.
 
         """
         super(AnalysisStorage, self).__init__(
@@ -497,6 +617,13 @@ class AnalysisStorage(Storage):
 
         self.set_caching_mode(caching_mode)
 
+        if memmap_coordinates:
+            directory = None
+            if memmap_coordinates is not True:
+                directory = memmap_coordinates
+            with AnalysisStorage.CacheTimer('Mapped all coordinates'):
+                self.memmap_coordinates(directory)
+
         # Let's go caching
         AnalysisStorage.cache_for_analysis(self)
 
@@ -121,6 +121,27 @@ class BaseSnapshotStore(IndexedObjectStore):
         self._get(st_idx, obj)
         return obj
 
+    def _load_many(self, n_idxs):
+        objs = []
+        for start, stop in self._index_runs(n_idxs):
+            run = []
+            for _ in range(start, stop):
+                obj = self._cls.__new__(self._cls)
+                self._cls.init_empty(obj)
+                run.append(obj)
+            self._get_many(start, stop, run)
+            objs.extend(run)
+        return objs
+
+    def _get_many(self, start, stop, snapshots):
+        """
+        Fill empty snapshots with the data stored at `start:stop`
+
+        Override this to read the data for all snapshots at once
+        """
+        for idx, snapshot in zip(range(start, stop), snapshots):
+            self._get(idx, snapshot)
+
     def save(self, obj, idx=None):
         pos = idx // 2
 
@@ -11,8 +11,10 @@ class FeatureSnapshotStore(BaseSnapshotStore):
     An ObjectStore for Snapshots in netCDF files.
     """
 
-    def __init__(self, descriptor):
+    def __init__(self, descriptor, compression=None):
         super(FeatureSnapshotStore, self).__init__(descriptor)
+        if compression is not None:
+            self.compression.update(compression)
 
     @property
     def classes(self):
@@ -29,6 +31,12 @@ class FeatureSnapshotStore(BaseSnapshotStore):
         [setattr(snapshot, attr, self.vars[attr][idx])
          for attr in self.storables]
 
+    def _get_many(self, start, stop, snapshots):
+        for attr in self.storables:
+            values = self.vars[attr][start:stop]
+            for snapshot, value in zip(snapshots, values):
+                setattr(snapshot, attr, value)
+
     def initialize(self):
         super(FeatureSnapshotStore, self).initialize()
 
@@ -1,9 +1,13 @@
 import logging
+import collections
+import multiprocessing
 from uuid import UUID
 
+import numpy as np
+
 import openpathsampling.engines as peng
 from openpathsampling.netcdfplus import ObjectStore, \
-    NetCDFPlus, LoaderProxy
+    NetCDFPlus, LoaderProxy, ObjectJSON
 
 from .snapshot_feature import FeatureSnapshotStore
 from .snapshot_value import SnapshotValueStore
@@ -78,6 +82,50 @@ class ReversalHashedList(dict):
         return self._list
 
 
+# CVs and engines of a worker process in `precompute_cvs`
+_cv_worker_state = {}
+
+
+def _init_cv_worker(cv_jsons, engine_jsons):
+    simplifier = ObjectJSON()
+    _cv_worker_state['cvs'] = [simplifier.from_json(jsn)
+                               for jsn in cv_jsons]
+    _cv_worker_state['engines'] = {
+        uuid: simplifier.from_json(jsn)
+        for uuid, jsn in engine_jsons.items()
+    }
+
+
+def _pack_snapshot(snapshot):
+    # engines can't be pickled, so they are sent separately (as JSON)
+    cls = snapshot.__class__
+    variables = {var: getattr(snapshot, var)
+                 for var in cls.__features__.variables if var != 'engine'}
+    return cls, snapshot.engine.__uuid__, variables
+
+
+def _evaluate_cvs(cvs, snapshots, requests):
+    # requests map (cv number, reversed) to positions in snapshots
+    results = {}
+    for (cv_num, reverse), positions in requests.items():
+        items = [snapshots[pos] for pos in positions]
+        if reverse:
+            items = [snap.reversed for snap in items]
+        results[(cv_num, reverse)] = cvs[cv_num]._eval_dict(items)
+    return results
+
+
+def _evaluate_cvs_worker(packed_snapshots, engine_jsons, requests):
+    engines = _cv_worker_state['engines']
+    simplifier = ObjectJSON()
+    for uuid, jsn in engine_jsons.items():
+        engines[uuid] = simplifier.from_json(jsn)
+    snapshots = []
+    for cls, engine_uuid, variables in packed_snapshots:
+        snapshots.append(cls(engine=engines[engine_uuid], **variables))
+    return _evaluate_cvs(_cv_worker_state['cvs'], snapshots, requests)
+
+
 class SnapshotWrapperStore(ObjectStore):
     """
     A Store to store arbitrary snapshots
@@ -102,6 +150,10 @@ class SnapshotWrapperStore(ObjectStore):
         # so CVs will be storable
         self.only_mention = False
 
+        # if set to true, new CV stores in complete mode are not filled on
+        # creation (used by `precompute_cvs`)
+        self._defer_cv_fill = False
+
     @property
     def treat_missing_snapshot_type(self):
         return self._treat_missing_snapshot_type
@@ -246,7 +298,25 @@ class SnapshotWrapperStore(ObjectStore):
 
         return idx
 
-    def add_type(self, descriptor):
+    def add_type(self, descriptor, compression=None):
+        """
+        Add a store for a type of snapshots
+
+        Parameters
+        ----------
+        descriptor : :class:`openpathsampling.engines.SnapshotDescriptor` or
+                :class:`openpathsampling.engines.BaseSnapshot`
+            the descriptor of the snapshot type or a template snapshot,
+            which is saved as well
+        compression : dict or None
+            compression options by feature variable name, e.g. from
+            :meth:`quantized_compression`. Only used if the store is new.
+
+        Returns
+        -------
+        (:class:`FeatureSnapshotStore`, int)
+            the store and its index
+        """
         if isinstance(descriptor, peng.BaseSnapshot):
             template = descriptor
             descriptor = descriptor.engine.descriptor
@@ -256,7 +326,7 @@ class SnapshotWrapperStore(ObjectStore):
         if descriptor in self.type_list:
             return self.type_list[descriptor]
 
-        store = FeatureSnapshotStore(descriptor)
+        store = FeatureSnapshotStore(descriptor, compression)
 
         store_idx = int(len(self.storage.dimensions['snapshottype']))
         store_name = 'snapshot' + str(store_idx)
@@ -280,6 +350,42 @@ class SnapshotWrapperStore(ObjectStore):
 
         return store, store_idx
 
+    @staticmethod
+    def quantized_compression(digits=3, complevel=4,
+                              variables=('coordinates', 'velocities')):
+        """
+        Compression options for fixed precision snapshot features
+
+        Similar to XTC files, values are rounded to a fixed precision, here
+        `digits` decimal places in the units of the variable. The rounded
+        floats are then zlib compressed. Decompression is transparent.
+
+        Parameters
+        ----------
+        digits : int or None
+            the number of decimal places to keep. If None, the compression
+            is lossless
+        complevel : int
+            the zlib compression level, between 1 (fastest) and 9 (smallest)
+        variables : iterable of str
+            the names of the variables to compress. The coordinates and
+            velocities in `statics` and `kinetics` are included by name.
+
+        Returns
+        -------
+        dict
+            compression options by variable name for :meth:`add_type`
+        """
+        options = {
+            'zlib': True,
+            'complevel': complevel,
+            'shuffle': True
+        }
+        if digits is not None:
+            options['least_significant_digit'] = digits
+
+        return {name: dict(options) for name in variables}
+
     @staticmethod
     def _snapshot_store_name(idx):
         return 'snapshot' + str(idx)
@@ -562,6 +668,232 @@ class SnapshotWrapperStore(ObjectStore):
                     cv_store.index[pos] = n_idx
                     cv_store.cache[n_idx] = value
 
+    @staticmethod
+    def _missing_cv_values(cv_store, start, stop):
+        """
+        Find the snapshot pairs in `start:stop` without a stored value
+
+        Returns
+        -------
+        list of tuple(int, bool)
+            the pair index and whether the value of the reversed snapshot
+            is missing (otherwise the forward one)
+        """
+        if cv_store.allow_incomplete:
+            missing = []
+            for pos in range(start, stop):
+                if cv_store.time_reversible:
+                    if pos not in cv_store.index:
+                        missing.append((pos, False))
+                else:
+                    for reverse in [False, True]:
+                        if 2 * pos + reverse not in cv_store.index:
+                            missing.append((pos, reverse))
+            return missing
+
+        # in complete mode unset values have the fill value
+        variable = cv_store.variables['value']
+        variable.set_auto_mask(True)
+        try:
+            values = variable[start:stop]
+        finally:
+            variable.set_auto_mask(False)
+        mask = np.ma.getmaskarray(values).reshape(stop - start, -1)
+        return [(start + num, False)
+                for num in np.nonzero(mask.any(axis=1))[0]]
+
+    @staticmethod
+    def _set_cv_values(cv_store, entries):
+        """
+        Write values to a CV store
+
+        Parameters
+        ----------
+        cv_store : :class:`.SnapshotValueStore`
+        entries : list of tuple(int, bool, value)
+            the snapshot pair index, whether the value is for the reversed
+            snapshot, and the value
+        """
+        if not entries:
+            return
+
+        if cv_store.allow_incomplete:
+            first = cv_store.free()
+            n_idxs = list(range(first, first + len(entries)))
+            positions = [pos if cv_store.time_reversible
+                         else 2 * pos + reverse
+                         for pos, reverse, _ in entries]
+            cv_store.vars['index'][first:first + len(entries)] = positions
+            for pos, n_idx in zip(positions, n_idxs):
+                cv_store.index[pos] = n_idx
+            cv_store.cache.update_size(max(n_idxs) + 1)
+        else:
+            n_idxs = [pos for pos, _, _ in entries]
+
+        values = [value for _, _, value in entries]
+        variable = cv_store.variables['value']
+        var_type = getattr(variable, 'var_type', '')
+        plain = var_type in ['float', 'int', 'bool'] or \
+            var_type.startswith('numpy.')
+        if plain and not hasattr(variable, 'unit_simtk'):
+            # write consecutive entries at once
+            order = sorted(range(len(n_idxs)), key=n_idxs.__getitem__)
+            sorted_idxs = [n_idxs[num] for num in order]
+            offset = 0
+            for start, stop in ObjectStore._index_runs(sorted_idxs):
+                run = [values[num] for num in
+                       order[offset:offset + stop - start]]
+                cv_store.vars['value'][start:stop] = np.array(run)
+                offset += stop - start
+        else:
+            for n_idx, value in zip(n_idxs, values):
+                cv_store.vars['value'][n_idx] = value
+
+        for n_idx, value in zip(n_idxs, values):
+            cv_store.cache[n_idx] = value
+        # `load` ignores positions beyond the stored length
+        cv_store._len = max(cv_store._len, max(n_idxs) + 1)
+
+    def _load_pairs(self, positions, start, stored_idxs):
+        # load the forward snapshots of pairs, reading the data of each
+        # snapshot store in slices; `stored_idxs` are the store indices
+        # of the pairs from `start` on
+        snapshots = {}
+        by_store = collections.defaultdict(list)
+        for pos in positions:
+            try:
+                snapshots[pos] = self.cache[2 * pos]
+            except KeyError:
+                by_store[int(stored_idxs[pos - start])].append(pos)
+
+        for store_idx, store_positions in by_store.items():
+            store = self.store_snapshot_list[store_idx]
+            n_idxs = [store.index[pos] for pos in store_positions]
+            order = sorted(range(len(n_idxs)), key=n_idxs.__getitem__)
+            loaded = store._load_many([n_idxs[num] for num in order])
+            for num, snap in zip(order, loaded):
+                pos = store_positions[num]
+                self._get_id(2 * pos, snap)
+                snapshots[pos] = snap
+
+        return [snapshots[pos] for pos in positions]
+
+    def _cv_chunks(self, cv_stores, chunk_size):
+        # yield the snapshots of all pairs in a chunk that miss a value, and
+        # which CVs to evaluate for them
+        n_pairs = len(self) // 2
+        for start in range(0, n_pairs, chunk_size):
+            stop = min(start + chunk_size, n_pairs)
+            stored_idxs = self.variables['store'][start:stop]
+            by_pos = collections.defaultdict(list)
+            for cv_num, cv_store in enumerate(cv_stores):
+                for pos, reverse in self._missing_cv_values(cv_store,
+                                                            start, stop):
+                    # only mentioned snapshots have no data to compute from
+                    if stored_idxs[pos - start] >= 0:
+                        by_pos[pos].append((cv_num, reverse))
+            if not by_pos:
+                continue
+
+            positions = sorted(by_pos)
+            snapshots = self._load_pairs(positions, start, stored_idxs)
+            requests = collections.defaultdict(list)
+            for num, pos in enumerate(positions):
+                for key in by_pos[pos]:
+                    requests[key].append(num)
+            yield positions, snapshots, dict(requests)
+
+    def precompute_cvs(self, cvs, n_workers=None, chunk_size=1000):
+        """
+        Compute and store all missing values of CVs, using several processes
+
+        The stored snapshots are read in chunks of `chunk_size`, the
+        snapshots that miss values are sent to a pool of worker processes,
+        and the results are written to the CV stores in order. Only a few
+        chunks per worker are in flight at a time.
+
+        The CVs and engines are sent to the workers as JSON, so this works
+        for all CVs that can be saved. The CVs need a disk cache.
+
+        Parameters
+        ----------
+        cvs : list of :obj:`openpathsampling.CollectiveVariable`
+            the CVs to compute; those without a function are skipped
+        n_workers : int or None
+            number of worker processes. If None, the number of CPUs. With
+            1, everything is computed in this process
+        chunk_size : int
+            number of snapshots (pairs) handled in one task
+
+        Returns
+        -------
+        dict
+            the number of values computed for each CV
+        """
+        cvs = [cv for cv in cvs
+               if cv in self.attribute_list and cv._eval_dict]
+        cv_stores = [self.attribute_list[cv] for cv in cvs]
+        counts = {cv: 0 for cv in cvs}
+
+        if n_workers is None:
+            n_workers = multiprocessing.cpu_count()
+
+        def store_results(positions, requests, results):
+            entries = collections.defaultdict(list)
+            for key, values in results.items():
+                cv_num, reverse = key
+                pos_list = [positions[num] for num in requests[key]]
+                entries[cv_num].extend(
+                    (pos, reverse, value)
+                    for pos, value in zip(pos_list, values)
+                    if value is not None
+                )
+            for cv_num, cv_entries in entries.items():
+                self._set_cv_values(cv_stores[cv_num], cv_entries)
+                counts[cvs[cv_num]] += len(cv_entries)
+
+        chunks = self._cv_chunks(cv_stores, chunk_size)
+
+        if n_workers <= 1:
+            for positions, snapshots, requests in chunks:
+                store_results(positions, requests,
+                              _evaluate_cvs(cvs, snapshots, requests))
+            return counts
+
+        simplifier = ObjectJSON()
+        engine_jsons = {engine.__uuid__: simplifier.to_json(engine)
+                        for engine in self.storage.engines}
+        pool = multiprocessing.Pool(
+            n_workers,
+            initializer=_init_cv_worker,
+            initargs=([simplifier.to_json(cv) for cv in cvs], engine_jsons)
+        )
+        pending = collections.deque()
+        try:
+            for positions, snapshots, requests in chunks:
+                # engines that are not saved go with every chunk using them
+                extra_engines = {}
+                for snap in snapshots:
+                    uuid = snap.engine.__uuid__
+                    if uuid not in engine_jsons:
+                        extra_engines[uuid] = simplifier.to_json(snap.engine)
+                packed = [_pack_snapshot(snap) for snap in snapshots]
+                result = pool.apply_async(_evaluate_cvs_worker,
+                                          (packed, extra_engines, requests))
+                pending.append((positions, requests, result))
+                if len(pending) >= 2 * n_workers:
+                    positions, requests, result = pending.popleft()
+                    store_results(positions, requests, result.get())
+
+            while pending:
+                positions, requests, result = pending.popleft()
+                store_results(positions, requests, result.get())
+        finally:
+            pool.terminate()
+            pool.join()
+
+        return counts
+
     @staticmethod
     def _get_cv_name(cv_idx):
         return 'cv' + str(cv_idx)
@@ -684,7 +1016,7 @@ class SnapshotWrapperStore(ObjectStore):
         self.storage.attributes.vars['cache'][attribute_idx] = store
 
         # use the cache and function of the CV to fill the store when it is made
-        if not allow_incomplete:
+        if not allow_incomplete and not self._defer_cv_fill:
 
             indices = self.vars['uuid'][:]
 
@@ -41,6 +41,15 @@ class TrajectoryStore(ObjectStore):
         trajectory = Trajectory(self.vars['snapshots'][idx])
         return trajectory
 
+    def _load_many(self, n_idxs):
+        trajectories = []
+        for start, stop in self._index_runs(n_idxs):
+            trajectories.extend(
+                Trajectory(snapshots)
+                for snapshots in self.vars['snapshots'][start:stop]
+            )
+        return trajectories
+
     def cache_all(self):
         """Load all samples as fast as possible into the cache
 
@@ -42,8 +42,8 @@ def split_md_storage(filename):
 
     for storage_name in [
         'steps', 'pathmovers', 'topologies', 'networks', 'details',
-        'shootingpointselectors', 'engines', 'volumes', 'samples',
-        'samplesets', 'ensembles', 'transitions', 'movechanges',
+        'shootingpointselectors', 'engines', 'enginepools', 'volumes',
+        'samples', 'samplesets', 'ensembles', 'transitions', 'movechanges',
         'pathsimulators', 'cvs', 'interfacesets', 'msouters'
     ]:
         map(
@@ -82,7 +82,7 @@ def join_md_storage(filename_main, filename_data=None):
     for storage_name in [
         'steps',
         'pathmovers', 'topologies', 'networks', 'details', 'trajectories',
-        'shootingpointselectors', 'engines', 'volumes',
+        'shootingpointselectors', 'engines', 'enginepools', 'volumes',
         'samplesets', 'ensembles', 'transitions', 'movechanges',
         'samples', 'pathsimulators', 'cvs', 'interfacesets', 'msouters'
     ]:
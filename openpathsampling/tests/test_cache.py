@@ -0,0 +1,150 @@
+import os
+
+import numpy as np
+from nose.tools import assert_equal, assert_true, assert_is_none, raises
+
+import openpathsampling as paths
+from openpathsampling.netcdfplus import (
+    CacheStats, LRUCache, WeakLRUCache, MaxCache, NoCache,
+    LRUChunkLoadingCache
+)
+from .test_helpers import data_filename, make_1d_traj
+
+
+def _lookup(cache, key):
+    try:
+        return cache[key]
+    except KeyError:
+        return None
+
+
+class TestCacheStats(object):
+    def test_arithmetic(self):
+        stats = CacheStats(hits=3, misses=1, evictions=2)
+        diff = stats - CacheStats(hits=1)
+        assert_equal(diff, CacheStats(hits=2, misses=1, evictions=2))
+        assert_equal(diff + CacheStats(chunk_loads=1),
+                     CacheStats(2, 1, 2, 1))
+        assert_equal(stats.lookups, 4)
+        assert_equal(stats.hit_rate, 0.75)
+        assert_equal(CacheStats().hit_rate, 0.0)
+        stats.reset()
+        assert_equal(stats, CacheStats())
+
+    def test_copy(self):
+        stats = CacheStats(hits=1)
+        copy = stats.copy()
+        stats.hits += 1
+        assert_equal(copy.hits, 1)
+
+
+class TestCacheCounting(object):
+    def _check_lru(self, cache, expected):
+        assert_is_none(cache.stats)
+        cache[0] = paths.Details()  # not counted
+        assert_is_none(cache.stats)
+        cache.enable_stats()
+        objs = [paths.Details() for _ in range(3)]
+        for i, obj in enumerate(objs):
+            cache[i] = obj
+        _lookup(cache, 2)
+        _lookup(cache, 0)
+        _lookup(cache, 10)
+        assert_equal(cache.stats, expected)
+        cache.disable_stats()
+        assert_is_none(cache.stats)
+
+    def test_lru(self):
+        self._check_lru(LRUCache(2),
+                        CacheStats(hits=1, misses=2, evictions=1))
+
+    def test_weak_lru(self):
+        # object 0 is still alive, so it is found in the weak references
+        self._check_lru(WeakLRUCache(2),
+                        CacheStats(hits=2, misses=1, evictions=2))
+
+    def test_weak_lru_weak_hit(self):
+        cache = WeakLRUCache(1)
+        stats = cache.enable_stats()
+        objs = [paths.Details() for _ in range(2)]
+        cache[0] = objs[0]
+        cache[1] = objs[1]
+        # object 0 was evicted to the weak references, but is still alive
+        assert_true(_lookup(cache, 0) is objs[0])
+        assert_equal(stats, CacheStats(hits=1, evictions=2))
+
+    def test_max_cache(self):
+        cache = MaxCache()
+        cache[0] = 'a'
+        assert_equal(cache[0], 'a')
+        cache.enable_stats()
+        _lookup(cache, 0)
+        _lookup(cache, 1)
+        assert_equal(cache.stats, CacheStats(hits=1, misses=1))
+
+    def test_no_cache(self):
+        cache = NoCache()
+        cache.enable_stats()
+        _lookup(cache, 0)
+        assert_equal(cache.stats, CacheStats(misses=1))
+
+    def test_chunk_loading(self):
+        cache = LRUChunkLoadingCache(chunksize=2, max_chunks=1,
+                                     variable=np.arange(5))
+        cache.enable_stats()
+        assert_equal(cache[0], 0)  # loads chunk 0
+        assert_equal(cache[1], 1)
+        assert_equal(cache[3], 3)  # loads chunk 1, evicts chunk 0
+        assert_equal(cache.stats, CacheStats(hits=1, misses=2, evictions=1,
+                                             chunk_loads=2))
+
+
+class TestStorageCacheStats(object):
+    def setup(self):
+        self.filename = data_filename("cache_stats_test.nc")
+        self.storage = paths.Storage(self.filename, mode='w')
+        self.traj = make_1d_traj([0.1, 0.2, 0.3])
+        self.storage.save(self.traj)
+
+    def teardown(self):
+        self.storage.close()
+        if os.path.isfile(self.filename):
+            os.remove(self.filename)
+
+    def test_enable_disable(self):
+        self.storage.enable_cache_stats(['trajectories'])
+        assert_equal(list(self.storage.cache_stats().keys()),
+                     ['trajectories'])
+        self.storage.trajectories[0]
+        assert_equal(self.storage.cache_stats()['trajectories'].hits, 1)
+        self.storage.disable_cache_stats()
+        assert_equal(self.storage.cache_stats(), {})
+
+    def test_keep_stats_on_new_caching(self):
+        self.storage.enable_cache_stats(['trajectories'])
+        self.storage.trajectories[0]
+        self.storage.set_caching_mode('production')
+        stats = self.storage.cache_stats()['trajectories']
+        # the transfer to the new cache is not counted
+        assert_equal(stats.hits, 1)
+
+    def test_record_cache_stats(self):
+        with self.storage.record_cache_stats() as stats:
+            self.storage.trajectories[0]
+            self.storage.trajectories[0]
+        assert_equal(stats['trajectories'].hits, 2)
+        assert_equal(stats['samples'], CacheStats())
+        # switched off again after the block
+        assert_equal(self.storage.cache_stats(), {})
+
+    def test_record_cache_stats_enabled(self):
+        self.storage.enable_cache_stats(['trajectories'])
+        self.storage.trajectories[0]
+        with self.storage.record_cache_stats(['trajectories']) as stats:
+            self.storage.trajectories[0]
+        assert_equal(stats['trajectories'].hits, 1)
+        assert_equal(self.storage.cache_stats()['trajectories'].hits, 2)
+
+    @raises(KeyError)
+    def test_unknown_store(self):
+        self.storage.enable_cache_stats(['not_a_store'])
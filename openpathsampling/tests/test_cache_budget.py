@@ -0,0 +1,117 @@
+import os
+
+from nose.tools import assert_equal, assert_true, raises
+
+import openpathsampling as paths
+from openpathsampling.storage.cache_budget import (
+    BudgetCache, CacheBudget, OBJECT_OVERHEAD
+)
+from .test_helpers import data_filename, make_1d_traj
+
+
+class TestBudgetCache(object):
+    def setup(self):
+        self.cache = BudgetCache(2)
+
+    def test_hits_misses(self):
+        self.cache[1] = 'a'
+        assert_equal(self.cache[1], 'a')
+        try:
+            self.cache[2]
+        except KeyError:
+            pass
+        assert_equal((self.cache.stats.hits, self.cache.stats.misses),
+                     (1, 1))
+
+    def test_shrink(self):
+        objs = [paths.Details(i=i) for i in range(4)]
+        for i, obj in enumerate(objs):
+            self.cache[i] = obj
+        self.cache.size_limit = 4
+        self.cache[4] = paths.Details(i=4)
+        self.cache.size_limit = 1
+        assert_equal(self.cache.count[0], 1)
+        assert_true(4 in self.cache)
+
+
+class TestCacheBudget(object):
+    def setup(self):
+        self.filename = data_filename("cache_budget_test.nc")
+        self.storage = paths.Storage(self.filename, mode='w')
+        self.traj = make_1d_traj([0.1 * i for i in range(10)])
+        self.storage.save(self.traj)
+
+    def teardown(self):
+        self.storage.close()
+        if os.path.isfile(self.filename):
+            os.remove(self.filename)
+
+    def test_object_size(self):
+        budget = CacheBudget(self.storage, 10**6)
+        # toy snapshots: float32 coordinates and velocities of 1 x 3
+        snapshot_size = budget.object_size('snapshots')
+        assert_true(snapshot_size >= OBJECT_OVERHEAD + 2 * 3 * 4)
+        budget.object_sizes['snapshots'] = 5
+        assert_equal(budget.object_size('snapshots'), 5)
+
+    def test_install(self):
+        budget = self.storage.set_cache_budget(10**6, min_size=5)
+        assert_true(self.storage.cache_budget is budget)
+        for name in CacheBudget.default_stores:
+            store = getattr(self.storage, name)
+            assert_true(store.cache is budget.caches[name])
+            assert_equal(store.cache.size_limit, budget.sizes[name])
+        # initially the budget is split equally
+        total = sum(budget.sizes[name] * budget.object_size(name)
+                    for name in budget.stores)
+        assert_true(total <= 10**6)
+        assert_true(total > 0.9 * 10**6)
+
+    def test_rebalance(self):
+        budget = self.storage.set_cache_budget(
+            10**6, stores=['snapshots', 'samples'], rebalance_interval=0
+        )
+        before = dict(budget.sizes)
+        # only the snapshot cache is used, and it misses
+        for _ in range(100):
+            try:
+                budget.caches['snapshots'][-1]
+            except KeyError:
+                pass
+        budget.rebalance()
+        assert_true(budget.sizes['snapshots'] > before['snapshots'])
+        assert_true(budget.sizes['samples'] < before['samples'])
+
+    def test_rebalance_unused_share(self):
+        budget = self.storage.set_cache_budget(
+            10**6, stores=['snapshots', 'samples'], rebalance_interval=0,
+            decay=0.0
+        )
+        # samples are found in the cache and the cache is nearly empty, so
+        # the budget goes to the snapshots
+        samples_cache = budget.caches['samples']
+        sample = paths.Sample(replica=0, trajectory=self.traj,
+                              ensemble=paths.EmptyEnsemble())
+        samples_cache[0] = sample
+        for _ in range(100):
+            _ = samples_cache[0]
+        sizes = budget.rebalance()
+        object_size = budget.object_size('samples')
+        assert_equal(sizes['samples'], budget.min_size)
+        assert_true(sizes['snapshots'] * budget.object_size('snapshots')
+                    > 0.9 * 10**6 - 2 * object_size)
+
+    def test_rebalance_interval(self):
+        budget = self.storage.set_cache_budget(10**6, rebalance_interval=3)
+        cache = budget.caches['steps']
+        cache[0] = paths.Details()
+        _ = cache[0]
+        _ = cache[0]
+        assert_equal(budget.recent_stats('steps').hits, 2)
+        _ = cache[0]
+        assert_equal(budget.recent_stats('steps').hits, 0)
+        assert_equal(cache.stats.hits, 3)
+
+    @raises(ValueError)
+    def test_bad_budget(self):
+        CacheBudget(self.storage, 0)
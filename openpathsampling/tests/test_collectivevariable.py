@@ -372,3 +372,41 @@ class TestFunctionCV(object):
 
             if os.path.isfile(fname):
                 os.remove(fname)
+
+
+class TestCoordinateArrayFunctionCV(object):
+    def setup(self):
+        self.traj = make_1d_traj([0.5, 1.5, 2.5, 3.5])
+        self.calls = []
+
+        def x_of_atom(xyz, atom):
+            self.calls.append(xyz.shape)
+            return xyz[:, atom, 0]
+
+        self.cv = paths.CoordinateArrayFunctionCV("x", x_of_atom, atom=0)
+
+    def test_single_call_for_trajectory(self):
+        values = self.cv(self.traj)
+        np.testing.assert_allclose(values, [0.5, 1.5, 2.5, 3.5])
+        assert self.calls == [(4, 1, 3)]
+
+    def test_single_snapshot(self):
+        assert self.cv(self.traj[2]) == 2.5
+        assert self.calls == [(1, 1, 3)]
+
+    def test_values_cached_per_snapshot(self):
+        _ = self.cv(self.traj[1:3])
+        assert self.calls == [(2, 1, 3)]
+        values = self.cv(self.traj)
+        np.testing.assert_allclose(values, [0.5, 1.5, 2.5, 3.5])
+        # only the two frames that were not yet cached are evaluated
+        assert self.calls == [(2, 1, 3), (2, 1, 3)]
+        # reversed snapshots share the cached value
+        assert self.cv(self.traj[3].reversed) == 3.5
+        assert len(self.calls) == 2
+
+    def test_to_dict(self):
+        dct = self.cv.to_dict()
+        assert set(dct.keys()) == {'name', 'f', 'kwargs',
+                                   'cv_scalarize_numpy_singletons'}
+        assert dct['kwargs'] == {'atom': 0}
@@ -0,0 +1,134 @@
+import threading
+import time
+
+from nose.tools import (assert_equal, assert_true, assert_false, raises)
+
+import openpathsampling as paths
+from openpathsampling.engines.engine_pool import DeferredCondition, EnginePool
+
+
+def stop_at(n_frames):
+    calls = []
+
+    def condition(trajectory, trusted=False):
+        calls.append((len(trajectory), trusted))
+        return len(trajectory) < n_frames
+    condition.calls = calls
+    return condition
+
+
+class TestDeferredCondition(object):
+    def test_resolved_before_start(self):
+        condition = stop_at(3)
+        deferred = DeferredCondition(condition=condition)
+        assert_true(deferred(list(range(1)), trusted=False))
+        assert_true(deferred(list(range(2)), trusted=True))
+        assert_false(deferred(list(range(3)), trusted=True))
+        assert_equal(condition.calls, [(1, False), (2, True), (3, True)])
+        assert_equal(deferred.stop_length, None)
+
+    def test_replay(self):
+        condition = stop_at(3)
+        deferred = DeferredCondition()
+        for length in range(1, 6):
+            assert_true(deferred(list(range(length)), trusted=length > 1))
+        deferred.resolve(condition)
+        assert_false(deferred(list(range(6)), trusted=True))
+        assert_equal(deferred.stop_length, 3)
+        assert_equal(condition.calls, [(1, False), (2, True), (3, True)])
+
+    def test_replay_without_stop(self):
+        condition = stop_at(10)
+        deferred = DeferredCondition()
+        for length in range(1, 4):
+            assert_true(deferred(list(range(length)), trusted=length > 1))
+        deferred.resolve(condition)
+        assert_true(deferred(list(range(4)), trusted=True))
+        assert_equal(deferred.stop_length, None)
+        # all lengths were checked once, in order
+        assert_equal([c[0] for c in condition.calls], [1, 2, 3, 4])
+        assert_true(deferred(list(range(5)), trusted=True))
+        assert_equal(len(condition.calls), 5)
+
+    def test_replay_after_error(self):
+        deferred = DeferredCondition()
+        for length in range(1, 5):
+            deferred(list(range(length)))
+        deferred.resolve(stop_at(2))
+        assert_equal(deferred.replay(list(range(4))), 2)
+
+    def test_max_length_blocks(self):
+        deferred = DeferredCondition(max_length=3)
+        results = []
+
+        def run():
+            for length in range(1, 10):
+                result = deferred(list(range(length)), trusted=length > 1)
+                results.append(result)
+                if not result:
+                    break
+
+        thread = threading.Thread(target=run)
+        thread.start()
+        time.sleep(0.05)
+        assert_equal(results, [True, True])
+        deferred.resolve(stop_at(5))
+        thread.join()
+        assert_equal(results, [True, True, True, True, False])
+        assert_equal(deferred.stop_length, None)
+
+    def test_abort(self):
+        deferred = DeferredCondition()
+        assert_true(deferred([0]))
+        deferred.abort()
+        assert_true(deferred.aborted)
+        assert_false(deferred([0, 1]))
+
+
+class _CopyableEngine(paths.netcdfplus.StorableNamedObject):
+    """Minimal engine for the pool: trajectories are lists of ints"""
+    def __init__(self):
+        super(_CopyableEngine, self).__init__()
+        self.n_copies = 0
+
+    def concurrent_copy(self):
+        self.n_copies += 1
+        return _EngineCopy(self)
+
+
+class _EngineCopy(object):
+    def __init__(self, engine):
+        self.__uuid__ = engine.__uuid__
+
+    def generate(self, initial, running=None, direction=+1):
+        trajectory = [initial]
+        while all(cond(trajectory, len(trajectory) > 1) for cond in running):
+            if len(trajectory) > 100:
+                raise RuntimeError("Too long")
+            trajectory.append(trajectory[-1] + direction)
+        return trajectory
+
+
+class TestEnginePool(object):
+    def setup(self):
+        self.engine = _CopyableEngine()
+        self.pool = EnginePool(max_workers=2)
+
+    def test_supports(self):
+        assert_true(EnginePool.supports(self.engine))
+        assert_false(EnginePool.supports(paths.engines.NoEngine(None)))
+
+    def test_submit(self):
+        task_1 = self.pool.submit(self.engine, 0, [stop_at(3)])
+        task_2 = self.pool.submit(self.engine, 10, [stop_at(2)], -1)
+        assert_equal(task_1.result(), [0, 1, 2])
+        assert_equal(task_2.result(), [10, 9])
+        # later runs reuse the copies
+        task_3 = self.pool.submit(self.engine, 0, [stop_at(2)])
+        assert_equal(task_3.result(), [0, 1])
+        assert_true(self.engine.n_copies <= 2)
+
+    @raises(RuntimeError)
+    def test_submit_error(self):
+        task = self.pool.submit(self.engine, 0, [stop_at(1000)])
+        task.result()
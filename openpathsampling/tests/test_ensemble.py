@@ -1470,6 +1470,80 @@ class TestSequentialEnsembleCache(EnsembleCacheTest):
         assert_equal(cache.contents['ens_from'], 4)
         assert_equal(cache.contents['subtraj_from'], -5)
 
+    def _count_calls(self, ens, method_name):
+        method = getattr(ens, method_name)
+        calls = []
+        def counted(*args, **kwargs):
+            calls.append(args)
+            return method(*args, **kwargs)
+        setattr(ens, method_name, counted)
+        return calls
+
+    def test_incremental_can_append(self):
+        ens = SequentialEnsemble([self.inX & self.length1, self.outX,
+                                  self.inX & self.length1])
+        calls = self._count_calls(ens, '_find_subtraj_final')
+        full = make_1d_traj([0.3, 0.6, 0.7, 0.8, 0.9, 0.3])
+        traj = paths.Trajectory([])
+        for snap in full[:2]:
+            traj.append(snap)
+            assert_equal(ens.can_append(traj, trusted=True), True)
+        n_calls = len(calls)
+        # frames that stay in the outX ensemble only test the new frame
+        for snap in full[2:5]:
+            traj.append(snap)
+            assert_equal(ens.can_append(traj, trusted=True), True)
+            open_subtraj = ens._cache_can_append.contents['open_subtraj']
+            assert_equal(open_subtraj['ens_num'], 1)
+            assert_equal(open_subtraj['subtraj'], list(traj[1:]))
+        assert_equal(len(calls), n_calls)
+        # the last frame leaves outX: full recompute
+        traj.append(full[5])
+        assert_equal(ens.can_append(traj, trusted=True), False)
+        assert_true(len(calls) > n_calls)
+        assert_true('open_subtraj' not in ens._cache_can_append.contents)
+
+    def test_incremental_can_append_untrusted_change(self):
+        def make_ens():
+            return SequentialEnsemble([self.inX & self.length1, self.outX,
+                                       self.inX & self.length1])
+        ens = make_ens()
+        traj = make_1d_traj([0.3, 0.6, 0.7])
+        trajectories = [
+            traj[:2],
+            traj,
+            # one frame longer, but a different first frame: must reset
+            make_1d_traj([0.6, 0.7, 0.8, 0.9]),
+            # replaced last frame (same length) is not an extension
+            paths.Trajectory(list(traj[:2]) + make_1d_traj([0.3])),
+            traj + make_1d_traj([0.3])
+        ]
+        for trajectory in trajectories:
+            # fresh ensemble has no cache: compare to full calculation
+            assert_equal(ens.can_append(trajectory),
+                         make_ens().can_append(trajectory))
+
+    def test_incremental_can_prepend(self):
+        ens = SequentialEnsemble([self.inX & self.length1, self.outX,
+                                  self.inX & self.length1])
+        calls = self._count_calls(ens, '_find_subtraj_first')
+        full = make_1d_traj([0.3, 0.9, 0.8, 0.7, 0.6, 0.3])
+        traj = paths.Trajectory([])
+        for snap in reversed(full[4:]):
+            traj.insert(0, snap)
+            assert_equal(ens.can_prepend(traj, trusted=True), True)
+        n_calls = len(calls)
+        for snap in reversed(full[1:4]):
+            traj.insert(0, snap)
+            assert_equal(ens.can_prepend(traj, trusted=True), True)
+            open_subtraj = ens._cache_can_prepend.contents['open_subtraj']
+            assert_equal(open_subtraj['ens_num'], 1)
+            assert_equal(open_subtraj['subtraj'], list(traj[:-1]))
+        assert_equal(len(calls), n_calls)
+        traj.insert(0, full[0])
+        assert_equal(ens.can_prepend(traj, trusted=True), False)
+        assert_true(len(calls) > n_calls)
+
 
 
 
@@ -17,6 +17,9 @@ import shlex
 import time
 import os
 import glob
+import shutil
+import tempfile
+import threading
 import linecache
 
 import logging
@@ -190,6 +193,31 @@ class TestExternalEngine(object):
                                          [self.ensemble.can_append])
         assert_equal(len(traj), 5)
 
+    def test_slow_run_polling(self):
+        options = dict(self.slow_engine.options,
+                       frame_notifier=peng.FrameNotifier())
+        eng = ExampleExternalEngine(options, self.descriptor, self.template)
+        eng.initialized = True
+        traj = eng.generate(self.template, [self.ensemble.can_append])
+        assert_equal(len(traj), 5)
+        assert_equal(eng._frame_watch, None)
+
+    def test_default_frame_notifier(self):
+        eng = self.slow_engine
+        assert_equal(eng.options['frame_notifier'], None)
+        eng.start(self.template)
+        try:
+            assert_equal(eng._frame_watch.event_driven,
+                         peng.InotifyFrameNotifier.is_available())
+            # with events, the sleep time isn't optimized
+            _ = eng.generate_next_frame()
+            _ = eng.generate_next_frame()
+            if eng._frame_watch.event_driven:
+                assert_equal(eng.sleep_ms, eng.default_sleep_ms)
+        finally:
+            eng.stop(None)
+        assert_equal(eng._frame_watch, None)
+
     def test_in_shooting_move(self):
         for testfile in glob.glob("test*out") + glob.glob("test*inp"):
             os.remove(testfile)
@@ -222,6 +250,110 @@ class TestExternalEngine(object):
         for testfile in glob.glob("test*out") + glob.glob("test*inp"):
             os.remove(testfile)
 
+    def test_concurrent_copy(self):
+        engine_copy = self.fast_engine.concurrent_copy()
+        assert_equal(engine_copy.__uuid__, self.fast_engine.__uuid__)
+        assert_true(engine_copy.interrupter is
+                    peng.delayedinterrupt.EmptyContext)
+        assert_equal(engine_copy.options, self.fast_engine.options)
+        traj = engine_copy.generate(self.template,
+                                    [self.ensemble.can_append])
+        assert_equal(len(traj), 5)
+        assert_equal(self.fast_engine._frame_watch, None)
+
+    def test_in_two_way_shooting_concurrent(self):
+        options = dict(self.fast_engine.options)
+        options['filename_setter'] = RandomStringFilenames()
+        engine = ExampleExternalEngine(options, self.descriptor,
+                                       self.template)
+        x = paths.FunctionCV("x", lambda snap: snap.xyz[0][0])
+        state_A = paths.CVDefinedVolume(x, float("-inf"), 0.5)
+        state_B = paths.CVDefinedVolume(x, 8.5, float("inf"))
+        ensemble = paths.SequentialEnsemble([
+            paths.AllInXEnsemble(state_A) & paths.LengthEnsemble(1),
+            paths.AllOutXEnsemble(state_A | state_B),
+            paths.AllInXEnsemble(state_B) & paths.LengthEnsemble(1)
+        ])
+        not_in_B = paths.AllOutXEnsemble(state_B)
+        init_traj = engine.generate(self.template, [not_in_B.can_append])
+        assert_equal(ensemble(init_traj), True)
+        pool = peng.EnginePool(max_workers=2)
+        for cls in [paths.ForwardFirstTwoWayShootingMover,
+                    paths.BackwardFirstTwoWayShootingMover]:
+            serial_mover, concurrent_mover = [
+                cls(ensemble=ensemble, selector=paths.UniformSelector(),
+                    modifier=paths.NoModification(), engine=engine,
+                    engine_pool=engine_pool)
+                for engine_pool in [None, pool]
+            ]
+            for shooting_index in [1, 5, 8]:
+                serial, _ = serial_mover._run(init_traj, shooting_index)
+                concurrent, _ = concurrent_mover._run(init_traj,
+                                                      shooting_index)
+                # the half that runs concurrently overshoots, but it
+                # must be cut where the serial run stopped
+                assert_items_equal(concurrent.xyz, serial.xyz)
+                assert_equal(ensemble(concurrent), True)
+        # copies of the engine are reused by the pool
+        assert_equal(len(pool._idle[engine.__uuid__]), 1)
+
+
+class TestFrameNotifier(object):
+    def setup(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.filename = os.path.join(self.tmpdir, "frames.out")
+
+    def teardown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def _write_later(self, filename, delay=0.05):
+        def write():
+            time.sleep(delay)
+            with open(filename, 'a') as f:
+                f.write("1.0 1.0\n")
+        thread = threading.Thread(target=write)
+        thread.start()
+        return thread
+
+    def test_sleep_watch(self):
+        watch = peng.FrameNotifier().watch(self.filename)
+        assert_equal(watch.event_driven, False)
+        start = time.time()
+        assert_equal(watch.wait(0.05), False)
+        assert_true(time.time() - start >= 0.05)
+        watch.close()
+
+    def test_inotify_watch(self):
+        if not peng.InotifyFrameNotifier.is_available():
+            raise SkipTest("inotify not available")
+        watch = peng.InotifyFrameNotifier().watch(self.filename)
+        assert_equal(watch.event_driven, True)
+        try:
+            # nothing happens: timeout
+            assert_equal(watch.wait(0.01), False)
+            # file is created and written to while we wait
+            thread = self._write_later(self.filename)
+            start = time.time()
+            assert_equal(watch.wait(10.0), True)
+            assert_true(time.time() - start < 5.0)
+            thread.join()
+            # drain events from the same write; then other files are ignored
+            while watch.wait(0.05):
+                pass
+            thread = self._write_later(os.path.join(self.tmpdir, "other"))
+            assert_equal(watch.wait(0.2), False)
+            thread.join()
+        finally:
+            watch.close()
+
+    def test_inotify_missing_directory(self):
+        # can't watch; falls back to sleeping
+        missing = os.path.join(self.tmpdir, "missing", "frames.out")
+        watch = peng.InotifyFrameNotifier().watch(missing)
+        assert_equal(watch.event_driven, False)
+        watch.close()
+
+
 class TestFilenameSetter(object):
     def test_default_setter(self):
         setter = FilenameSetter()
@@ -233,6 +365,22 @@ class TestFilenameSetter(object):
         assert setter() == 100
         assert setter() == 101
 
+    def test_setter_in_threads(self):
+        # concurrent engine copies share the setter
+        setter = FilenameSetter()
+        results = []
+
+        def use_setter():
+            results.extend(setter() for _ in range(1000))
+
+        threads = [threading.Thread(target=use_setter) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert sorted(results) == list(range(4000))
+        assert setter() == 4000
+
 
 class TestRandomStringFilenames(object):
     def test_default_setter(self):
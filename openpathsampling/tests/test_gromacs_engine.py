@@ -18,6 +18,7 @@ else:
 
 
 from openpathsampling.engines.gromacs import *
+from openpathsampling.engines.external_engine import RandomStringFilenames
 
 import logging
 import numpy as np
@@ -201,6 +202,27 @@ class TestGromacsEngine(object):
                 os.path.join(self.test_dir, "proj_edr/foo.edr")
         assert test_engine.log_file == \
                 os.path.join(self.test_dir, "proj_log/foo.log")
+        assert test_engine.tpr_file == "foo_topol.tpr"
+        assert test_engine.mdout_file == "foo_mdout.mdp"
+
+    @raises(RuntimeError)
+    def test_concurrent_copy_int_filenames(self):
+        # integer filenames share the input and tpr files
+        self.engine.concurrent_copy()
+
+    def test_concurrent_copy(self):
+        engine = Engine(gro="conf.gro", mdp="md.mdp", top="topol.top",
+                        base_dir=self.test_dir,
+                        options={'filename_setter': RandomStringFilenames()},
+                        prefix="proj")
+        _ = engine.read_frame_data(
+            os.path.join(self.test_dir, "project_trr", "0000000.trr"), 0
+        )
+        engine_copy = engine.concurrent_copy()
+        assert_equal(engine_copy.__uuid__, engine.__uuid__)
+        assert_equal(engine_copy._file, None)
+        assert_true(engine._file is not None)
+        engine.close_frame_reader()
 
     def test_engine_command(self):
         test_engine = Engine(gro="conf.gro", mdp="md.mdp", top="topol.top",
@@ -261,9 +283,21 @@ class TestGromacsEngine(object):
     def test_open_file_caching(self):
         # read several frames from one file, then switch to another file
         # first read from 0000000, then 0000099
-        # TODO: what was I trying to test here? that I can switch between
-        # files?
-        pytest.skip()
+        fname0 = os.path.join(self.test_dir, "project_trr", "0000000.trr")
+        fname99 = os.path.join(self.test_dir, "project_trr", "0000099.trr")
+        for frame_num in range(4):
+            _ = self.engine.read_frame_data(fname0, frame_num)
+        reader = self.engine._file
+        assert_equal(reader.filename, fname0)
+        assert_equal(len(reader.offsets), 4)
+        _ = self.engine.read_frame_data(fname0, 1)
+        assert_true(self.engine._file is reader)
+
+        _ = self.engine.read_frame_data(fname99, 10)
+        assert_true(reader.closed)
+        assert_equal(self.engine._file.filename, fname99)
+        self.engine.close_frame_reader()
+        assert_equal(self.engine._file, None)
 
     def test_serialization_cycle(self):
         serialized = self.engine.to_dict()
@@ -272,6 +306,141 @@ class TestGromacsEngine(object):
         assert serialized == reserialized
 
 
+class TestTRRFrameReader(object):
+    def setup(self):
+        if not HAS_MDTRAJ:
+            pytest.skip("MDTraj not installed.")
+        test_dir = data_filename("gromacs_engine")
+        source = os.path.join(test_dir, "project_trr", "0000000.trr")
+        with open(source, 'rb') as f:
+            self.contents = f.read()
+        self.frame_size = len(self.contents) // 4
+        trr = md.formats.TRRTrajectoryFile(source)
+        self.expected = trr._read(n_frames=4, atom_indices=None,
+                                  get_velocities=True)
+        trr.close()
+        self.tmpdir = tempfile.mkdtemp()
+        self.filename = os.path.join(self.tmpdir, "growing.trr")
+
+    def teardown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def _write(self, n_bytes, mode='wb'):
+        with open(self.filename, mode) as f:
+            f.write(self.contents[:n_bytes])
+
+    def _check_frame(self, reader, frame_num):
+        xyz, vel, box = reader.read_frame(frame_num)
+        npt.assert_array_equal(xyz, self.expected[0][frame_num])
+        npt.assert_array_equal(vel, self.expected[5][frame_num])
+        npt.assert_array_equal(box, self.expected[3][frame_num])
+
+    def test_growing_file(self):
+        from openpathsampling.engines.gromacs.trr_reader import (
+            TRRFrameReader, PartialFrameError
+        )
+        self._write(0)
+        reader = TRRFrameReader(self.filename)
+        with pytest.raises(IndexError):
+            reader.read_frame(0)
+        # partial header, then partial data
+        for n_bytes in [8, 40, self.frame_size - 1]:
+            self._write(n_bytes)
+            with pytest.raises(PartialFrameError):
+                reader.read_frame(0)
+        self._write(self.frame_size)
+        self._check_frame(reader, 0)
+        with pytest.raises(IndexError):
+            reader.read_frame(1)
+        self._write(3 * self.frame_size + 10)
+        self._check_frame(reader, 2)
+        self._check_frame(reader, 1)
+        with pytest.raises(PartialFrameError):
+            reader.read_frame(3)
+        assert_equal(len(reader), 3)
+        reader.close()
+        assert_true(reader.closed)
+
+    def test_truncated_and_replaced_file(self):
+        from openpathsampling.engines.gromacs.trr_reader import \
+                TRRFrameReader
+        self._write(4 * self.frame_size)
+        reader = TRRFrameReader(self.filename)
+        assert_equal(len(reader), 4)
+        # truncated
+        self._write(2 * self.frame_size)
+        assert_equal(len(reader), 2)
+        # replaced by a new file with the same name
+        os.remove(self.filename)
+        self._write(3 * self.frame_size)
+        self._check_frame(reader, 2)
+        assert_equal(len(reader), 3)
+        reader.close()
+
+
+def _trr_frame(natoms, box=None, xyz=None, real='>f4'):
+    # a TRR frame as written by GROMACS; blocks that are None are omitted
+    import struct
+    real_size = np.dtype(real).itemsize
+    box_size = 9 * real_size if box is not None else 0
+    x_size = 3 * natoms * real_size if xyz is not None else 0
+    header = struct.pack(">3i", 1993, 13, 12) + b"GMX_trn_file"
+    header += struct.pack(">13i", 0, 0, box_size, 0, 0, 0, 0, x_size, 0,
+                          0, natoms, 0, 0)
+    data = np.array([0.5, 0.0], dtype=real).tobytes()
+    for block in (box, xyz):
+        if block is not None:
+            data += np.asarray(block, dtype=real).tobytes()
+    return header + data
+
+
+class TestTRRFrameHeader(object):
+    def setup(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.filename = os.path.join(self.tmpdir, "frames.trr")
+
+    def teardown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def _reader(self, contents):
+        from openpathsampling.engines.gromacs.trr_reader import \
+                TRRFrameReader
+        with open(self.filename, 'wb') as f:
+            f.write(contents)
+        return TRRFrameReader(self.filename)
+
+    def test_box_only_frame(self):
+        box = np.diag([1.0, 2.0, 3.0])
+        for real in ['>f4', '>f8']:
+            frame = _trr_frame(2, box=box, real=real)
+            reader = self._reader(frame + frame)
+            assert_equal(len(reader), 2)
+            xyz, vel, box_out = reader.read_frame(1)
+            npt.assert_array_equal(box_out, box)
+            npt.assert_array_equal(xyz, np.zeros((2, 3)))
+            reader.close()
+
+    def test_zero_atom_frame(self):
+        for real in ['>f4', '>f8']:
+            frames = [_trr_frame(0, real=real),
+                      _trr_frame(0, box=np.eye(3), real=real),
+                      _trr_frame(0, real=real)]
+            contents = b"".join(frames)
+            reader = self._reader(contents)
+            assert_equal(len(reader), 3)
+            assert_equal(reader.offsets,
+                         [0, len(frames[0]), len(frames[0] + frames[1])])
+            xyz, vel, box = reader.read_frame(1)
+            assert_equal(xyz.shape, (0, 3))
+            npt.assert_array_equal(box, np.eye(3))
+            reader.close()
+
+            # a single frame without any data that is still being written
+            reader = self._reader(contents[:len(frames[0]) - 1])
+            assert_equal(len(reader), 0)
+            reader.close()
+
+
 class TestGromacsExternalMDSnapshot(object):
     def setup(self):
         if not HAS_MDTRAJ:
@@ -0,0 +1,121 @@
+import os
+from uuid import UUID
+
+from nose.tools import (assert_equal, assert_true, assert_false,
+                        assert_is_none)
+
+import openpathsampling as paths
+from openpathsampling.netcdfplus.stores.object import (
+    UUIDIndex, uuid_strings_to_keys, uuid_to_key, key_to_uuid
+)
+from .test_helpers import data_filename, make_1d_traj
+
+
+class TestUUIDIndex(object):
+    def setup(self):
+        # UUIDs with trailing zero bytes are a special case for numpy
+        self.uuids = [0x100, 0x3d3707fecb3f11f1b3e8000000000300, 0x302,
+                      0xffff0000000000000000000000000000, 0x205]
+        self.strings = [str(UUID(int=uuid)) for uuid in self.uuids]
+        self.index = UUIDIndex()
+        assert_true(self.index.extend_uuid_strings(self.strings))
+
+    def test_keys(self):
+        keys = uuid_strings_to_keys(self.strings)
+        assert_equal([key_to_uuid(key) for key in keys], self.uuids)
+        assert_equal(uuid_to_key(self.uuids[1]), keys[1].ljust(16, b'\0'))
+        assert_is_none(uuid_strings_to_keys(['not-a-uuid']))
+        assert_is_none(uuid_strings_to_keys([self.strings[0][:-1] + 'x']))
+
+    def test_lookup(self):
+        assert_equal(len(self.index), 5)
+        for pos, uuid in enumerate(self.uuids):
+            assert_true(uuid in self.index)
+            assert_equal(self.index[uuid], pos)
+            assert_equal(self.index.index(pos), uuid)
+        assert_false(0x102 in self.index)
+        assert_is_none(self.index.get(0x102))
+        assert_equal(self.index.get_many([0x302, 0x102, 0x100]),
+                     [2, None, 0])
+        assert_equal(self.index.list, self.uuids)
+
+    def test_append_mark(self):
+        self.index.append(0x500)
+        assert_equal(self.index[0x500], 5)
+        assert_equal(self.index.index(5), 0x500)
+        self.index.mark(0x700)
+        self.index.mark(0x100)  # already stored
+        assert_equal(len(self.index), 7)
+        assert_equal(self.index[0x100], 0)
+        self.index.unmark(0x700)
+        self.index.unmark(0x100)  # stored objects are not forgotten
+        assert_equal(len(self.index), 6)
+        assert_equal(self.index[0x100], 0)
+        assert_equal(sorted(self.index.keys()), sorted(self.uuids + [0x500]))
+        assert_equal(dict(self.index.items())[0x500], 5)
+
+    def test_not_empty(self):
+        assert_false(self.index.extend_uuid_strings(self.strings))
+        self.index.clear()
+        assert_equal(len(self.index), 0)
+        assert_false(self.uuids[0] in self.index)
+        assert_true(self.index.extend_uuid_strings(self.strings))
+
+
+class TestLoadMany(object):
+    def setup(self):
+        self.filename = data_filename("load_many_test.nc")
+        storage = paths.Storage(self.filename, mode='w')
+        self.trajs = [make_1d_traj([0.1 * i, 0.2]) for i in range(6)]
+        self.details = [paths.Details(n=i) for i in range(6)]
+        ensemble = paths.LengthEnsemble(2).named('length 2')
+        self.samples = [paths.Sample(replica=i, trajectory=traj,
+                                     ensemble=ensemble)
+                        for i, traj in enumerate(self.trajs)]
+        for sample, details in zip(self.samples, self.details):
+            storage.save(sample)
+            storage.save(details)
+        storage.close()
+        self.storage = paths.Storage(self.filename, mode='r')
+
+    def teardown(self):
+        self.storage.close()
+        if os.path.isfile(self.filename):
+            os.remove(self.filename)
+
+    def test_index_runs(self):
+        runs = paths.netcdfplus.ObjectStore._index_runs([0, 1, 2, 5, 7, 8])
+        assert_equal(runs, [(0, 3), (5, 6), (7, 9)])
+
+    def test_load_many_json(self):
+        store = self.storage.details
+        assert_true(isinstance(store.index, UUIDIndex))
+        loaded = store.load_many([4, 0, 1, 4])
+        assert_equal([d.n for d in loaded], [4, 0, 1, 4])
+        assert_true(loaded[0] is loaded[3])
+        assert_true(loaded[1] is store.load(0))
+        assert_equal(loaded[1].__uuid__, self.details[0].__uuid__)
+
+    def test_load_many_uuids(self):
+        store = self.storage.trajectories
+        uuids = [traj.__uuid__ for traj in self.trajs[::-2]]
+        loaded = store.load_many(uuids)
+        assert_equal([traj.__uuid__ for traj in loaded], uuids)
+        assert_equal([traj.xyz[0, 0, 0] for traj in loaded],
+                     [traj.xyz[0, 0, 0] for traj in self.trajs[::-2]])
+        assert_true(loaded[0] is store.load(uuids[0]))
+
+    def test_load_many_variables(self):
+        store = self.storage.samples
+        loaded = store.load_many([3, 4, 0])
+        assert_equal([s.replica for s in loaded], [3, 4, 0])
+        assert_equal([s.trajectory.__uuid__ for s in loaded],
+                     [self.trajs[i].__uuid__ for i in [3, 4, 0]])
+        assert_equal(loaded[0].ensemble.name, 'length 2')
+
+    def test_getitem(self):
+        store = self.storage.trajectories
+        assert_equal([traj.__uuid__ for traj in store[1:4]],
+                     [traj.__uuid__ for traj in self.trajs[1:4]])
+        assert_equal([traj.__uuid__ for traj in store[[5, 0]]],
+                     [self.trajs[5].__uuid__, self.trajs[0].__uuid__])
@@ -71,6 +71,18 @@ class PathHistogramTester(object):
         assert_equal(hist._histogram[(0,0)], 3)
         assert_equal(hist._histogram[(0,1)], 1)
 
+    def test_trajectory_bins(self):
+        # vectorized version gives the same bins as the pairwise version
+        hist = PathHistogram(left_bin_edges=(0.0, 0.0),
+                             bin_widths=(0.5, 0.5),
+                             interpolate=self.Interpolator, per_traj=False)
+        interpolator = hist.interpolate
+        for traj in [self.trajectory, self.diag]:
+            bins = interpolator.trajectory_bins(traj)
+            pairwise = VoxelInterpolator.trajectory_bins(interpolator, traj)
+            assert_equal(Counter(map(tuple, bins.tolist())),
+                         Counter(map(tuple, pairwise.tolist())))
+
 
 class TestPathHistogramNoInterpolate(PathHistogramTester):
     Interpolator = NoInterpolation
@@ -102,6 +114,28 @@ class TestPathHistogramSubdivideInterpolate(PathHistogramTester):
             (3, 6), (4, 6)  # 4->5
         ]
 
+    def test_trajectory_bins_edge_aligned(self):
+        # frames on bin edges; lines along edges and through corners
+        hist = PathHistogram(left_bin_edges=(0.0, 0.0),
+                             bin_widths=(0.5, 0.5),
+                             interpolate=self.Interpolator, per_traj=False)
+        interpolator = hist.interpolate
+        expected = {
+            # through corners: diagonal steps
+            ((0.0, 0.0), (1.0, 1.0)): [(0, 0), (1, 1), (2, 2)],
+            ((1.0, 1.0), (0.0, 0.0)): [(2, 2), (1, 1), (0, 0)],
+            # along an edge
+            ((0.5, 0.0), (0.5, 1.0)): [(1, 0), (1, 1), (1, 2)],
+            # through a corner at the final frame
+            ((0.0, 0.0), (1.0, 0.5)): [(0, 0), (1, 0), (2, 1)],
+            # leaves the bin of the first frame at once; the corner point
+            # (0.5, 0.5) is in bin (1, 1), which is not counted
+            ((0.0, 1.0), (1.0, 0.0)): [(0, 2), (0, 1), (1, 0), (2, 0)],
+        }
+        for traj, bins in expected.items():
+            result = interpolator.trajectory_bins(list(traj))
+            assert_equal([tuple(b) for b in result.tolist()], bins)
+
 
 class TestPathHistogramBesenhamLikeInterpolate(PathHistogramTester):
     Interpolator = BresenhamLikeInterpolation
@@ -198,6 +232,35 @@ class TestPathHistogram(object):
             assert_equal(counter[val], 0.0)
 
 
+    def test_pairwise_interpolator(self):
+        # interpolators that only implement __call__ still work
+        class NewBinOnly(object):
+            def __init__(self, histogram):
+                self.histogram = histogram
+
+            def __call__(self, old_pt, new_pt):
+                return [self.histogram.map_to_bins(new_pt)]
+
+        hist = PathHistogram(left_bin_edges=(0.0, 0.0),
+                             bin_widths=(0.5, 0.5),
+                             interpolate=NewBinOnly,
+                             per_traj=False)
+        hist.add_trajectory(self.trajectory, weight=2.0)
+        expected = Counter({(0, 0): 2.0, (4, 6): 4.0, (3, 2): 2.0,
+                            (3, 1): 2.0, (0, 2): 2.0})
+        assert_equal(hist._histogram, expected)
+        assert_equal(hist.count, 2.0)
+
+    def test_single_trajectory_counter(self):
+        hist = PathHistogram(left_bin_edges=(0.0, 0.0),
+                             bin_widths=(0.5, 0.5),
+                             interpolate=False,
+                             per_traj=False)
+        counter = hist.single_trajectory_counter(self.trajectory)
+        assert_equal(counter, Counter({(0, 0): 1, (4, 6): 2, (3, 2): 1,
+                                       (3, 1): 1, (0, 2): 1}))
+
+
 class TestPathDensityHistogram(object):
     def setup(self):
         self.HAS_TQDM = paths.progress.HAS_TQDM
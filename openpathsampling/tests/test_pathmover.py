@@ -8,6 +8,7 @@ from builtins import zip
 from builtins import str
 from builtins import range
 from builtins import object
+import os
 from nose.plugins.skip import SkipTest
 from nose.tools import (assert_equal, assert_not_equal, raises, assert_true,
                         assert_in, assert_not_in)
@@ -25,7 +26,8 @@ import openpathsampling.engines.toy as toys
 from .test_helpers import CallIdentity, raises_with_message_like
 from .test_helpers import (assert_equal_array_array, items_equal,
                           make_1d_traj, assert_items_equal,
-                          CalvinistDynamics, assert_same_items, A2BEnsemble)
+                          CalvinistDynamics, assert_same_items, A2BEnsemble,
+                          data_filename)
 
 #logging.getLogger('openpathsampling.pathmover').setLevel(logging.CRITICAL)
 logging.getLogger('openpathsampling.initialization').setLevel(logging.CRITICAL)
@@ -459,6 +461,65 @@ class TestTwoWayShootingMover(TestShootingMover):
         assert_equal(mover.selector, new_mover.selector)
         assert_equal(mover.modifier, new_mover.modifier)
 
+    def test_engine_pool(self):
+        pool = paths.engines.EnginePool(max_workers=3)
+        mover = TwoWayShootingMover(
+            ensemble=self.tps,
+            selector=UniformSelector(),
+            modifier=paths.NoModification(),
+            engine=self.dyn,
+            engine_pool=pool
+        )
+        assert_equal(mover.engine_pool, pool)
+        for submover in mover.movers:
+            assert_equal(submover.engine_pool, pool)
+            new_submover = submover.from_dict(submover.to_dict())
+            assert_equal(new_submover.engine_pool, pool)
+        # the pool is an option of each mover, not shared by all movers
+        other = TwoWayShootingMover(
+            ensemble=self.tps,
+            selector=UniformSelector(),
+            modifier=paths.NoModification(),
+            engine=self.dyn
+        )
+        assert_equal(other.engine_pool, None)
+        dct = pool.to_dict()
+        assert_equal(dct, {'max_workers': 3})
+        assert_equal(paths.engines.EnginePool.from_dict(dct).max_workers, 3)
+
+    def test_engine_pool_storage(self):
+        # submovers sharing a pool still share it after loading
+        pes = toys.LinearSlope(m=[0.0], c=[0.0])
+        topology = toys.Topology(n_spatial=1, masses=[1.0], pes=pes)
+        engine = toys.Engine(
+            options={'integ': toys.LeapfrogVerletIntegrator(0.1)},
+            topology=topology
+        )
+        pool = paths.engines.EnginePool(max_workers=3)
+        mover = TwoWayShootingMover(
+            ensemble=self.tps,
+            selector=UniformSelector(),
+            modifier=paths.NoModification(),
+            engine=engine,
+            engine_pool=pool
+        )
+        filename = data_filename("engine_pool_test.nc")
+        storage = paths.Storage(filename, "w")
+        storage.save(mover)
+        storage.close()
+        try:
+            storage = paths.Storage(filename, "r")
+            assert_equal(len(storage.enginepools), 1)
+            loaded = storage.pathmovers[mover.__uuid__]
+            storage.close()
+        finally:
+            if os.path.isfile(filename):
+                os.remove(filename)
+
+        pools = [submover.engine_pool for submover in loaded.movers]
+        assert pools[0] is pools[1]
+        assert_equal(pools[0].max_workers, 3)
+
 
 class TestPathReversalMover(object):
     def setup(self):
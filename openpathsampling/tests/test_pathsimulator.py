@@ -423,6 +423,74 @@ class TestCommittorSimulation(object):
         assert_true(counts['None-Right'] > 0)
         assert_equal(sum(counts.values()), 50)
 
+    def _run_summary(self, n_workers, as_chain=False):
+        snap1 = toys.Snapshot(coordinates=np.array([[0.1]]),
+                              velocities=np.array([[-1.0]]),
+                              engine=self.engine)
+        sim = CommittorSimulation(storage=self.storage,
+                                  engine=self.engine,
+                                  states=[self.left, self.right],
+                                  randomizer=paths.RandomVelocities(beta=1.0),
+                                  initial_snapshots=[self.snap0, snap1])
+        sim.output_stream = open(os.devnull, 'w')
+        n_steps_before = len(self.storage.steps)
+        sim.run(n_per_snapshot=4, as_chain=as_chain, n_workers=n_workers,
+                seed=11)
+        steps = list(self.storage.steps)[n_steps_before:]
+        summary = []
+        for step in steps:
+            step.active.sanity_check()
+            assert_equal(step.simulation, sim)
+            change = step.change.canonical
+            traj = step.active[0].trajectory
+            summary.append((change.mover.name, len(traj),
+                            traj.xyz.tolist()))
+        return summary
+
+    def test_parallel_run_matches_serial(self):
+        serial = self._run_summary(n_workers=None)
+        parallel = self._run_summary(n_workers=2)
+        assert_equal(len(serial), 8)
+        assert_equal(parallel, serial)
+        # the RNG is seeded per shot, so shots differ from each other
+        assert_true(len(set(str(s) for s in serial)) > 1)
+
+    def test_parallel_run_as_chain(self):
+        serial = self._run_summary(n_workers=None, as_chain=True)
+        parallel = self._run_summary(n_workers=2, as_chain=True)
+        assert_equal(parallel, serial)
+
+    def test_seeded_run_keeps_global_random_state(self):
+        import random
+        ops_rng = paths.default_rng()
+        for n_workers in [None, 2]:
+            state = paths.rng.get_global_state()
+            expected = (ops_rng.random(), np.random.random(),
+                        random.random())
+            paths.rng.set_global_state(state)
+            sim = CommittorSimulation(
+                storage=self.storage,
+                engine=self.engine,
+                states=[self.left, self.right],
+                randomizer=paths.RandomVelocities(beta=1.0),
+                initial_snapshots=self.snap0
+            )
+            sim.output_stream = open(os.devnull, 'w')
+            sim.run(n_per_snapshot=2, n_workers=n_workers, seed=11)
+            assert_equal((ops_rng.random(), np.random.random(),
+                          random.random()), expected)
+
+    def test_parallel_run_without_fork(self):
+        from openpathsampling.pathsimulators import shoot_snapshots
+        serial = self._run_summary(n_workers=None)
+        can_fork = shoot_snapshots._can_fork
+        shoot_snapshots._can_fork = lambda: False
+        try:
+            no_fork = self._run_summary(n_workers=2)
+        finally:
+            shoot_snapshots._can_fork = can_fork
+        assert_equal(no_fork, serial)
+
 
 class TestReactiveFluxSimulation(object):
     def setup(self):
@@ -778,6 +846,94 @@ class TestDirectSimulation(object):
         read_store.close()
         os.remove(tmpfile)
 
+    def _streaming_sim(self, storage):
+        sim = DirectSimulation(storage=storage,
+                               engine=self.engine,
+                               states=[self.center, self.outside],
+                               flux_pairs=self.flux_pairs,
+                               initial_snapshot=self.snap0)
+        sim.chunk_size = 30
+        return sim
+
+    def test_sim_streaming(self):
+        tmpfile = data_filename("direct_sim_test.nc")
+        if os.path.isfile(tmpfile):
+            os.remove(tmpfile)
+
+        self.sim.run(200)
+        storage = paths.Storage(tmpfile, "w", self.snap0)
+        sim = self._streaming_sim(storage)
+        sim.run(200)
+        assert_equal(sim.step, 200)
+        assert_equal(sim.transition_count, self.sim.transition_count)
+        assert_equal(sim.flux_events, self.sim.flux_events)
+        storage.close()
+
+        read_store = paths.AnalysisStorage(tmpfile)
+        # 6 full chunks of 30 steps, and the last 20 steps
+        assert_equal([len(traj) for traj in read_store.trajectories],
+                     [31] * 6 + [21])
+        for traj1, traj2 in zip(read_store.trajectories[:-1],
+                                read_store.trajectories[1:]):
+            assert_equal(traj1[-1], traj2[0])
+        checkpoints = list(read_store.details)
+        assert_equal([c.step for c in checkpoints],
+                     [30, 60, 90, 120, 150, 180, 200])
+        # each checkpoint only has the events since the previous one
+        assert_equal(checkpoints[0].previous, None)
+        for prev, checkpoint in zip(checkpoints[:-1], checkpoints[1:]):
+            assert_equal(int(checkpoint.previous, 16), prev.__uuid__)
+        assert_equal(sum(len(c.new_transition_count) for c in checkpoints),
+                     len(sim.transition_count))
+        assert_true(len(checkpoints[-1].new_transition_count)
+                    < len(sim.transition_count))
+        read_store.close()
+        os.remove(tmpfile)
+
+    def test_restart_at_checkpoint(self):
+        tmpfile = data_filename("direct_sim_test.nc")
+        if os.path.isfile(tmpfile):
+            os.remove(tmpfile)
+
+        storage = paths.Storage(tmpfile, "w", self.snap0)
+        sim = self._streaming_sim(storage)
+        storage.save(sim)
+        sim.run(100)
+        storage.close()
+
+        storage = paths.Storage(tmpfile, "a")
+        loaded = storage.pathsimulators[0]
+        loaded.chunk_size = 30
+        loaded.restart_at_checkpoint()
+        assert_equal(loaded.step, 100)
+        loaded.run(100)
+        assert_equal(loaded.step, 200)
+        assert_equal(len(storage.trajectories), 8)
+        storage.close()
+
+        self.sim.run(200)
+        n_transitions = len(self.sim.transition_count)
+        assert_equal(len(loaded.transition_count), n_transitions)
+        assert_equal([step for (_, step) in loaded.transition_count],
+                     [step for (_, step) in self.sim.transition_count])
+        pair = self.flux_pairs[0]
+        assert_equal(len(loaded.flux_events[loaded.flux_pairs[0]]),
+                     len(self.sim.flux_events[pair]))
+        os.remove(tmpfile)
+
+    @raises(RuntimeError)
+    def test_restart_without_checkpoint(self):
+        tmpfile = data_filename("direct_sim_test.nc")
+        if os.path.isfile(tmpfile):
+            os.remove(tmpfile)
+        storage = paths.Storage(tmpfile, "w", self.snap0)
+        sim = self._streaming_sim(storage)
+        try:
+            sim.restart_at_checkpoint()
+        finally:
+            storage.close()
+            os.remove(tmpfile)
+
 
 class TestPathSampling(object):
     def setup(self):
@@ -822,3 +978,244 @@ class TestPathSampling(object):
         init_xyz = set(s.xyz.tobytes() for s in initial_snaps)
         final_xyz = set(s.xyz.tobytes() for s in final_snaps)
         assert init_xyz & final_xyz == set([])
+
+    def _background_sim(self, storage):
+        network = paths.TPSNetwork(self.state_A, self.state_B)
+        scheme = paths.OneWayShootingMoveScheme(
+            network, selector=paths.UniformSelector(), engine=self.engine
+        )
+        init_traj = make_1d_traj([-0.1, 0.2, 0.5, 0.8, 1.1])
+        init_cond = scheme.initial_conditions_from_trajectories(init_traj)
+        sim = PathSampling(storage=storage, move_scheme=scheme,
+                           sample_set=init_cond)
+        sim.output_stream = open(os.devnull, 'w')
+        sim.save_in_background = True
+        sim.background_queue_size = 2
+        return sim
+
+    def test_run_save_in_background(self):
+        filename = data_filename("background_writer_test.nc")
+        storage = paths.Storage(filename, mode="w")
+        sim = self._background_sim(storage)
+        sim.run(5)
+        assert_equal(sim._writer, None)
+        # initial step plus 5 MC steps
+        assert_equal(len(storage.steps), 6)
+        assert_equal([step.mccycle for step in storage.steps],
+                     list(range(6)))
+        storage.close()
+        if os.path.isfile(filename):
+            os.remove(filename)
+
+    def test_run_until_decorrelated_one_writer(self):
+        path_sampling = paths.pathsimulators.path_sampling
+        writer_class = path_sampling.BackgroundStorageWriter
+        writers = []
+
+        class CountingWriter(writer_class):
+            def __init__(self, *args, **kwargs):
+                writers.append(self)
+                super(CountingWriter, self).__init__(*args, **kwargs)
+
+        filename = data_filename("background_writer_test.nc")
+        storage = paths.Storage(filename, mode="w")
+        path_sampling.BackgroundStorageWriter = CountingWriter
+        try:
+            sim = self._background_sim(storage)
+            sim.run_until_decorrelated()
+            assert_true(sim.step > 1)
+            assert_equal(len(writers), 1)
+            assert_equal(sim._writer, None)
+            assert_equal(len(storage.steps), sim.step + 1)
+        finally:
+            path_sampling.BackgroundStorageWriter = writer_class
+            storage.close()
+            if os.path.isfile(filename):
+                os.remove(filename)
+
+    @raises(RuntimeError)
+    def test_save_in_background_with_diskcache(self):
+        filename = data_filename("background_writer_test.nc")
+        storage = paths.Storage(filename, mode="w")
+        cv = paths.FunctionCV("x2", lambda s: s.xyz[0][0]).with_diskcache()
+        storage.save(cv)
+        sim = self._background_sim(storage)
+        try:
+            sim.run(1)
+        finally:
+            storage.close()
+            if os.path.isfile(filename):
+                os.remove(filename)
+
+    def test_run_concurrent_moves(self):
+        self.sim.output_stream = open(os.devnull, 'w')
+        self.sim.concurrent_moves = 3
+        self.sim.run(10)
+        assert_equal(self.sim.step, 10)
+        self.sim.sample_set.sanity_check()
+        change = self.sim.current_step.change
+        assert_true(isinstance(change, paths.PathSimulatorMoveChange))
+        assert_equal(change.details.step, 10)
+        assert_true(change.subchange.mover is self.sim.root_mover)
+
+
+class _CopyableToyEngine(toys.Engine):
+    def concurrent_copy(self):
+        new = self.__class__.__new__(self.__class__)
+        new.__dict__.update(self.__dict__)
+        return new
+
+
+class TestConcurrentMoveScheduler(object):
+    def setup(self):
+        paths.InterfaceSet._reset()
+        cv = paths.FunctionCV("x", lambda x: x.xyz[0][0])
+        state_A = paths.CVDefinedVolume(cv, float("-inf"), 0.0)
+        state_B = paths.CVDefinedVolume(cv, 1.0, float("inf"))
+        pes = toys.LinearSlope([0, 0, 0], 0)
+        integ = toys.LangevinBAOABIntegrator(0.01, 0.1, 2.5)
+        topology = toys.Topology(n_spatial=3, masses=[1.0], pes=pes)
+        self.engine = toys.Engine(options={'integ': integ},
+                                  topology=topology)
+        self.copyable_engine = _CopyableToyEngine(options={'integ': integ},
+                                                  topology=topology)
+        interfaces = paths.VolumeInterfaceSet(cv, float("-inf"),
+                                              [0.0, 0.1, 0.2])
+        self.network = paths.MISTISNetwork([
+            (state_A, interfaces, state_B)
+        ])
+        self.init_traj = make_1d_traj([-0.1, 0.2, 0.5, 0.8, 1.1])
+
+    def _scheme(self, engine):
+        scheme = paths.MoveScheme(self.network)
+        scheme.append([
+            paths.strategies.OneWayShootingStrategy(
+                selector=paths.UniformSelector(),
+                engine=engine
+            ),
+            paths.strategies.PathReversalStrategy(),
+            paths.strategies.OrganizeByMoveGroupStrategy()
+        ])
+        return scheme
+
+    def _check_next_moves(self, engine):
+        scheme = self._scheme(engine)
+        init_cond = scheme.initial_conditions_from_trajectories(
+            self.init_traj
+        )
+        root = scheme.move_decision_tree()
+        scheduler = ConcurrentMoveScheduler(root, n_moves=3)
+        n_shooting = []
+        for _ in range(20):
+            moves = scheduler.next_moves(init_cond)
+            assert_true(1 <= len(moves) <= 3)
+            resources = [r for move in moves for r in move.resources]
+            assert_equal(len(resources), len(set(resources)))
+            for move in moves:
+                assert_equal(move.choices[0][0], root)
+            n_shooting.append(len([m for m in moves
+                                   if isinstance(m.mover,
+                                                 paths.OneWayShootingMover)]))
+        return n_shooting
+
+    def test_next_moves_shared_engine(self):
+        # moves that use the same (not copyable) engine never run together
+        n_shooting = self._check_next_moves(self.engine)
+        assert_true(max(n_shooting) <= 1)
+
+    def test_next_moves_copyable_engine(self):
+        n_shooting = self._check_next_moves(self.copyable_engine)
+        assert_true(max(n_shooting) > 1)
+
+    def test_run(self):
+        scheme = self._scheme(self.copyable_engine)
+        init_cond = scheme.initial_conditions_from_trajectories(
+            self.init_traj
+        )
+        scheduler = ConcurrentMoveScheduler(scheme.move_decision_tree(),
+                                            n_moves=3)
+        sample_set = init_cond
+        n_steps = 0
+        while n_steps < 15:
+            results = scheduler.run(sample_set)
+            scheduler.raise_error()
+            for change, elapsed in results:
+                assert_true(elapsed >= 0.0)
+                sample_set = sample_set.apply_samples(change.results)
+                sample_set.sanity_check()
+                n_steps += 1
+
+    def test_run_error(self):
+        scheme = self._scheme(self.copyable_engine)
+        init_cond = scheme.initial_conditions_from_trajectories(
+            self.init_traj
+        )
+        scheduler = ConcurrentMoveScheduler(scheme.move_decision_tree(),
+                                            n_moves=3)
+        moves = scheduler.next_moves(init_cond)
+        while len(moves) < 2:
+            moves = scheduler.next_moves(init_cond)
+
+        def fail(sample_set):
+            raise RuntimeError("failed move")
+
+        moves[1].move = fail
+        scheduler._planned = moves + scheduler._planned
+        results = scheduler.run(init_cond, n_max=len(moves))
+        assert_equal(len(results), 1)
+        try:
+            scheduler.raise_error()
+        except RuntimeError as err:
+            assert_equal(str(err), "failed move")
+        else:
+            raise AssertionError("Error not raised")
+
+
+class TestBackgroundStorageWriter(object):
+    def setup(self):
+        self.writer = paths.pathsimulators.BackgroundStorageWriter(
+            max_queue_size=2
+        )
+        self.results = []
+
+    def teardown(self):
+        self.writer.close(raise_errors=False)
+
+    def test_operations_in_order(self):
+        for i in range(10):
+            self.writer.submit(self.results.append, i)
+        self.writer.flush()
+        assert_equal(self.results, list(range(10)))
+
+    def test_close_runs_pending(self):
+        import time
+
+        def slow_append(i):
+            time.sleep(0.01)
+            self.results.append(i)
+
+        for i in range(5):
+            self.writer.submit(slow_append, i)
+        self.writer.close()
+        assert_equal(self.results, list(range(5)))
+
+    @raises(RuntimeError)
+    def test_submit_after_close(self):
+        self.writer.close()
+        self.writer.submit(self.results.append, 0)
+
+    def test_error_raised_in_submitting_thread(self):
+        def fail():
+            raise ValueError("failed to save")
+
+        self.writer.submit(fail)
+        self.writer.submit(self.results.append, 1)
+        try:
+            self.writer.flush()
+        except ValueError as err:
+            assert_equal(str(err), "failed to save")
+        else:
+            raise AssertionError("Error not raised")
+        # later operations are skipped after an error
+        assert_equal(self.results, [])
+        assert_true(self.writer.failed)
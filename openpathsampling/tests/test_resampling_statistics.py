@@ -56,6 +56,25 @@ class TestResamplingStatistics(object):
         )
         assert_frame_equal(stats.std, expected_std)
 
+    def test_precalculated_results(self):
+        stats = paths.numerics.ResamplingStatistics(
+            function=None,
+            inputs=[1, 2, 3, 4],
+            results=self.inputs
+        )
+        expected_mean = pd.DataFrame([[1.25, 2.25], [2.25, 3.25]],
+                                     columns=['A', 'B'], index=['A', 'B'])
+        assert_frame_equal(stats.mean, expected_mean)
+
+    def test_confidence_interval(self):
+        stats = paths.numerics.ResamplingStatistics(
+            function=lambda x: x,
+            inputs=self.inputs
+        )
+        (lower, upper) = stats.confidence_interval(1.0)
+        assert_frame_equal(lower, stats.percentile(0))
+        assert_frame_equal(upper, stats.percentile(100))
+
     def test_percentile(self):
         # TODO: this would benefit from more tests (with more input frames)
         stats = paths.numerics.ResamplingStatistics(
@@ -14,3 +14,42 @@ class TestRandom(object):
         rng2 = default_rng()
         # These should be te same object
         assert rng1 is rng2
+
+    def test_seed_all(self):
+        import random
+        import numpy as np
+        rng = default_rng()
+
+        def draw():
+            return (rng.random(), np.random.random(), random.random())
+
+        seed_all([42, 3])
+        first = draw()
+        seed_all([42, 3])
+        assert draw() == first
+        assert default_rng() is rng
+        seed_all([42, 4])
+        assert draw() != first
+
+    def test_seed_all_legacy(self):
+        import numpy as np
+        import openpathsampling.rng as ops_rng
+        legacy_rng = np.random.RandomState()
+        old_rng = ops_rng.DEFAULT_RNG
+        ops_rng.DEFAULT_RNG = legacy_rng
+        try:
+            seed_all([42, 3])
+            first = legacy_rng.random_sample()
+            seed_all([42, 3])
+            assert legacy_rng.random_sample() == first
+        finally:
+            ops_rng.DEFAULT_RNG = old_rng
+
+    def test_global_state(self):
+        import random
+        import numpy as np
+        rng = default_rng()
+        state = get_global_state()
+        first = (rng.random(), np.random.random(), random.random())
+        set_global_state(state)
+        assert (rng.random(), np.random.random(), random.random()) == first
@@ -6,6 +6,7 @@ from __future__ import absolute_import
 from builtins import zip
 from builtins import range
 from builtins import object
+import gc
 import os
 
 import pytest
@@ -19,7 +20,8 @@ import openpathsampling.engines.toy as toys
 
 from openpathsampling.netcdfplus import ObjectJSON
 from openpathsampling.storage import Storage
-from .test_helpers import (data_filename, md, compare_snapshot)
+from .test_helpers import (data_filename, md, compare_snapshot,
+                           make_1d_traj)
 
 import numpy as np
 from nose.plugins.skip import SkipTest
@@ -405,3 +407,186 @@ class TestStorage(object):
 
         assert(os.path.isfile(self.filename))
         assert(store.storage_version == paths.version.version)
+
+
+class TestMemmapCoordinates(object):
+    def setup(self):
+        self.filename = data_filename("memmap_test.nc")
+        self.array_filename = self.filename + '.snapshot0_coordinates.npy'
+        # keep no snapshots alive, so they are really loaded from the file
+        self.xs = [0.1 * i for i in range(5)]
+        storage = Storage(self.filename, mode='w')
+        storage.save(make_1d_traj(self.xs))
+        storage.close()
+        del storage
+        gc.collect()
+
+    def teardown(self):
+        for filename in [self.filename, self.array_filename]:
+            if os.path.isfile(filename):
+                os.remove(filename)
+
+    def test_memmap_coordinates(self):
+        storage = paths.AnalysisStorage(self.filename,
+                                        memmap_coordinates=True)
+        assert(os.path.isfile(self.array_filename))
+        array = storage.variables['snapshot0_coordinates']
+        assert_equal(array.shape, (5, 1, 3))
+        traj = storage.trajectories[0]
+        for snap, x in zip(traj, self.xs):
+            assert_equal(snap.coordinates[0, 0], np.float32(x))
+            assert(not snap.coordinates.flags.writeable)
+            assert(np.shares_memory(snap.coordinates,
+                                    storage.vars['snapshot0_coordinates']
+                                    .variable))
+        storage.close()
+
+    def test_reuse_array_file(self):
+        storage = Storage(self.filename, mode='r')
+        arrays = storage.memmap_coordinates()
+        assert_equal(list(arrays.keys()), ['snapshot0'])
+        mtime = os.path.getmtime(self.array_filename)
+        storage.close()
+
+        storage = Storage(self.filename, mode='r')
+        array = storage.memmap_coordinates()['snapshot0']
+        assert_equal(os.path.getmtime(self.array_filename), mtime)
+        assert_equal(array[3, 0, 0], np.float32(0.3))
+        storage.close()
+
+    def test_requires_read_only(self):
+        storage = Storage(self.filename, mode='a')
+        with pytest.raises(RuntimeError):
+            storage.memmap_coordinates()
+        storage.close()
+
+
+class TestCompression(object):
+    def setup(self):
+        self.filename = data_filename("compression_test.nc")
+        self.xs = [0.123456 * i for i in range(5)]
+
+    def teardown(self):
+        if os.path.isfile(self.filename):
+            os.remove(self.filename)
+
+    def _save_and_open(self, compression):
+        traj = make_1d_traj(self.xs)
+        storage = Storage(self.filename, mode='w')
+        storage.snapshots.add_type(traj[0], compression=compression)
+        storage.save(traj)
+        storage.close()
+        del storage, traj
+        gc.collect()
+        return Storage(self.filename, mode='r')
+
+    def test_quantized(self):
+        compression = paths.storage.SnapshotWrapperStore.\
+            quantized_compression(2)
+        assert_equal(sorted(compression.keys()),
+                     ['coordinates', 'velocities'])
+        storage = self._save_and_open(compression)
+        variable = storage.variables['snapshot0_coordinates']
+        assert(variable.filters()['zlib'])
+        assert_equal(variable.least_significant_digit, 2)
+        for snap, x in zip(storage.trajectories[0], self.xs):
+            assert(abs(snap.coordinates[0, 0] - x) < 0.01)
+        storage.close()
+
+    def test_lossless(self):
+        compression = paths.storage.SnapshotWrapperStore.\
+            quantized_compression(None, variables=['coordinates'])
+        storage = self._save_and_open(compression)
+        assert(storage.variables['snapshot0_coordinates'].filters()['zlib'])
+        assert(not storage.variables['snapshot0_velocities'].filters()['zlib'])
+        for snap, x in zip(storage.trajectories[0], self.xs):
+            assert_equal(snap.coordinates[0, 0], np.float32(x))
+        storage.close()
+
+
+class TestPrecomputeCVs(object):
+    def setup(self):
+        self.filename = data_filename("precompute_cvs_test.nc")
+        self.xs = [0.1 * i for i in range(7)]
+        storage = Storage(self.filename, mode='w')
+        storage.save(make_1d_traj(self.xs, velocities=[1.0] * 7))
+        storage.close()
+        del storage
+        gc.collect()
+        self.storage = Storage(self.filename, mode='a')
+
+    def teardown(self):
+        self.storage.close()
+        if os.path.isfile(self.filename):
+            os.remove(self.filename)
+
+    def _reopen(self):
+        self.storage.close()
+        gc.collect()
+        self.storage = Storage(self.filename, mode='r')
+        return self.storage
+
+    def _check(self, n_workers):
+        cv_x = paths.FunctionCV('x', lambda s: s.xyz[0][0],
+                                cv_time_reversible=True).with_diskcache()
+        cv_v = paths.FunctionCV('v', lambda s: s.velocities[0][0],
+                                cv_time_reversible=False).with_diskcache()
+        counts = self.storage.precompute_cvs([cv_x, cv_v],
+                                             n_workers=n_workers,
+                                             chunk_size=3)
+        assert_equal(counts, {cv_x: 7, cv_v: 14})
+        assert_equal(self.storage.precompute_cvs(), {cv_x: 0, cv_v: 0})
+        # values are readable from the stores in the same session
+        store_x = self.storage.snapshots.attribute_list[cv_x]
+        store_v = self.storage.snapshots.attribute_list[cv_v]
+        snapshots = self.storage.trajectories[0]
+        for snap, x in zip(snapshots, self.xs):
+            assert(abs(store_x.load(snap) - x) < 1e-6)
+            assert_equal(store_v.load(snap), 1.0)
+            assert_equal(store_v.load(snap.reversed), -1.0)
+        del cv_x, cv_v, store_x, store_v
+
+        storage = self._reopen()
+        cv_x = storage.cvs['x']
+        cv_v = storage.cvs['v']
+        snapshots = storage.trajectories[0]
+        for snap, x in zip(snapshots, self.xs):
+            assert(abs(cv_x(snap) - x) < 1e-6)
+            assert_equal(cv_v(snap), 1.0)
+            assert_equal(cv_v(snap.reversed), -1.0)
+        assert_equal(len(storage.snapshots.attribute_list[cv_v].index), 14)
+
+    def test_precompute(self):
+        self._check(n_workers=1)
+
+    def test_precompute_parallel(self):
+        self._check(n_workers=2)
+
+    def test_precompute_missing(self):
+        cv = paths.FunctionCV('x', lambda s: s.xyz[0][0],
+                              cv_time_reversible=False).with_diskcache()
+        self.storage.save(cv)
+        store = self.storage.snapshots.attribute_list[cv]
+        assert_equal(len(store.index), 0)
+        snap = self.storage.trajectories[0][2]
+        store[snap] = cv(snap)
+        counts = self.storage.precompute_cvs([cv], n_workers=1)
+        assert_equal(counts, {cv: 13})
+
+    def test_precompute_chunk_without_values(self):
+        # the CV has no value for any snapshot of the second chunk
+        cv = paths.FunctionCV(
+            'x', lambda s: s.xyz[0][0] if s.xyz[0][0] < 0.25 else None,
+            cv_time_reversible=False
+        ).with_diskcache(allow_incomplete=True)
+        counts = self.storage.precompute_cvs([cv], n_workers=1,
+                                             chunk_size=3)
+        # x = 0.0, 0.1, 0.2 for the forward and reversed snapshots
+        assert_equal(counts, {cv: 6})
+        store = self.storage.snapshots.attribute_list[cv]
+        snapshots = self.storage.trajectories[0]
+        for snap, x in zip(snapshots, self.xs):
+            if x < 0.25:
+                assert(abs(store.load(snap) - x) < 1e-6)
+            else:
+                assert_equal(store.load(snap), None)
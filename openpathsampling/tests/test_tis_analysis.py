@@ -1,9 +1,12 @@
 import itertools
+import os
+import pickle
 import random
 import pytest
 from nose.tools import assert_equal, assert_almost_equal, raises
 from .test_helpers import (make_1d_traj, MoverWithSignature, RandomMDEngine,
-                           assert_frame_equal, assert_items_equal)
+                           assert_frame_equal, assert_items_equal,
+                           data_filename)
 
 from openpathsampling.analysis.tis import *
 from openpathsampling.analysis.tis.core import steps_to_weighted_trajectories
@@ -201,6 +204,18 @@ class TestWeightedTrajectories(TISAnalysisTester):
         self._check_network_results(self.mstis,
                                     self.mstis_weighted_trajectories)
 
+    @pytest.mark.parametrize('as_iterator', [False, True])
+    def test_steps_to_weighted_trajectories_blocks(self, as_iterator):
+        steps = self.mistis_steps
+        if as_iterator:
+            steps = iter(steps)
+        weighted_trajs = steps_to_weighted_trajectories(
+            steps,
+            self.mistis.sampling_ensembles,
+            block_size=2
+        )
+        self._check_network_results(self.mistis, weighted_trajs)
+
 
 class TestFluxToPandas(TISAnalysisTester):
     # includes tests for default_flux_sort and flux_matrix_pd
@@ -399,6 +414,23 @@ class TestMinusMoveFlux(TISAnalysisTester):
         for flux in mstis_flux.values():  # all values are the same
             assert_almost_equal(flux, expected_flux)
 
+    def test_combine_intermediates(self):
+        flux_method = self.mistis_minus_flux
+        steps = self.mistis_minus_steps
+        expected = flux_method.calculate(steps)
+        intermediates = flux_method.combine_intermediates(
+            flux_method.intermediates(steps[:1]),
+            flux_method.intermediates(steps[1:])
+        )
+        for flux_dict in intermediates[0].values():
+            # only the lengths of the segments are kept
+            for segment in flux_dict['in']:
+                assert isinstance(segment, range)
+        combined = flux_method.calculate_from_intermediates(*intermediates)
+        assert_equal(set(combined.keys()), set(expected.keys()))
+        for flux_pair in expected:
+            assert_almost_equal(combined[flux_pair], expected[flux_pair])
+
     @raises(ValueError)
     def test_bad_network(self):
         # raises error if more than one transition shares a minus ensemble
@@ -673,6 +705,72 @@ class TestStandardTransitionProbability(TISAnalysisTester):
             assert_almost_equal(results, 0.0)
 
 
+class TestTISBootstrap(TISAnalysisTester):
+    def setup(self):
+        super(TestTISBootstrap, self).setup()
+        network = self.mistis
+        self.analysis = StandardTISAnalysis(
+            network=network,
+            flux_method=DictFlux({(t.stateA, t.interfaces[0]): 0.1
+                                  for t in network.sampling_transitions}),
+            max_lambda_calcs={t: {'bin_width': 0.1,
+                                  'bin_range': (-0.1, 1.1)}
+                              for t in network.sampling_transitions},
+            steps=self.mistis_steps
+        )
+        self.analysis.progress = 'silent'
+        self.rates = self.analysis.rate_matrix().to_pandas()
+
+    def _bootstrap(self, n_workers):
+        return TISBootstrap(self.analysis, self.mistis_steps,
+                            n_blocks=len(self.mistis_steps), n_resamples=10,
+                            n_workers=n_workers, seed=5)
+
+    def test_bootstrap(self):
+        bootstrap = self._bootstrap(n_workers=1)
+        assert_equal(len(bootstrap.block_intermediates),
+                     len(self.mistis_steps))
+        assert_equal(len(bootstrap.resamples), 10)
+        assert_equal(len(bootstrap.rate_matrix.results), 10)
+        # the analysis keeps its own results
+        pdt.assert_frame_equal(self.analysis.rate_matrix().to_pandas(),
+                               self.rates)
+
+        intervals = bootstrap.confidence_intervals(0.9)
+        (flux_low, flux_high) = intervals['flux_matrix']
+        assert (flux_low['Flux'] == 0.1).all()
+        assert (flux_high['Flux'] == 0.1).all()
+        (rate_low, rate_high) = intervals['rate_matrix']
+        for (vol_1, vol_2) in [(self.state_A, self.state_B),
+                               (self.state_B, self.state_A)]:
+            (name_1, name_2) = (vol_1.name, vol_2.name)
+            assert rate_low.loc[name_1, name_2] \
+                    <= rate_high.loc[name_1, name_2]
+        tcp_intervals = intervals['total_crossing_probability']
+        for transition in self.mistis.transitions.values():
+            (tcp_low, tcp_high) = tcp_intervals[transition]
+            assert_equal(tcp_low.loc[0.0, 'TCP'], 1.0)
+            assert (tcp_low['TCP'] <= tcp_high['TCP']).all()
+
+    def test_parallel(self):
+        serial = self._bootstrap(n_workers=1)
+        parallel = self._bootstrap(n_workers=2)
+        assert_equal(serial.resamples, parallel.resamples)
+        for (s_rate, p_rate) in zip(serial.rate_matrix.results,
+                                    parallel.rate_matrix.results):
+            pdt.assert_frame_equal(s_rate, p_rate)
+        for transition in self.mistis.transitions.values():
+            s_tcp = serial.total_crossing_probability[transition]
+            p_tcp = parallel.total_crossing_probability[transition]
+            for (s_df, p_df) in zip(s_tcp.results, p_tcp.results):
+                pdt.assert_frame_equal(s_df, p_df)
+
+    @raises(ValueError)
+    def test_too_many_blocks(self):
+        TISBootstrap(self.analysis, self.mistis_steps,
+                     n_blocks=len(self.mistis_steps) + 1)
+
+
 class TestTransitionDictResults(TISAnalysisTester):
     def setup(self):
         super(TestTransitionDictResults, self).setup()
@@ -985,6 +1083,109 @@ class TestStandardTISAnalysis(TestTISAnalysis):
             for x in results:
                 assert_almost_equal(results[x], tcp(x))
 
+    @pytest.mark.parametrize('block_size', [1, 3, 100])
+    def test_calculate_blocks(self, block_size):
+        for (network, steps, analysis) in [
+            (self.mistis, self.mistis_steps, self.mistis_analysis),
+            (self.mstis, self.mstis_steps, self.mstis_analysis)
+        ]:
+            block_analysis = self._make_tis_analysis(network)
+            block_analysis.calculate(steps, block_size=block_size)
+            rates = block_analysis.rate_matrix().to_pandas()
+            expected_rates = analysis.rate_matrix().to_pandas()
+            pdt.assert_frame_equal(rates, expected_rates)
+            ctp = block_analysis.conditional_transition_probability
+            expected_ctp = analysis.conditional_transition_probability
+            pdt.assert_frame_equal(ctp.sort_index(axis=0).sort_index(axis=1),
+                                   expected_ctp.sort_index(axis=0)
+                                   .sort_index(axis=1))
+            tcps = block_analysis.total_crossing_probability
+            expected_tcps = analysis.total_crossing_probability
+            for transition in network.transitions.values():
+                for x in [0.0, 0.1, 0.2, 0.3, 1.0]:
+                    assert_almost_equal(tcps[transition](x),
+                                        expected_tcps[transition](x))
+
+    def test_intermediates_n_steps(self):
+        intermediates = self.mistis_analysis.intermediates(self.mistis_steps,
+                                                           block_size=3)
+        assert_equal(intermediates['n_steps'], len(self.mistis_steps))
+
+    def _check_same_results(self, analysis, expected):
+        pdt.assert_frame_equal(analysis.rate_matrix().to_pandas(),
+                               expected.rate_matrix().to_pandas())
+        assert_equal(analysis.flux_matrix, expected.flux_matrix)
+        ctp = analysis.results['conditional_transition_probability']
+        expected_ctp = expected.results['conditional_transition_probability']
+        assert_equal(ctp, expected_ctp)
+
+    def test_update(self):
+        steps = self.mistis_steps
+        analysis = self._make_tis_analysis(self.mistis)
+        analysis.update(steps[:2], block_size=1)
+        assert_equal(analysis._intermediates['n_steps'], 2)
+        analysis.update(steps, block_size=1)
+        assert_equal(analysis._intermediates['n_steps'], len(steps))
+        assert_equal(analysis._intermediates['mccycle'], steps[-1].mccycle)
+        self._check_same_results(analysis, self.mistis_analysis)
+        # no new steps: results are unchanged
+        analysis.update(steps)
+        self._check_same_results(analysis, self.mistis_analysis)
+
+    @raises(RuntimeError)
+    def test_update_wrong_steps(self):
+        analysis = self._make_tis_analysis(self.mistis)
+        analysis.update(self.mistis_steps[:3])
+        analysis.update(self.mistis_steps[1:])
+
+    def test_update_with_file(self):
+        filename = data_filename("tis_intermediates_test.pkl")
+        if os.path.isfile(filename):
+            os.remove(filename)
+        steps = self.mistis_steps
+        try:
+            analysis = self._make_tis_analysis(self.mistis)
+            analysis.update(steps[:2], filename=filename)
+            with open(filename, 'rb') as f:
+                # pickle protocol 2, which Python 2 can read
+                assert_equal(f.read(2), b'\x80\x02')
+            # saving again replaces the file
+            analysis.save_intermediates(filename)
+            assert not os.path.isfile(filename + ".tmp")
+            # new process: only the new steps are read
+            restarted = self._make_tis_analysis(self.mistis)
+            restarted.update(iter(steps), block_size=2, filename=filename)
+            assert_equal(restarted._intermediates['n_steps'], len(steps))
+            self._check_same_results(restarted, self.mistis_analysis)
+
+            loaded = self._make_tis_analysis(self.mistis)
+            loaded.load_intermediates(filename)
+            self._check_same_results(loaded, self.mistis_analysis)
+
+            other_network = self._make_tis_analysis(self.mstis)
+            with pytest.raises(pickle.UnpicklingError):
+                other_network.load_intermediates(filename)
+        finally:
+            if os.path.isfile(filename):
+                os.remove(filename)
+
+    @raises(RuntimeError)
+    def test_save_intermediates_without_intermediates(self):
+        filename = data_filename("tis_intermediates_test.pkl")
+        self.mistis_analysis.save_intermediates(filename)
+
+    @raises(RuntimeError)
+    def test_intermediates_no_bin_range(self):
+        network = self.mistis
+        analysis = StandardTISAnalysis(
+            network=network,
+            flux_method=DictFlux({(t.stateA, t.interfaces[0]): 0.1
+                                  for t in network.sampling_transitions}),
+            max_lambda_calcs={t: {'bin_width': 0.1}
+                              for t in network.sampling_transitions}
+        )
+        analysis.intermediates(self.mistis_steps, block_size=3)
+
     @raises(TypeError)
     def test_bad_no_flux(self):
         network = self.mistis
@@ -129,6 +129,28 @@ class TestCombinations(object):
     def test_kinetic_energy(self):
         assert_almost_equal(self.simpletest.kinetic_energy(self), 0.4575)
 
+    def test_batch(self):
+        # V and dVdx of a batch of positions agree with one-by-one results
+        single_positions = [init_pos, init_pos + 0.1, init_pos - 0.2]
+        batch = paths.engines.toy.engine._ToyWalkers(
+            engine=toy.Engine({'integ': None},
+                              toy.Topology(n_spatial=2, masses=sys_mass,
+                                           pes=self.fullertest)),
+            positions=np.array(single_positions),
+            velocities=np.array([init_vel] * 3)
+        )
+        batch_V = self.fullertest.V(batch)
+        batch_dVdx = self.fullertest.dVdx(batch)
+        batch_ke = self.fullertest.kinetic_energy(batch)
+        assert_equal(batch_V.shape, (3,))
+        assert_equal(batch_dVdx.shape, (3, 2))
+        for (i, pos) in enumerate(single_positions):
+            self.positions = pos
+            assert_almost_equal(batch_V[i], self.fullertest.V(self))
+            np.testing.assert_allclose(batch_dVdx[i],
+                                       self.fullertest.dVdx(self))
+            assert_almost_equal(batch_ke[i], 0.4575)
+
 
 # === TESTS FOR TOY ENGINE OBJECT =========================================
 
@@ -233,6 +255,79 @@ class TestToyEngine(object):
             assert_items_equal(s1.coordinates[0], s2.coordinates[0])
             assert_items_equal(s1.velocities[0], s2.velocities[0])
 
+    def _initial_snapshots(self):
+        return [
+            toy.Snapshot(coordinates=np.array([[x0, 0.65]]),
+                         velocities=np.array([init_vel]),
+                         engine=self.sim)
+            for x0 in [0.7, 0.5, 0.9]
+        ]
+
+    def test_generate_many(self):
+        # stops at length 3, 5, and 1, respectively
+        def running(traj, trusted=False):
+            return traj[0].xyz[0][0] + 0.1 * len(traj) < 1.0
+
+        snapshots = self._initial_snapshots()
+        trajs = self.sim.generate_many(snapshots, running)
+        assert_equal([len(traj) for traj in trajs], [3, 5, 1])
+        for (snap, traj) in zip(snapshots, trajs):
+            assert_equal(traj[0], snap)
+            serial = self.sim.generate(snap, running)
+            assert_equal(len(traj), len(serial))
+            for (s1, s2) in zip(traj, serial):
+                np.testing.assert_allclose(s1.coordinates, s2.coordinates)
+                np.testing.assert_allclose(s1.velocities, s2.velocities)
+
+    def test_generate_many_backward(self):
+        ens = paths.LengthEnsemble(3)
+        snapshots = self._initial_snapshots()
+        trajs = self.sim.generate_many(snapshots, ens.can_prepend,
+                                       direction=-1)
+        for (snap, traj) in zip(snapshots, trajs):
+            assert_equal(traj[-1], snap)
+            serial = self.sim.generate(snap, ens.can_prepend, direction=-1)
+            assert_equal(len(traj), 3)
+            assert_equal(len(serial), 3)
+            for (s1, s2) in zip(traj, serial):
+                np.testing.assert_allclose(s1.coordinates, s2.coordinates)
+                np.testing.assert_allclose(s1.velocities, s2.velocities)
+
+    def test_generate_many_max_length(self):
+        snapshots = self._initial_snapshots()
+        try:
+            self.sim.generate_many(snapshots, [true_func])
+        except paths.engines.EngineMaxLengthError as e:
+            assert_equal(len(e.last_trajectory), self.sim.n_frames_max)
+        else:
+            raise RuntimeError('Did not raise MaxLength Error')
+
+        self.sim.on_max_length = 'stop'
+        trajs = self.sim.generate_many(snapshots, [true_func])
+        assert_equal([len(traj) for traj in trajs],
+                     [self.sim.n_frames_max] * 3)
+
+    def test_generate_many_trusted_ensemble(self):
+        # each walker has its own ensemble cache, so that the volume is
+        # only tested for the new frame (not for the whole trajectory)
+        calls = []
+
+        class CountingVolume(paths.Volume):
+            def __call__(self, snapshot):
+                calls.append(snapshot)
+                return True
+
+        ens = paths.AllInXEnsemble(CountingVolume())
+        self.sim.options['n_frames_max'] = 20
+        self.sim.on_max_length = 'stop'
+        snapshots = self._initial_snapshots()
+        trajs = self.sim.generate_many(snapshots, ens.can_append)
+        assert_equal([len(traj) for traj in trajs], [20] * 3)
+        # one call per frame, and one more for the first trusted call
+        assert_equal(len(calls), 3 * 21)
+        # the ensemble's own caches are restored
+        assert_equal(ens._cache_can_append.start_frame, None)
+
     def test_start_with_snapshot(self):
         snap = toy.Snapshot(coordinates=np.array([1,2]),
                         velocities=np.array([3,4]))
@@ -342,3 +437,12 @@ class TestLangevinBAOABIntegrator(object):
 
     def test_step(self):
         self.sim.generate_next_frame()
+
+    def test_generate_many(self):
+        ens = paths.LengthEnsemble(4)
+        snapshots = [self.sim.current_snapshot.copy() for _ in range(3)]
+        trajs = self.sim.generate_many(snapshots, ens.can_append)
+        assert_equal([len(traj) for traj in trajs], [4, 4, 4])
+        # the walkers receive different random kicks
+        assert_not_equal(trajs[0][-1].velocities[0][0],
+                         trajs[1][-1].velocities[0][0])
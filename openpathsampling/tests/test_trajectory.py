@@ -1,6 +1,8 @@
 from __future__ import absolute_import
 from builtins import object
+import gc
 import logging
+import weakref
 
 from nose.tools import (
     assert_equal, assert_not_equal, raises
@@ -138,3 +140,99 @@ class TestSubtrajectoryIndices(object):
         assert_equal(indicesA, [[0, 1], [3], [11, 12]])
         assert_equal(indicesB, [[5, 6], [8]])
         assert_equal(indicesABA, [[3, 4, 5, 6, 7, 8, 9, 10, 11]])
+
+
+class TestPackedTrajectory(object):
+    def setup(self):
+        import numpy as np
+        self.np = np
+        self.traj = make_1d_traj(coordinates=[0.5, 1.5, 2.5, 3.5, 4.5],
+                                 velocities=[1.0, -1.0, 2.0, -2.0, 3.0])
+        self.packed = paths.PackedTrajectory(self.traj, capacity=2)
+
+    def test_len_and_capacity(self):
+        assert_equal(len(self.packed), 5)
+        # grows geometrically: 2 -> 4 -> 8
+        assert_equal(self.packed.capacity, 8)
+
+    def test_getitem_equals_original(self):
+        for idx, snap in enumerate(self.traj):
+            packed_snap = self.packed[idx]
+            assert_equal(packed_snap, snap)
+            assert_equal(hash(packed_snap), hash(snap))
+            self.np.testing.assert_array_equal(packed_snap.coordinates,
+                                               snap.coordinates)
+            self.np.testing.assert_array_equal(packed_snap.velocities,
+                                               snap.velocities)
+            assert packed_snap.engine is snap.engine
+
+        assert_equal(self.packed[-1], self.traj[-1])
+
+    def test_views_are_reused(self):
+        assert self.packed[1] is self.packed[1]
+
+    def test_reversed(self):
+        rev_snap = self.packed[1].reversed
+        assert_equal(rev_snap, self.traj[1].reversed)
+        self.np.testing.assert_array_equal(rev_snap.velocities,
+                                           -self.traj[1].velocities)
+
+    def test_xyz_is_view(self):
+        xyz = self.packed.xyz
+        self.np.testing.assert_array_equal(xyz, self.traj.xyz)
+        assert self.np.shares_memory(xyz, self.packed[2].coordinates)
+
+    @raises(ValueError)
+    def test_snapshot_is_read_only(self):
+        snap = self.packed[2]
+        assert not snap.coordinates.flags.writeable
+        snap.coordinates[0][0] = 10.0
+
+    def test_packed_data_not_changed_by_snapshot(self):
+        snap = self.packed[2]
+        try:
+            snap.velocities[0][0] = 10.0
+        except ValueError:
+            pass
+        assert_equal(self.packed.velocities[2][0][0], 2.0)
+        assert not self.packed.xyz.flags.writeable
+        # appending still works
+        self.packed.append(self.traj[0])
+        assert_equal(len(self.packed), 6)
+
+    def test_trajectory_attribute_not_kept(self):
+        # attributes of Trajectory come from a regular trajectory that
+        # reflects the current frames and is released after use
+        method = self.packed.summarize_by_volumes
+        assert isinstance(method.__self__, paths.Trajectory)
+        assert_equal(list(method.__self__), list(self.traj))
+        traj_ref = weakref.ref(method.__self__)
+        del method
+        gc.collect()
+        assert_equal(traj_ref(), None)
+        self.packed.append(self.traj[0])
+        method = self.packed.summarize_by_volumes
+        assert_equal(len(method.__self__), 6)
+
+    def test_slice(self):
+        sliced = self.packed[1:3]
+        assert isinstance(sliced, paths.Trajectory)
+        assert_equal(list(sliced), list(self.traj[1:3]))
+
+    def test_to_trajectory(self):
+        traj = self.packed.to_trajectory()
+        assert isinstance(traj, paths.Trajectory)
+        assert_equal(list(traj), list(self.traj))
+
+    def test_cv_on_packed(self):
+        cv = paths.FunctionCV("x", lambda snap: snap.coordinates[0][0])
+        assert_equal(cv(self.packed), [0.5, 1.5, 2.5, 3.5, 4.5])
+
+    @raises(IndexError)
+    def test_index_error(self):
+        self.packed[5]
+
+    @raises(ValueError)
+    def test_different_engine(self):
+        other = make_1d_traj(coordinates=[0.0])
+        self.packed.append(other[0])
@@ -128,6 +128,51 @@ class TestWHAM(object):
                                      sum_k_Hk_Q)
         np.testing.assert_allclose(lnZ.values, expected_lnZ)
 
+    def test_generate_lnZ_accelerated(self):
+        guess = [1.0, 1.0, 1.0]
+        expected_lnZ = np.log([1.0, 1.0/4.0, 7.0/120.0])
+        unweighting = self.wham.unweighting_tis(self.cleaned)
+        sum_k_Hk_Q = self.wham.sum_k_Hk_Q(self.cleaned)
+        weighted_counts = self.wham.weighted_counts_tis(
+            unweighting,
+            self.wham.n_entries(self.cleaned)
+        )
+        fixed_point_iterations = None
+        for method in ['fixed_point', 'anderson', 'newton']:
+            wham = paths.numerics.WHAM(cutoff=0.1, method=method)
+            lnZ = wham.generate_lnZ(guess, unweighting, weighted_counts,
+                                    sum_k_Hk_Q)
+            np.testing.assert_allclose(lnZ.values, expected_lnZ)
+            iterations, diff = wham.convergence
+            assert diff < wham.tol
+            if fixed_point_iterations is None:
+                fixed_point_iterations = iterations
+            else:
+                assert iterations < fixed_point_iterations
+
+    def test_generate_lnZ_small_probabilities(self):
+        # each histogram is a factor 1e-2 below the previous one, so Z of
+        # the last one is 1e-398, which underflows outside of log space
+        n_hists = 200
+        data = np.zeros((2 * n_hists + 2, n_hists))
+        for k in range(n_hists):
+            data[2*k:2*k+4, k] = [1.0, 0.1, 0.01, 0.001]
+        cleaned = pd.DataFrame(data)
+        wham = paths.numerics.WHAM(method='newton')
+        unweighting = wham.unweighting_tis(cleaned)
+        weighted_counts = wham.weighted_counts_tis(
+            unweighting,
+            wham.n_entries(cleaned)
+        )
+        lnZ = wham.generate_lnZ([0.0] * n_hists, unweighting,
+                                weighted_counts, wham.sum_k_Hk_Q(cleaned))
+        np.testing.assert_allclose(lnZ.values,
+                                   -2.0 * np.log(10) * np.arange(n_hists))
+
+    @raises(ValueError)
+    def test_bad_method(self):
+        paths.numerics.WHAM(method='foo')
+
     def test_output_histogram(self):
         sum_k_Hk_Q = self.wham.sum_k_Hk_Q(self.cleaned)
         n_entries = self.wham.n_entries(self.cleaned)